@@ -2,9 +2,10 @@
 WITH agent_commissions AS (
   SELECT 
     c.listing_agent_id AS agent_id,
-    SUM(c.total_commission_amount) FILTER (WHERE c.created_at >= NOW() - INTERVAL '1 year') AS total_commission,
-    COUNT(*) FILTER (WHERE c.created_at >= NOW() - INTERVAL '1 year')        AS transactions_count
+    SUM(c.total_commission_amount) AS total_commission,
+    COUNT(*)                       AS transactions_count
   FROM Commission c
+  WHERE c.created_at >= NOW() - INTERVAL '1 year'
   GROUP BY c.listing_agent_id
 ),
 agent_rank AS (
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+ZIP_PATTERN = re.compile(r'^\d{5}(?:-\d{4})?$')
+US_STATES = {
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'DC', 'FL', 'GA', 'HI', 'ID', 'IL', 'IN', 'IA',
+    'KS', 'KY', 'LA', 'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ', 'NM',
+    'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA',
+    'WV', 'WI', 'WY', 'PR',
+}
+ORDINAL_PATTERN = re.compile(r'^\d+(?:st|nd|rd|th)$', re.IGNORECASE)
+
+# Only the last word of the street is treated as a suffix ("345 Court St" keeps "Court")
+STREET_SUFFIXES = {
+    'st': 'St', 'str': 'St', 'street': 'St',
+    'ave': 'Ave', 'av': 'Ave', 'avenue': 'Ave',
+    'rd': 'Rd', 'road': 'Rd',
+    'blvd': 'Blvd', 'boulevard': 'Blvd',
+    'pl': 'Pl', 'place': 'Pl',
+    'dr': 'Dr', 'drive': 'Dr',
+    'ln': 'Ln', 'lane': 'Ln',
+    'ct': 'Ct', 'court': 'Ct',
+    'ter': 'Ter', 'terrace': 'Ter',
+    'pkwy': 'Pkwy', 'parkway': 'Pkwy',
+    'hwy': 'Hwy', 'highway': 'Hwy',
+    'sq': 'Sq', 'square': 'Sq',
+    'plz': 'Plz', 'plaza': 'Plz',
+    'tpke': 'Tpke', 'turnpike': 'Tpke',
+    'cir': 'Cir', 'circle': 'Cir',
+    'way': 'Way',
+}
+
+DIRECTIONS = {'e': 'East', 'w': 'West', 'n': 'North', 's': 'South'}
+
+UNIT_MARKERS = {
+    'unit': 'Unit', 'apt': 'Apt', 'apartment': 'Apt', 'suite': 'Suite', 'ste': 'Suite',
+    'fl': 'Fl', 'floor': 'Fl', 'rm': 'Rm', 'room': 'Rm',
+}
+
+# Cities of the service area, including the multi-word ones a token scan cannot find
+CITY_NAMES = [
+    'New York', 'Brooklyn', 'Bronx', 'Queens', 'Staten Island', 'Long Island City', 'Astoria',
+    'Flushing', 'Jamaica', 'Forest Hills', 'Jersey City', 'Union City', 'West New York', 'North Bergen',
+    'Fort Lee', 'Hoboken', 'Weehawken', 'Edgewater', 'Newark', 'Bayonne', 'Yonkers', 'New Rochelle',
+    'White Plains', 'Stamford', 'Greenwich', 'Fairfield', 'Norwalk', 'Westport', 'Darien',
+]
+CITY_ALIASES = {
+    'nyc': 'New York', 'manhattan': 'New York', 'new york city': 'New York',
+    'bklyn': 'Brooklyn', 'lic': 'Long Island City', 'the bronx': 'Bronx',
+}
+KNOWN_CITIES = {name.lower(): name for name in CITY_NAMES}
+KNOWN_CITIES.update(CITY_ALIASES)
+MAX_CITY_WORDS = max(len(name.split()) for name in KNOWN_CITIES)
+
+
+class NormalizedAddress(namedtuple('NormalizedAddress', 'street unit_label unit city state zip_code')):
+    """An address split into its parts, with abbreviations and casing normalized."""
+
+    __slots__ = ()
+
+    @property
+    def line(self):
+        """The street line as stored in Property.address / Office.address."""
+        if self.unit:
+            return f"{self.street} {self.unit_label} {self.unit}" if self.street else f"{self.unit_label} {self.unit}"
+        return self.street
+
+
+def normalize_word(token):
+    """Title-cases plain words; keeps mixed-case words, numbers and ordinals as they are."""
+    if ORDINAL_PATTERN.match(token):
+        return token.lower()
+    if token.isupper() or token.islower():
+        return token.capitalize() if token.isalpha() else token.upper()
+    return token
+
+
+def split_city(tokens):
+    """Splits trailing city words off the tokens; returns (remaining tokens, city)."""
+    for size in range(min(MAX_CITY_WORDS, len(tokens) - 1), 0, -1):
+        candidate = ' '.join(tokens[-size:]).lower()
+        if candidate in KNOWN_CITIES:
+            return tokens[:-size], KNOWN_CITIES[candidate]
+
+    # Unknown city: everything after the street suffix or unit number
+    if tokens[-1].lower().rstrip('.') in STREET_SUFFIXES:
+        return tokens, None
+    for i in range(len(tokens) - 2, -1, -1):
+        previous = tokens[i - 1].lower() if i > 0 else ''
+        if tokens[i].lower() in STREET_SUFFIXES or previous in UNIT_MARKERS or tokens[i].startswith('#'):
+            return tokens[:i + 1], ' '.join(normalize_word(t) for t in tokens[i + 1:])
+    if len(tokens) > 1:
+        return tokens[:-1], normalize_word(tokens[-1])
+    return tokens, None
+
+
+def is_state(token):
+    """A real state code; "Ct" ends a street ("5 Oak Ct") unless written as "CT"."""
+    if token.upper() not in US_STATES:
+        return False
+    return token.lower() not in STREET_SUFFIXES or token.isupper()
+
+
+def split_unit(tokens):
+    """Splits a unit designator off the street tokens; returns (street tokens, label, unit)."""
+    for i, token in enumerate(tokens):
+        if token.startswith('#') and i > 0:
+            unit = ' '.join([token[1:]] + tokens[i + 1:]).strip()
+            return tokens[:i], 'Unit', unit.upper() or None
+        label = UNIT_MARKERS.get(token.lower().rstrip('.'))
+        if label and 0 < i < len(tokens) - 1:
+            return tokens[:i], label, ' '.join(tokens[i + 1:]).lstrip('#').upper()
+    return tokens, None, None
+
+
+def normalize_street(tokens):
+    """Expands a leading direction and abbreviates the street suffix."""
+    words = [normalize_word(token.rstrip('.')) for token in tokens]
+    if len(words) > 2 and words[0][:1].isdigit() and words[1].lower() in DIRECTIONS:
+        words[1] = DIRECTIONS[words[1].lower()]
+    if len(words) > 1 and words[-1].lower() in STREET_SUFFIXES:
+        words[-1] = STREET_SUFFIXES[words[-1].lower()]
+    return ' '.join(words) or None
+
+
+@lru_cache(maxsize=4096)
+def normalize_address(address_full):
+    """
+    Parses a one-line address such as "162 East 86th St Unit 7B New York NY 10032".
+    Results are cached by the raw string, since the same office address repeats on every row.
+    """
+    tokens = str(address_full).replace(',', ' ').split()
+    if not tokens:
+        return NormalizedAddress(None, None, None, None, None, None)
+
+    zip_code = tokens.pop() if ZIP_PATTERN.match(tokens[-1]) else None
+    state = tokens.pop().upper() if len(tokens) > 1 and is_state(tokens[-1]) else None
+
+    city = None
+    if state or zip_code:
+        tokens, city = split_city(tokens)
+
+    street_tokens, unit_label, unit = split_unit(tokens)
+    return NormalizedAddress(normalize_street(street_tokens), unit_label, unit, city, state, zip_code)
@@ -0,0 +1,15 @@
+-- DataEpoch: data version per table, used as part of every cached query result key.
+-- The ETL bumps the epoch of each table it wrote to after its run commits, which
+-- invalidates only the cached results that read from those tables.
+CREATE TABLE IF NOT EXISTS DataEpoch (
+    table_name VARCHAR(50) PRIMARY KEY,
+    epoch BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO DataEpoch (table_name) VALUES
+    ('Office'), ('Employee'), ('Client'), ('ClientRole'), ('PropertyType'),
+    ('Property'), ('PropertyFeature'), ('PropertyMedia'), ('Appointment'),
+    ('Transaction'), ('Commission'), ('Lease'), ('PaymentRecord'),
+    ('MarketingCampaign'), ('ClientLead'), ('Document')
+ON CONFLICT (table_name) DO NOTHING;
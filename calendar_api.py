@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+import psycopg2
+from psycopg2 import errors
+from psycopg2.extras import RealDictCursor
+
+from result_cache import bump_data_epochs
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class AppointmentConflictError(Exception):
+    """Raised when a booking overlaps a live appointment of the agent or a showing at the property."""
+
+    def __init__(self, message, conflicts):
+        super().__init__(message)
+        self.conflicts = conflicts
+
+
+class AgentCalendar:
+    """Books appointments and searches agent availability over the range-indexed Appointment table."""
+
+    def __init__(self, db_config):
+        self.db_config = db_config
+        self.conn = None
+        self.cursor = None
+
+    def connect_db(self):
+        """Connects to the database."""
+        try:
+            self.conn = psycopg2.connect(**self.db_config)
+            self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
+            logger.info("Database connection successful.")
+        except Exception as e:
+            logger.error(f"Database connection failed: {e}")
+            raise
+
+    def close_db(self):
+        """Closes the database connection."""
+        if self.cursor:
+            self.cursor.close()
+        if self.conn:
+            self.conn.close()
+        logger.info("Database connection closed.")
+
+    def conflicts(self, agent_id, property_id, start, duration_minutes=60):
+        """Returns live appointments that overlap the proposed booking."""
+        try:
+            self.cursor.execute(
+                "SELECT * FROM appointment_conflicts(%s, %s, %s, %s)",
+                (agent_id, property_id, start, duration_minutes)
+            )
+            return self.cursor.fetchall()
+        finally:
+            self.conn.rollback()
+
+    def book(self, agent_id, client_id, property_id, start, duration_minutes=60,
+             appointment_type='showing', created_by=None, notes=None):
+        """Books an appointment; the exclusion constraints reject double-booking atomically."""
+        try:
+            self.cursor.execute("""
+                INSERT INTO Appointment (
+                    agent_id, client_id, property_id, scheduled_datetime, duration_minutes,
+                    appointment_type, status, notes, created_by
+                ) VALUES (
+                    %s, %s, %s, %s, %s, %s, 'scheduled', %s, %s
+                )
+                RETURNING appointment_id
+            """, (
+                agent_id,
+                client_id,
+                property_id,
+                start,
+                duration_minutes,
+                appointment_type,
+                notes,
+                created_by or agent_id
+            ))
+            appointment_id = self.cursor.fetchone()['appointment_id']
+            bump_data_epochs(self.cursor, ['Appointment'])
+            self.conn.commit()
+            return appointment_id
+        except errors.ExclusionViolation:
+            self.conn.rollback()
+            conflicts = self.conflicts(agent_id, property_id, start, duration_minutes)
+            raise AppointmentConflictError(
+                f"Agent {agent_id} or property {property_id} is already booked at {start:%Y-%m-%d %H:%M}",
+                conflicts
+            )
+        except Exception:
+            # Any other failure would leave the shared connection in an aborted transaction
+            self.conn.rollback()
+            raise
+
+    def free_slots(self, agent_ids, start, end, slot_minutes=60, step_minutes=30,
+                   day_start='09:00', day_end='18:00', include_weekends=False):
+        """Returns free (agent_id, slot_start, slot_end) slots for each agent in the window."""
+        try:
+            self.cursor.execute(
+                "SELECT * FROM agent_free_slots(%s, %s, %s, %s, %s, %s, %s, %s)",
+                (list(agent_ids), start, end, slot_minutes, step_minutes, day_start, day_end, include_weekends)
+            )
+            return self.cursor.fetchall()
+        finally:
+            self.conn.rollback()
+
+    def common_free_slots(self, agent_ids, start, end, slot_minutes=60, step_minutes=30,
+                          day_start='09:00', day_end='18:00', include_weekends=False):
+        """Returns slots in which every given agent is free (e.g. a joint showing)."""
+        agent_ids = list(set(agent_ids))
+        try:
+            self.cursor.execute("""
+                SELECT slot_start, slot_end
+                FROM agent_free_slots(%s, %s, %s, %s, %s, %s, %s, %s)
+                GROUP BY slot_start, slot_end
+                HAVING COUNT(*) = %s
+                ORDER BY slot_start
+            """, (agent_ids, start, end, slot_minutes, step_minutes, day_start, day_end, include_weekends,
+                  len(agent_ids)))
+            return self.cursor.fetchall()
+        finally:
+            self.conn.rollback()
+
+
+def main():
+    """Main function"""
+    from config import DATABASE_CONFIG
+
+    parser = argparse.ArgumentParser(description="Search free appointment slots for agents.")
+    parser.add_argument('agent_ids', type=int, nargs='+')
+    parser.add_argument('--days', type=int, default=7, help="Search window starting tomorrow")
+    parser.add_argument('--slot-minutes', type=int, default=60)
+    parser.add_argument('--common', action='store_true', help="Only slots where all agents are free")
+    args = parser.parse_args()
+
+    start = datetime.combine(datetime.now().date() + timedelta(days=1), datetime.min.time())
+    end = start + timedelta(days=args.days)
+
+    calendar = AgentCalendar(DATABASE_CONFIG)
+    calendar.connect_db()
+    try:
+        if args.common:
+            for slot in calendar.common_free_slots(args.agent_ids, start, end, args.slot_minutes):
+                print(f"{slot['slot_start']:%a %Y-%m-%d %H:%M} - {slot['slot_end']:%H:%M}")
+        else:
+            for slot in calendar.free_slots(args.agent_ids, start, end, args.slot_minutes):
+                print(f"agent {slot['agent_id']:>5}  {slot['slot_start']:%a %Y-%m-%d %H:%M} - {slot['slot_end']:%H:%M}")
+    finally:
+        calendar.close_db()
+
+
+if __name__ == "__main__":
+    main()
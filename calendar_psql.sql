@@ -0,0 +1,91 @@
+-- Agent calendar: range-typed appointment periods with GiST exclusion constraints.
+-- Run after ans_psql.sql. Historical appointments loaded by the ETL have status 'completed'
+-- and are not subject to the double-booking constraints; live bookings are
+-- ('scheduled', 'confirmed').
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+ALTER TABLE Appointment ADD COLUMN IF NOT EXISTS appointment_period TSRANGE
+    GENERATED ALWAYS AS (
+        tsrange(
+            scheduled_datetime,
+            scheduled_datetime + make_interval(mins => COALESCE(duration_minutes, 60)),
+            '[)'
+        )
+    ) STORED;
+
+-- Both constraints are dropped before they are added, so the script can be re-run
+
+-- An agent cannot be booked into two overlapping live appointments
+ALTER TABLE Appointment DROP CONSTRAINT IF EXISTS excl_appointment_agent_overlap;
+ALTER TABLE Appointment ADD CONSTRAINT excl_appointment_agent_overlap
+    EXCLUDE USING gist (agent_id WITH =, appointment_period WITH &&)
+    WHERE (status IN ('scheduled', 'confirmed'));
+
+-- A property cannot host two overlapping live showings
+ALTER TABLE Appointment DROP CONSTRAINT IF EXISTS excl_appointment_property_showing;
+ALTER TABLE Appointment ADD CONSTRAINT excl_appointment_property_showing
+    EXCLUDE USING gist (property_id WITH =, appointment_period WITH &&)
+    WHERE (status IN ('scheduled', 'confirmed') AND appointment_type = 'showing');
+
+-- Busy time for availability search: everything that was not cancelled or missed
+CREATE INDEX IF NOT EXISTS idx_appointment_agent_period ON Appointment
+    USING gist (agent_id, appointment_period)
+    WHERE status NOT IN ('cancelled', 'no_show');
+
+-- Free slots per agent within working hours over [p_from, p_to).
+-- Each candidate slot is checked with one probe of idx_appointment_agent_period.
+CREATE OR REPLACE FUNCTION agent_free_slots(
+    p_agent_ids INTEGER[],
+    p_from TIMESTAMP,
+    p_to TIMESTAMP,
+    p_slot_minutes INTEGER DEFAULT 60,
+    p_step_minutes INTEGER DEFAULT 30,
+    p_day_start TIME DEFAULT '09:00',
+    p_day_end TIME DEFAULT '18:00',
+    p_include_weekends BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (agent_id INTEGER, slot_start TIMESTAMP, slot_end TIMESTAMP) AS $$
+    WITH candidate AS (
+        SELECT a.agent_id,
+               s AS slot_start,
+               s + make_interval(mins => p_slot_minutes) AS slot_end
+        FROM unnest(p_agent_ids) AS a(agent_id)
+        CROSS JOIN generate_series(date_trunc('day', p_from), p_to, INTERVAL '1 day') AS d
+        CROSS JOIN LATERAL generate_series(
+            d::DATE + p_day_start,
+            d::DATE + p_day_end - make_interval(mins => p_slot_minutes),
+            make_interval(mins => p_step_minutes)
+        ) AS s
+        WHERE (p_include_weekends OR EXTRACT(ISODOW FROM d) < 6)
+          AND s >= p_from
+          AND s + make_interval(mins => p_slot_minutes) <= p_to
+    )
+    SELECT c.agent_id, c.slot_start, c.slot_end
+    FROM candidate c
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM Appointment ap
+        WHERE ap.agent_id = c.agent_id
+          AND ap.appointment_period && tsrange(c.slot_start, c.slot_end, '[)')
+          AND ap.status NOT IN ('cancelled', 'no_show')
+    )
+    ORDER BY c.slot_start, c.agent_id;
+$$ LANGUAGE sql STABLE;
+
+-- Live appointments that would collide with a proposed booking (agent or showing property)
+CREATE OR REPLACE FUNCTION appointment_conflicts(
+    p_agent_id INTEGER,
+    p_property_id INTEGER,
+    p_start TIMESTAMP,
+    p_duration_minutes INTEGER DEFAULT 60
+)
+RETURNS SETOF Appointment AS $$
+    SELECT ap.*
+    FROM Appointment ap
+    WHERE ap.appointment_period && tsrange(p_start, p_start + make_interval(mins => p_duration_minutes), '[)')
+      AND ap.status IN ('scheduled', 'confirmed')
+      AND (ap.agent_id = p_agent_id
+           OR (ap.property_id = p_property_id AND ap.appointment_type = 'showing'))
+    ORDER BY ap.scheduled_datetime;
+$$ LANGUAGE sql STABLE;
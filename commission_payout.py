@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import calendar
+import csv
+import logging
+import os
+from datetime import date
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from result_cache import bump_data_epochs
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Per-agent rows and per-office subtotals from one scan of the run's lines
+STATEMENT_SQL = """
+    SELECT l.office_id,
+           o.office_name,
+           l.agent_id,
+           MAX(e.first_name || ' ' || e.last_name) AS agent_name,
+           GROUPING(l.agent_id) = 1 AS is_office_total,
+           COUNT(DISTINCT l.transaction_id) AS transactions,
+           COUNT(*) FILTER (WHERE l.agent_role = 'listing') AS listing_sides,
+           COUNT(*) FILTER (WHERE l.agent_role = 'selling') AS selling_sides,
+           SUM(l.gross_amount) AS gross_amount,
+           SUM(l.office_share) AS office_share,
+           SUM(l.agent_net) AS agent_net
+    FROM CommissionPayoutLine l
+    JOIN Office o ON o.office_id = l.office_id
+    JOIN Employee e ON e.employee_id = l.agent_id
+    WHERE l.run_id = %s
+    GROUP BY GROUPING SETS ((l.office_id, o.office_name, l.agent_id), (l.office_id, o.office_name))
+    ORDER BY o.office_name, is_office_total, agent_name
+"""
+
+
+class CommissionPayoutEngine:
+    """Runs monthly commission payouts in one transaction and produces agent/office statements."""
+
+    def __init__(self, db_config, expected_rate=6.0, rate_tolerance_pct=20.0):
+        self.db_config = db_config
+        self.expected_rate = expected_rate
+        self.rate_tolerance_pct = rate_tolerance_pct
+        self.conn = None
+        self.cursor = None
+
+    def connect_db(self):
+        """Connects to the database."""
+        try:
+            self.conn = psycopg2.connect(**self.db_config)
+            self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
+            logger.info("Database connection successful.")
+        except Exception as e:
+            logger.error(f"Database connection failed: {e}")
+            raise
+
+    def close_db(self):
+        """Closes the database connection."""
+        if self.cursor:
+            self.cursor.close()
+        if self.conn:
+            self.conn.close()
+        logger.info("Database connection closed.")
+
+    def run(self, period_start, period_end, payout_date=None, approve_only=False):
+        """Reconciles, approves and pays eligible commissions; returns the run, statements and exceptions."""
+        try:
+            self.cursor.execute(
+                "SELECT run_commission_payout(%s, %s, %s, %s, %s, %s) AS run_id",
+                (period_start, period_end, payout_date or date.today(), approve_only,
+                 self.expected_rate, self.rate_tolerance_pct)
+            )
+            run_id = self.cursor.fetchone()['run_id']
+
+            self.cursor.execute("SELECT * FROM CommissionPayoutRun WHERE run_id = %s", (run_id,))
+            run = self.cursor.fetchone()
+
+            self.cursor.execute(STATEMENT_SQL, (run_id,))
+            statements = self.cursor.fetchall()
+
+            self.cursor.execute(
+                "SELECT * FROM CommissionPayoutException WHERE run_id = %s ORDER BY commission_id", (run_id,)
+            )
+            exceptions = self.cursor.fetchall()
+
+            bump_data_epochs(self.cursor, ['Commission'])
+            self.conn.commit()
+        except Exception as e:
+            logger.error(f"Payout run failed, nothing was changed: {e}")
+            self.conn.rollback()
+            raise
+
+        logger.info(
+            f"Payout run {run_id}: {run['commissions_count']} commissions {run['final_status']}, "
+            f"gross {run['total_gross']}, {run['exceptions_count']} held for review."
+        )
+        return run, statements, exceptions
+
+    def write_statements(self, run, statements, exceptions, output_dir):
+        """Writes agent statements, office totals and exceptions of a run to CSV files."""
+        os.makedirs(output_dir, exist_ok=True)
+        prefix = os.path.join(output_dir, f"payout_run_{run['run_id']}")
+
+        agent_rows = [row for row in statements if not row['is_office_total']]
+        office_rows = [row for row in statements if row['is_office_total']]
+        for suffix, rows in (('agents', agent_rows), ('offices', office_rows), ('exceptions', exceptions)):
+            with open(f"{prefix}_{suffix}.csv", 'w', newline='', encoding='utf-8') as f:
+                if rows:
+                    writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+                    writer.writeheader()
+                    writer.writerows(rows)
+        logger.info(f"Statements written to {prefix}_*.csv")
+
+
+def main():
+    """Main function"""
+    from config import DATABASE_CONFIG
+
+    parser = argparse.ArgumentParser(description="Monthly commission payout run.")
+    parser.add_argument('month', help="Closing month to pay out, YYYY-MM")
+    parser.add_argument('--approve-only', action='store_true', help="Stop at 'approved' for review")
+    parser.add_argument('--payout-date', type=date.fromisoformat)
+    parser.add_argument('--rate-tolerance', type=float, default=20.0,
+                        help="Allowed %% deviation of the total from the rate-based commission")
+    parser.add_argument('--output-dir', default='payout_statements')
+    args = parser.parse_args()
+
+    year, month = map(int, args.month.split('-'))
+    period_start = date(year, month, 1)
+    period_end = date(year, month, calendar.monthrange(year, month)[1])
+
+    engine = CommissionPayoutEngine(DATABASE_CONFIG, rate_tolerance_pct=args.rate_tolerance)
+    engine.connect_db()
+    try:
+        run, statements, exceptions = engine.run(period_start, period_end, args.payout_date, args.approve_only)
+        engine.write_statements(run, statements, exceptions, args.output_dir)
+    finally:
+        engine.close_db()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,697 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import os
+import re
+import resource
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor
+
+from address_normalizer import normalize_address
+from etl_loader import load_etl_class
+from migrate import Migrator
+from synthetic_data import SOURCE_CSV, synthesize_records
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [100, 1000, 5000]
+HISTORY_PATH = 'etl_benchmark_history.json'
+
+HELPER_PREFIXES = ('parse_', 'safe_', 'map_')
+
+# Source columns each helper is fed by the ETL
+HELPER_COLUMNS = {
+    'parse_address': ['property_address_full', 'listing_office_address'],
+    'parse_appointment_history': ['appointment_history'],
+    'parse_bed_bath_info': ['bed_bath_info'],
+    'parse_client_info': ['client_buyer_info', 'client_seller_info'],
+    'parse_commission_split': ['commission_split_info'],
+    'parse_documents_required': ['documents_required'],
+    'parse_name': ['listing_agent_name', 'selling_agent_name'],
+    'safe_date': ['listing_date', 'offer_date', 'accepted_date', 'closing_date', 'inspection_date'],
+    'safe_decimal': ['list_price', 'offer_amount', 'final_price', 'commission_total', 'monthly_rent',
+                     'security_deposit', 'marketing_spend', 'appraisal_amount'],
+    'safe_int': ['square_feet'],
+    'safe_text': ['notes_agent', 'notes_transaction', 'special_conditions'],
+    'map_campaign_type': ['campaign_type'],
+    'map_lead_source': ['lead_source'],
+    'map_payout_status': ['payout_status'],
+    'map_property_type': ['property_type'],
+    'map_transaction_status': ['status_current'],
+    'map_transaction_status_enum': ['status_current'],
+}
+
+# Malformed values seen in, or plausible for, the legacy feeds
+COMMON_MESSY = [None, float('nan'), '', '   ', 'N/A']
+MESSY_INPUTS = {
+    'parse_address': ['350 E 86th Street Apt 5, New York, NY 10028', '1 Main St #4F Jersey City NJ 07302',
+                      'Brooklyn', '12 Broadway,,NY'],
+    'parse_appointment_history': ['11/22/24 - Initial showing - With advisor - Had concerns | 12/1/24 - Second visit',
+                                  '13/45/24 - Initial showing', 'called back - no answer'],
+    'parse_bed_bath_info': ['Studio/1BA', '3BR/2.5BA', '3 BR / 2 BA', 'Loft'],
+    'parse_client_info': ['Jane Doe | Engineer | Budget 1.2M-1.5M | Pre-approved', 'Jane Doe | Budget 800K-',
+                          'Jane Doe | Budget abc-def', 'Jane Doe'],
+    'parse_commission_split': ['Listing: 15525, Selling: 15525', 'Listing: n/a', 'Selling: 12,000'],
+    'parse_documents_required': ['Survey, Title Report, Appraisal', 'Contract,,Inspection', 'Deed'],
+    'parse_name': ["Mary Ann O'Neil", 'Cher', ' Dr.  John   Smith '],
+    'safe_date': ['2024/12/1', '12/1/2024', '1/18/25', 'Nov 14 2024', '2024-13-45', 'TBD'],
+    'safe_decimal': ['$1,250,000', '1.2M', '  450000 ', 'abc', 1250000.0],
+    'safe_int': ['1,200', '850.0', 'approx 900', 1200.0],
+}
+
+# metric -> (direction that is worse, threshold option)
+LOAD_LIMITS = {
+    'rows_per_second': ('lower', 'max_slowdown'),
+    'statements_per_row': ('higher', 'max_statement_growth'),
+    'commits_per_row': ('higher', 'max_statement_growth'),
+    'rss_growth_bytes': ('higher', 'max_memory_growth'),
+}
+
+LOOKUP_STATEMENT = re.compile(r'^\s*SELECT\s+\w+\s+FROM\s', re.IGNORECASE)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None for an empty list)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)]
+
+
+def latency_summary(values):
+    """Mean and tail latencies in milliseconds."""
+    if not values:
+        return {}
+    return {
+        'mean_ms': round(1000 * sum(values) / len(values), 4),
+        'p50_ms': round(1000 * percentile(values, 50), 4),
+        'p95_ms': round(1000 * percentile(values, 95), 4),
+        'p99_ms': round(1000 * percentile(values, 99), 4),
+    }
+
+
+class LoadStats:
+    """Statement, commit and timing counters collected while the ETL runs."""
+
+    def __init__(self):
+        # Stage seconds are exclusive: time spent in a nested stage is not counted in its parent
+        self.seconds = {}
+        self.db_seconds = {}
+        self.helper_seconds = {}
+        self.statements = {}
+        self.statement_latencies = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.helper_calls = 0
+        self.row_latencies = []
+        self._stack = []
+        self._row_started = None
+        self._helper_depth = 0
+
+    @property
+    def stage_name(self):
+        return self._stack[-1] if self._stack else 'other'
+
+    @contextmanager
+    def stage(self, name):
+        parent = self.stage_name if self._stack else None
+        self._stack.append(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._stack.pop()
+            self.seconds[name] = self.seconds.get(name, 0.0) + elapsed
+            if parent:
+                self.seconds[parent] = self.seconds.get(parent, 0.0) - elapsed
+
+    def add_db_time(self, elapsed):
+        name = self.stage_name
+        self.db_seconds[name] = self.db_seconds.get(name, 0.0) + elapsed
+
+    def record_statement(self, statement, elapsed):
+        kind = statement.split(None, 1)[0].upper() if statement.strip() else 'EMPTY'
+        self.statements[kind] = self.statements.get(kind, 0) + 1
+        self.statement_latencies.append(elapsed)
+        self.add_db_time(elapsed)
+
+    @contextmanager
+    def helper(self):
+        # Only the outermost helper call is timed, so nested helpers are not counted twice
+        self._helper_depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._helper_depth -= 1
+            if not self._helper_depth:
+                name = self.stage_name
+                self.helper_seconds[name] = self.helper_seconds.get(name, 0.0) + time.perf_counter() - started
+                self.helper_calls += 1
+
+    def row_started(self):
+        now = time.perf_counter()
+        if self._row_started is not None:
+            self.row_latencies.append(now - self._row_started)
+        self._row_started = now
+
+    def rows_finished(self):
+        if self._row_started is not None:
+            self.row_latencies.append(time.perf_counter() - self._row_started)
+            self._row_started = None
+
+    def summary(self, rows, processed, elapsed):
+        """Per-run metrics; counts are normalized per input row."""
+        statement_count = sum(self.statements.values())
+        stages = {}
+        for name, seconds in self.seconds.items():
+            db = self.db_seconds.get(name, 0.0)
+            helpers = self.helper_seconds.get(name, 0.0)
+            stages[name] = {
+                'seconds': round(seconds, 4),
+                'db_seconds': round(db, 4),
+                'parse_seconds': round(helpers, 4),
+                'python_seconds': round(seconds - db - helpers, 4),
+            }
+        return {
+            'rows': rows,
+            'processed': processed,
+            'seconds': round(elapsed, 4),
+            'rows_per_second': round(rows / elapsed, 2) if elapsed else None,
+            'statements': statement_count,
+            'statements_by_kind': dict(sorted(self.statements.items())),
+            'statements_per_row': round(statement_count / rows, 3) if rows else None,
+            'commits': self.commits,
+            'rollbacks': self.rollbacks,
+            'commits_per_row': round(self.commits / rows, 3) if rows else None,
+            'helper_calls': self.helper_calls,
+            'stages': stages,
+            'row_latency': latency_summary(self.row_latencies),
+            'statement_latency': latency_summary(self.statement_latencies),
+        }
+
+
+class CountingCursor:
+    """Cursor proxy that counts and times every statement."""
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def execute(self, statement, params=None):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(statement, params)
+        finally:
+            self._stats.record_statement(statement, time.perf_counter() - started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return self._cursor.fetchone()
+        finally:
+            self._stats.add_db_time(time.perf_counter() - started)
+
+
+class CountingConnection:
+    """Connection proxy that counts and times commits and rollbacks."""
+
+    def __init__(self, conn, stats):
+        self._conn = conn
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        if name.startswith('_'):
+            super().__setattr__(name, value)
+        else:
+            setattr(self._conn, name, value)
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._conn.cursor(*args, **kwargs), self._stats)
+
+    def commit(self):
+        started = time.perf_counter()
+        self._conn.commit()
+        self._stats.add_db_time(time.perf_counter() - started)
+        self._stats.commits += 1
+
+    def rollback(self):
+        started = time.perf_counter()
+        self._conn.rollback()
+        self._stats.add_db_time(time.perf_counter() - started)
+        self._stats.rollbacks += 1
+
+
+class SinkRow(dict):
+    """Result row of the database-free sink: any requested key yields a new id."""
+
+    def __init__(self, ids):
+        super().__init__()
+        self._ids = ids
+
+    def __missing__(self, key):
+        return next(self._ids)
+
+
+class SinkCursor:
+    """
+    Accepts statements without a database. Lookups (SELECT col FROM ...) miss the first time
+    a given statement and parameters are seen and hit afterwards; everything else returns a row,
+    so the ETL follows the same insert-then-reuse paths it takes against an empty database.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = -1
+        self._row = None
+
+    def execute(self, statement, params=None):
+        key = (statement, repr(params))
+        if LOOKUP_STATEMENT.match(statement):
+            self._row = SinkRow(self.connection.ids) if key in self.connection.seen else None
+            self.connection.seen.add(key)
+        else:
+            self._row = SinkRow(self.connection.ids)
+        self.rowcount = 1
+
+    def fetchone(self):
+        row, self._row = self._row, None
+        return row
+
+    def close(self):
+        pass
+
+
+class SinkConnection:
+    """Connection of the database-free sink."""
+
+    def __init__(self):
+        self.autocommit = False
+        self.seen = set()
+        self.ids = iter(range(1, 2 ** 62))
+
+    def cursor(self, *args, **kwargs):
+        return SinkCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def instrumented_etl_class(sink=False):
+    """Returns an EnhancedDreamHomesETL subclass that reports into a LoadStats instance."""
+    base = load_etl_class()
+
+    class BenchmarkETL(base):
+        def __init__(self, db_config, stats):
+            super().__init__(db_config)
+            self.stats = stats
+            self.processed = None
+
+        def connect_db(self):
+            with self.stats.stage('connect'):
+                conn = SinkConnection() if sink else psycopg2.connect(**self.db_config)
+                self.conn = CountingConnection(conn, self.stats)
+                self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
+
+        def load_dataframe(self, df):
+            with self.stats.stage('rows'):
+                try:
+                    self.processed = super().load_dataframe(df)
+                    return self.processed
+                finally:
+                    self.stats.rows_finished()
+
+        def validate_batch(self, df):
+            with self.stats.stage('validate'):
+                return super().validate_batch(df)
+
+        def insert_or_get_office(self, office_name, office_address, office_phone):
+            # Called first for every record, so consecutive calls delimit one row
+            self.stats.row_started()
+            return super().insert_or_get_office(office_name, office_address, office_phone)
+
+        def refresh_rent_roll(self, lease_ids):
+            self.stats.rows_finished()
+            with self.stats.stage('rent_roll'):
+                return super().refresh_rent_roll(lease_ids)
+
+        def bump_data_epochs(self):
+            with self.stats.stage('epochs'):
+                return super().bump_data_epochs()
+
+    def timed(method):
+        def wrapper(self, *args, **kwargs):
+            with self.stats.helper():
+                return method(self, *args, **kwargs)
+        wrapper.__name__ = method.__name__
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+
+    for name in dir(base):
+        if name.startswith(HELPER_PREFIXES) and callable(getattr(base, name)):
+            setattr(BenchmarkETL, name, timed(getattr(base, name)))
+    return BenchmarkETL
+
+
+def measure_load(db_config, csv_path, rows, sink=False, trace_memory=False, etl_log_level='WARNING'):
+    """
+    Runs process_data once over csv_path and returns its metrics.
+    Meant to run in a fresh process, so peak RSS belongs to this load alone.
+    """
+    logging.getLogger('etl_enhanced').setLevel(etl_log_level)
+    normalize_address.cache_clear()
+    stats = LoadStats()
+    etl = instrumented_etl_class(sink)(db_config, stats)
+
+    rss_baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with stats.stage('total'):
+        etl.process_data(csv_path)
+    elapsed = time.perf_counter() - started
+
+    result = stats.summary(rows, etl.processed, elapsed)
+    # process_data reads the CSV and closes the connection outside the instrumented stages
+    result['stages']['read_close'] = result['stages'].pop('total')
+    result['rss_baseline_bytes'] = rss_baseline
+    result['rss_peak_bytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    result['rss_growth_bytes'] = result['rss_peak_bytes'] - rss_baseline
+    if trace_memory:
+        result['python_heap_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def run_isolated(func, *args, **kwargs):
+    """Runs func in a freshly spawned process and returns its result."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(func, *args, **kwargs).result()
+
+
+def benchmark_helpers(source, repeat=5):
+    """Times every parse_*/safe_*/map_* helper over the feed's values plus malformed inputs (ns per call)."""
+    etl = load_etl_class()({})
+    results = {}
+    for name in sorted(dir(etl)):
+        if not name.startswith(HELPER_PREFIXES) or not callable(getattr(etl, name)):
+            continue
+        helper = getattr(etl, name)
+        inputs = []
+        for column in HELPER_COLUMNS.get(name, []):
+            if column in source.columns:
+                inputs.extend(source[column].tolist())
+        inputs.extend(MESSY_INPUTS.get(name, []))
+        inputs.extend(COMMON_MESSY)
+
+        best = None
+        for _ in range(repeat):
+            # parse_address is memoized; each pass starts cold like a new ETL run
+            normalize_address.cache_clear()
+            started = time.perf_counter()
+            for value in inputs:
+                try:
+                    helper(value)
+                except Exception:
+                    pass
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = {'calls': len(inputs), 'ns_per_call': round(best * 1e9 / len(inputs), 1)}
+    return results
+
+
+class TemporaryCluster:
+    """A throwaway Postgres cluster (initdb + pg_ctl) in a temporary directory."""
+
+    def __init__(self, bin_dir=None):
+        self.bin_dir = bin_dir
+        self.data_dir = None
+        self.port = None
+
+    def command(self, name):
+        return os.path.join(self.bin_dir, name) if self.bin_dir else name
+
+    def start(self):
+        self.data_dir = tempfile.mkdtemp(prefix='etl_bench_pg_')
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            self.port = probe.getsockname()[1]
+        subprocess.run([self.command('initdb'), '-D', self.data_dir, '-U', 'postgres', '-A', 'trust'],
+                       check=True, capture_output=True)
+        subprocess.run([
+            self.command('pg_ctl'), '-D', self.data_dir, '-w', '-l', os.path.join(self.data_dir, 'server.log'),
+            '-o', f"-p {self.port} -k {self.data_dir} -c listen_addresses=''", 'start'
+        ], check=True, capture_output=True)
+        logger.info(f"Temporary cluster started on port {self.port} ({self.data_dir}).")
+        return {'host': self.data_dir, 'port': self.port, 'user': 'postgres', 'database': 'postgres'}
+
+    def stop(self):
+        if not self.data_dir:
+            return
+        subprocess.run([self.command('pg_ctl'), '-D', self.data_dir, '-m', 'fast', 'stop'], capture_output=True)
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+        logger.info("Temporary cluster removed.")
+        self.data_dir = None
+
+
+class ScratchDatabases:
+    """
+    Builds the ETL schema once in a template database and hands out fresh copies of it.
+    The template is built by migrate.py, so it has the production schema: the baseline scripts
+    in V0001's SCRIPTS order (triggers and exclusion constraints included) and every later migration.
+    """
+
+    def __init__(self, db_config, prefix='etl_bench'):
+        self.db_config = dict(db_config)
+        self.db_config.pop('dbname', None)
+        self.prefix = prefix
+        self.template = f"{prefix}_template"
+        self.created = []
+
+    def config(self, database):
+        config = dict(self.db_config)
+        config['database'] = database
+        return config
+
+    def admin(self, statement, database):
+        conn = psycopg2.connect(**self.config('postgres'))
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(sql.SQL(statement).format(sql.Identifier(database), sql.Identifier(self.template)))
+        finally:
+            conn.close()
+
+    def create_template(self):
+        self.admin("DROP DATABASE IF EXISTS {0}", self.template)
+        self.admin("CREATE DATABASE {0}", self.template)
+        self.created.append(self.template)
+        migrator = Migrator(self.config(self.template), throttle=0)
+        migrator.connect_db()
+        try:
+            versions = migrator.migrate()
+        finally:
+            migrator.close_db()
+        logger.info(f"Schema template {self.template} built by migrations V{versions[0]:04d}-V{versions[-1]:04d}.")
+
+    def fresh(self, name):
+        """Returns the config of a new, empty copy of the template."""
+        database = f"{self.prefix}_{name}"
+        self.admin("DROP DATABASE IF EXISTS {0}", database)
+        self.admin("CREATE DATABASE {0} TEMPLATE {1}", database)
+        self.created.append(database)
+        return self.config(database)
+
+    def drop_all(self):
+        for database in reversed(self.created):
+            self.admin("DROP DATABASE IF EXISTS {0}", database)
+        self.created = []
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def find_regressions(run, history, limits, window=5):
+    """
+    Compares a run against the median of the last `window` clean runs on the same target.
+    Returns one message per metric that moved the wrong way by more than its threshold.
+    """
+    clean = [entry for entry in history if entry['target'] == run['target'] and not entry.get('regressions')]
+    messages = []
+
+    for load in run['loads']:
+        previous = [l for entry in clean for l in entry['loads'] if l['rows'] == load['rows']][-window:]
+        for metric, (worse, option) in LOAD_LIMITS.items():
+            values = [l[metric] for l in previous if l.get(metric) is not None]
+            if not values or load.get(metric) is None:
+                continue
+            baseline = median(values)
+            if _regressed(load[metric], baseline, worse, limits[option]):
+                messages.append(f"{load['rows']} rows: {metric} {load[metric]} vs baseline {baseline}")
+
+    for name, current in run.get('helpers', {}).items():
+        values = [entry['helpers'][name]['ns_per_call'] for entry in clean
+                  if name in entry.get('helpers', {})][-window:]
+        if values and _regressed(current['ns_per_call'], median(values), 'higher', limits['max_helper_slowdown']):
+            messages.append(f"{name}: {current['ns_per_call']} ns/call vs baseline {median(values)}")
+    return messages
+
+
+def _regressed(value, baseline, worse, threshold):
+    if worse == 'lower':
+        return value < baseline * (1 - threshold)
+    # A zero baseline (e.g. no memory growth) only regresses on a real increase
+    return value > baseline * (1 + threshold) and value > baseline
+
+
+def log_run(run):
+    for load in run['loads']:
+        logger.info(
+            f"{load['rows']:>7} rows  {load['rows_per_second']:>9} rows/s  "
+            f"{load['statements_per_row']:>6} stmts/row  {load['commits_per_row']:>5} commits/row  "
+            f"peak RSS +{load['rss_growth_bytes'] / 2 ** 20:.1f} MiB  row p95 {load['row_latency'].get('p95_ms')} ms"
+        )
+        for name, stage in sorted(load['stages'].items(), key=lambda item: -item[1]['seconds']):
+            logger.info(f"          {name:<10} {stage['seconds']:>9.3f}s  db {stage['db_seconds']:.3f}s  "
+                        f"parse {stage['parse_seconds']:.3f}s  python {stage['python_seconds']:.3f}s")
+    for name, helper in run.get('helpers', {}).items():
+        logger.info(f"{name:<28} {helper['ns_per_call']:>10} ns/call over {helper['calls']} inputs")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark ETL throughput, round trips and memory.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--target', choices=['server', 'temp-cluster', 'sink'], default='server',
+                        help="Scratch databases on the configured server, a throwaway initdb cluster, "
+                             "or a database-free sink")
+    parser.add_argument('--pg-bin', help="Directory of initdb/pg_ctl for --target temp-cluster")
+    parser.add_argument('--repeat', type=int, default=1, help="Loads per size; the median run is kept")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--source', default=SOURCE_CSV)
+    parser.add_argument('--skip-helpers', action='store_true')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Also record the Python heap peak with tracemalloc (slows the load)")
+    parser.add_argument('--keep', action='store_true', help="Keep the scratch databases")
+    parser.add_argument('--history', default=HISTORY_PATH)
+    parser.add_argument('--no-record', action='store_true')
+    parser.add_argument('--window', type=int, default=5)
+    parser.add_argument('--max-slowdown', type=float, default=0.15)
+    parser.add_argument('--max-statement-growth', type=float, default=0.0)
+    parser.add_argument('--max-memory-growth', type=float, default=0.25)
+    parser.add_argument('--max-helper-slowdown', type=float, default=0.25)
+    args = parser.parse_args()
+
+    source = pd.read_csv(args.source)
+    run = {
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'target': args.target,
+        'seed': args.seed,
+        'loads': [],
+    }
+
+    cluster = TemporaryCluster(args.pg_bin) if args.target == 'temp-cluster' else None
+    databases = None
+    work_dir = tempfile.mkdtemp(prefix='etl_bench_')
+    try:
+        if args.target == 'sink':
+            db_config = {}
+        else:
+            if cluster:
+                admin_config = cluster.start()
+            else:
+                from config import DATABASE_CONFIG
+                admin_config = DATABASE_CONFIG
+            databases = ScratchDatabases(admin_config)
+            databases.create_template()
+
+        for rows in args.sizes:
+            csv_path = os.path.join(work_dir, f"records_{rows}.csv")
+            synthesize_records(source, rows, args.seed).to_csv(csv_path, index=False)
+            results = []
+            for attempt in range(args.repeat):
+                if databases:
+                    db_config = databases.fresh(f"{rows}_{attempt}")
+                results.append(run_isolated(measure_load, db_config, csv_path, rows,
+                                            args.target == 'sink', args.trace_memory))
+            results.sort(key=lambda result: result['rows_per_second'])
+            run['loads'].append(results[len(results) // 2])
+
+        if not args.skip_helpers:
+            run['helpers'] = benchmark_helpers(source)
+    finally:
+        if databases and not args.keep:
+            databases.drop_all()
+        if cluster and not args.keep:
+            cluster.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    log_run(run)
+
+    history = load_history(args.history)
+    run['regressions'] = find_regressions(run, history, vars(args), args.window)
+    if not args.no_record:
+        history.append(run)
+        with open(args.history, 'w', encoding='utf-8') as f:
+            json.dump(history, f, indent=2)
+        logger.info(f"Recorded run in {args.history}")
+
+    if run['regressions']:
+        for message in run['regressions']:
+            logger.error(f"Regression: {message}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,23 +5,41 @@ import pandas as pd
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import logging
+import os
 import re
 from datetime import datetime, timedelta
 import json
 from decimal import Decimal
 
+from address_normalizer import normalize_address
+from media_store import blob_url, register_templates
+from result_cache import bump_data_epochs
+from validation import PreloadValidator
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class EnhancedDreamHomesETL:
-    def __init__(self, db_config):
+    def __init__(self, db_config, rejects_path=None, media_store=None):
         """
         Initializes the enhanced ETL class.
+        rejects_path: optional CSV file that collects rows rejected by pre-load validation.
+        media_store: optional media_store.BlobStore; boilerplate media and documents then
+        reference one shared blob per template file instead of a per-row placeholder path.
         """
         self.db_config = db_config
         self.conn = None
         self.cursor = None
+        self.validator = PreloadValidator(self)
+        self.rejects_path = rejects_path
+        # Tables written during this run; their data epochs are bumped at the end
+        self.touched_tables = set()
+        # (state, zip_code) -> Location.location_id for this run
+        self.location_ids = {}
+        self.media_store = media_store
+        # Template path under media_templates/ -> (sha256, size_bytes), registered once per run
+        self.template_blobs = {}
         
     def connect_db(self):
         """Connects to the database."""
@@ -41,6 +59,25 @@ class EnhancedDreamHomesETL:
             self.conn.close()
         logger.info("Database connection closed.")
     
+    def mark_touched(self, *tables):
+        """Records tables changed by the last statement."""
+        if self.cursor.rowcount and self.cursor.rowcount > 0:
+            self.touched_tables.update(tables)
+    
+    def bump_data_epochs(self):
+        """Bumps the data epoch of every table written in this run (invalidates cached results)."""
+        if not self.touched_tables:
+            return
+        
+        try:
+            bump_data_epochs(self.cursor, self.touched_tables)
+            self.conn.commit()
+            logger.info(f"Bumped data epochs for: {', '.join(sorted(self.touched_tables))}")
+            self.touched_tables.clear()
+        except Exception as e:
+            logger.warning(f"Failed to bump data epochs: {e}")
+            self.conn.rollback()
+    
     # Reuse existing mapping and parsing functions
     def parse_bed_bath_info(self, bed_bath_str):
         """Parses bed/bath information."""
@@ -70,32 +107,9 @@ class EnhancedDreamHomesETL:
         if pd.isna(address_full) or not address_full:
             return None, None, None, None
         
-        parts = str(address_full).strip().split()
-        
-        if len(parts) >= 4:
-            zip_code = parts[-1]
-            state = parts[-2]
-            
-            city_parts = []
-            address_parts = []
-            found_city = False
-            
-            for i in range(len(parts) - 3, -1, -1):
-                if not found_city and parts[i][0].isupper():
-                    city_parts.insert(0, parts[i])
-                    if i == 0 or not parts[i-1][0].isupper():
-                        found_city = True
-                elif found_city:
-                    address_parts.insert(0, parts[i])
-                else:
-                    address_parts.insert(0, parts[i])
-            
-            address = ' '.join(address_parts) if address_parts else None
-            city = ' '.join(city_parts) if city_parts else None
-            
-            return address, city, state, zip_code
-        
-        return address_full, None, None, None
+        # Memoized by raw string in address_normalizer
+        normalized = normalize_address(str(address_full).strip())
+        return normalized.line, normalized.city, normalized.state, normalized.zip_code
     
     def parse_name(self, name_str):
         """Parses a name."""
@@ -280,6 +294,13 @@ class EnhancedDreamHomesETL:
         except:
             return None
     
+    def safe_text(self, value):
+        """Safely converts a free-text value to a stripped string."""
+        if pd.isna(value):
+            return None
+        text = str(value).strip()
+        return text or None
+    
     def map_lead_source(self, lead_source):
         """Maps lead source."""
         if not lead_source:
@@ -364,14 +385,50 @@ class EnhancedDreamHomesETL:
         
         return campaign_mapping.get(clean_type, 'online')
     
+    def get_location_id(self, city, state, zip_code):
+        """Returns the Location key of a zip code, looked up once per run."""
+        if not state or not zip_code:
+            return None
+        
+        key = (state, zip_code)
+        if key not in self.location_ids:
+            self.cursor.execute("""
+                SELECT get_or_create_location(%s, %s, %s) AS location_id
+            """, (city, state, zip_code))
+            self.location_ids[key] = self.cursor.fetchone()['location_id']
+            self.mark_touched('Location')
+        
+        return self.location_ids[key]
+    
+    def register_media_templates(self):
+        """Stores the boilerplate media and document templates once and commits their MediaBlob rows."""
+        if not self.media_store:
+            return
+        
+        try:
+            self.template_blobs = register_templates(self.cursor, self.media_store)
+            self.conn.commit()
+            if self.template_blobs:
+                self.touched_tables.add('MediaBlob')
+            logger.info(f"Registered {len(self.template_blobs)} media templates.")
+        except Exception as e:
+            logger.warning(f"Media template registration failed: {e}")
+            self.conn.rollback()
+            self.template_blobs = {}
+    
+    def template_blob(self, template_path, fallback_path):
+        """Returns (file path, size, sha256) of a registered template, or the placeholder path."""
+        if template_path in self.template_blobs:
+            sha256, size = self.template_blobs[template_path]
+            return blob_url(sha256), size, sha256
+        return fallback_path, None, None
+    
     # Reuse existing insert functions (simplified, details omitted here)
     def insert_or_get_office(self, office_name, office_address, office_phone):
         """Inserts or gets an office ID (reuses original implementation)."""
         if not office_name:
             return None
             
-        address, city, state, zip_code = self.parse_address(office_address)
-        
         self.cursor.execute("""
             SELECT office_id FROM Office WHERE office_name = %s
         """, (office_name,))
@@ -380,22 +437,29 @@ class EnhancedDreamHomesETL:
         if result:
             return result['office_id']
         
+        address, city, state, zip_code = self.parse_address(office_address)
+        city, state, zip_code = city or 'New York', state or 'NY', zip_code or '10001'
+        
         office_code = office_name.replace(' ', '').replace('Dream', 'DH').replace('Homes', '')[:10]
         
         self.cursor.execute("""
-            INSERT INTO Office (office_code, office_name, address, city, state, zip_code, phone, email)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            INSERT INTO Office (
+                office_code, office_name, address, city, state, zip_code, location_id, phone, email
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
             RETURNING office_id
         """, (
             office_code,
             office_name,
             address or office_address,
-            city or 'New York',
-            state or 'NY',
-            zip_code or '10001',
+            city,
+            state,
+            zip_code,
+            self.get_location_id(city, state, zip_code),
             office_phone,
             f"info@{office_code.lower()}.com"
         ))
+        self.mark_touched('Office')
         
         return self.cursor.fetchone()['office_id']
     
@@ -431,6 +495,7 @@ class EnhancedDreamHomesETL:
             office_id,
             commission_rate or 3.0
         ))
+        self.mark_touched('Employee')
         
         return self.cursor.fetchone()['employee_id']
     
@@ -481,6 +546,7 @@ class EnhancedDreamHomesETL:
             VALUES (%s, %s)
             ON CONFLICT (client_id, role_type) DO NOTHING
         """, (client_id, role_type))
+        self.mark_touched('Client', 'ClientRole')
         
         return client_id
     
@@ -504,12 +570,13 @@ class EnhancedDreamHomesETL:
             mapped_type,
             f"Property type: {mapped_type}"
         ))
+        self.mark_touched('PropertyType')
         
         return self.cursor.fetchone()['type_id']
     
     # New functions to handle missing tables
     def insert_appointments(self, appointment_history, agent_id, client_id, property_id):
-        """Inserts appointment records."""
+        """Inserts appointment records; appointments already loaded are skipped (reloads are idempotent)."""
         appointments = self.parse_appointment_history(appointment_history)
         
         for appointment in appointments:
@@ -521,6 +588,8 @@ class EnhancedDreamHomesETL:
                     ) VALUES (
                         %s, %s, %s, %s, %s, 'completed', %s, %s, %s
                     )
+                    ON CONFLICT (agent_id, client_id, property_id, scheduled_datetime, md5(notes))
+                        WHERE status = 'completed' DO NOTHING
                 """, (
                     agent_id,
                     client_id,
@@ -531,6 +600,7 @@ class EnhancedDreamHomesETL:
                     appointment['outcome'],
                     agent_id
                 ))
+                self.mark_touched('Appointment')
             except Exception as e:
                 logger.warning(f"Failed to insert appointment record: {e}")
     
@@ -578,56 +648,72 @@ class EnhancedDreamHomesETL:
                 selling_amount,
                 self.map_payout_status(payout_status)
             ))
+            self.mark_touched('Commission')
         except Exception as e:
             logger.warning(f"Failed to insert commission record: {e}")
     
     def insert_documents(self, documents_required, transaction_id, property_id, 
                        inspection_date, appraisal_amount, uploaded_by):
-        """Inserts document records."""
+        """Inserts document records; documents already loaded for the transaction are skipped."""
         documents = self.parse_documents_required(documents_required)
         
         for doc in documents:
             try:
+                slug = doc['name'].lower().replace(' ', '_')
+                file_path, size, sha256 = self.template_blob(
+                    f"documents/{slug}.pdf", f"/documents/{slug}.pdf"
+                )
                 self.cursor.execute("""
                     INSERT INTO Document (
                         transaction_id, property_id, document_type, document_name,
-                        file_path, uploaded_by, is_required
+                        file_path, file_size_bytes, uploaded_by, is_required, blob_sha256
                     ) VALUES (
-                        %s, %s, %s, %s, %s, %s, true
+                        %s, %s, %s, %s, %s, %s, %s, true, %s
                     )
+                    ON CONFLICT (transaction_id, document_type, document_name) WHERE is_required DO NOTHING
                 """, (
                     transaction_id,
                     property_id,
                     doc['type'],
                     doc['name'],
-                    f"/documents/{doc['name'].lower().replace(' ', '_')}.pdf",
-                    uploaded_by
+                    file_path,
+                    size,
+                    uploaded_by,
+                    sha256
                 ))
+                self.mark_touched('Document', 'MediaBlob')
             except Exception as e:
                 logger.warning(f"Failed to insert document record: {e}")
         
         # Insert appraisal report (if appraisal amount exists)
         if appraisal_amount and inspection_date:
             try:
+                file_path, size, sha256 = self.template_blob(
+                    'documents/appraisal.pdf', f"/documents/appraisal_{transaction_id}.pdf"
+                )
                 self.cursor.execute("""
                     INSERT INTO Document (
                         transaction_id, property_id, document_type, document_name,
-                        file_path, uploaded_by, is_required
+                        file_path, file_size_bytes, uploaded_by, is_required, blob_sha256
                     ) VALUES (
                         %s, %s, 'appraisal', 'Property Appraisal Report',
-                        %s, %s, true
+                        %s, %s, %s, true, %s
                     )
+                    ON CONFLICT (transaction_id, document_type, document_name) WHERE is_required DO NOTHING
                 """, (
                     transaction_id,
                     property_id,
-                    f"/documents/appraisal_{transaction_id}.pdf",
-                    uploaded_by
+                    file_path,
+                    size,
+                    uploaded_by,
+                    sha256
                 ))
+                self.mark_touched('Document', 'MediaBlob')
             except Exception as e:
                 logger.warning(f"Failed to insert appraisal document: {e}")
     
     def insert_client_leads(self, client_info, lead_source, property_id, assigned_agent_id):
-        """Inserts client lead records."""
+        """Inserts client lead records; a lead already loaded for the property is updated instead."""
         if not client_info:
             return
         
@@ -652,6 +738,14 @@ class EnhancedDreamHomesETL:
                 ) VALUES (
                     %s, %s, %s, %s, %s, %s, %s, %s, 'converted', %s
                 )
+                ON CONFLICT (property_id, first_name, last_name, lead_source) WHERE property_id IS NOT NULL
+                DO UPDATE SET
+                    interest_type = EXCLUDED.interest_type,
+                    budget_min = EXCLUDED.budget_min,
+                    budget_max = EXCLUDED.budget_max,
+                    notes = EXCLUDED.notes
+                WHERE (ClientLead.interest_type, ClientLead.budget_min, ClientLead.budget_max, ClientLead.notes)
+                      IS DISTINCT FROM (EXCLUDED.interest_type, EXCLUDED.budget_min, EXCLUDED.budget_max, EXCLUDED.notes)
             """, (
                 first_name or 'Unknown',
                 last_name or '',
@@ -663,44 +757,56 @@ class EnhancedDreamHomesETL:
                 assigned_agent_id,
                 notes
             ))
+            self.mark_touched('ClientLead')
         except Exception as e:
             logger.warning(f"Failed to insert client lead: {e}")
     
     def insert_property_media(self, property_id, uploaded_by):
-        """Inserts default media records for a property."""
+        """Inserts default media records for a property, once per file."""
         try:
             # Insert default photo record
+            file_url, _, sha256 = self.template_blob(
+                'property/main.jpg', f"/media/property_{property_id}/main.jpg"
+            )
             self.cursor.execute("""
                 INSERT INTO PropertyMedia (
                     property_id, media_type, file_url, title, 
-                    is_primary, uploaded_by
+                    is_primary, uploaded_by, blob_sha256
                 ) VALUES (
-                    %s, 'photo', %s, 'Main Property Photo', true, %s
+                    %s, 'photo', %s, 'Main Property Photo', true, %s, %s
                 )
+                ON CONFLICT (property_id, file_url) DO NOTHING
             """, (
                 property_id,
-                f"/media/property_{property_id}/main.jpg",
-                uploaded_by
+                file_url,
+                uploaded_by,
+                sha256
             ))
             
             # Insert floor plan record
+            file_url, _, sha256 = self.template_blob(
+                'property/floorplan.pdf', f"/media/property_{property_id}/floorplan.pdf"
+            )
             self.cursor.execute("""
                 INSERT INTO PropertyMedia (
                     property_id, media_type, file_url, title, 
-                    uploaded_by
+                    uploaded_by, blob_sha256
                 ) VALUES (
-                    %s, 'floor_plan', %s, 'Floor Plan', %s
+                    %s, 'floor_plan', %s, 'Floor Plan', %s, %s
                 )
+                ON CONFLICT (property_id, file_url) DO NOTHING
             """, (
                 property_id,
-                f"/media/property_{property_id}/floorplan.pdf",
-                uploaded_by
+                file_url,
+                uploaded_by,
+                sha256
             ))
+            self.mark_touched('PropertyMedia', 'MediaBlob')
         except Exception as e:
             logger.warning(f"Failed to insert property media: {e}")
     
-    def insert_payment_records(self, lease_id, monthly_rent, security_deposit):
-        """Inserts payment records for a lease."""
+    def insert_payment_records(self, lease_id, monthly_rent, security_deposit, lease_start):
+        """Inserts the deposit and first month's rent payments, dated at the lease start."""
         if not monthly_rent:
             return
         
@@ -712,11 +818,12 @@ class EnhancedDreamHomesETL:
                         lease_id, payment_date, amount, payment_type,
                         payment_method, status, notes
                     ) VALUES (
-                        %s, CURRENT_DATE, %s, 'deposit', 'bank_transfer', 'completed',
+                        %s, %s, %s, 'deposit', 'bank_transfer', 'completed',
                         'Security deposit payment'
                     )
                 """, (
                     lease_id,
+                    lease_start,
                     self.safe_decimal(security_deposit)
                 ))
             
@@ -726,16 +833,34 @@ class EnhancedDreamHomesETL:
                     lease_id, payment_date, amount, payment_type,
                     payment_method, status, notes
                 ) VALUES (
-                    %s, CURRENT_DATE, %s, 'rent', 'bank_transfer', 'completed',
+                    %s, %s, %s, 'rent', 'bank_transfer', 'completed',
                     'First month rent payment'
                 )
             """, (
                 lease_id,
+                lease_start,
                 self.safe_decimal(monthly_rent)
             ))
+            self.mark_touched('PaymentRecord')
         except Exception as e:
             logger.warning(f"Failed to insert payment records: {e}")
     
+    def refresh_rent_roll(self, lease_ids):
+        """Generates the monthly rent schedule for new leases and applies their payments (one statement)."""
+        if not lease_ids:
+            return
+        
+        try:
+            self.cursor.execute("SELECT refresh_rent_roll(%s) AS changed", (list(lease_ids),))
+            changed = self.cursor.fetchone()['changed']
+            self.conn.commit()
+            if changed:
+                self.touched_tables.add('RentSchedule')
+            logger.info(f"Rent roll refreshed for {len(lease_ids)} leases ({changed} schedule rows changed).")
+        except Exception as e:
+            logger.warning(f"Rent roll refresh failed: {e}")
+            self.conn.rollback()
+    
     def process_data(self, csv_file_path):
         """Processes the CSV data and imports it into the database (enhanced version)."""
         logger.info("Starting to read CSV file...")
@@ -744,8 +869,39 @@ class EnhancedDreamHomesETL:
         
         self.connect_db()
         
+        try:
+            self.load_dataframe(df)
+        finally:
+            # Invalidate cached query results that depend on the tables committed above
+            self.bump_data_epochs()
+            self.close_db()
+    
+    def validate_batch(self, df):
+        """Checks a batch against the schema constraints before loading; returns the loadable rows."""
+        result = self.validator.validate(df)
+        
+        if len(result.rejected) or result.warnings:
+            logger.warning(
+                f"Validation rejected {len(result.rejected)} of {len(df)} records: {result.summary()}"
+            )
+        
+        if self.rejects_path and len(result.rejected):
+            write_header = not os.path.exists(self.rejects_path)
+            result.rejected.to_csv(self.rejects_path, mode='a', header=write_header, index=False)
+        
+        return result.valid
+    
+    def load_dataframe(self, df):
+        """Loads a DataFrame of source records over the open connection; returns the processed count."""
+        # Drop rows that would violate schema constraints before any database round trip
+        df = self.validate_batch(df)
+        
         try:
             processed_count = 0
+            new_lease_ids = []
+            
+            # Boilerplate media/documents: one shared blob per template for the whole batch
+            self.register_media_templates()
             
             for index, row in df.iterrows():
                 try:
@@ -800,14 +956,18 @@ class EnhancedDreamHomesETL:
                     self.cursor.execute("""
                         INSERT INTO Property (
                             mls_number, property_type_id, listing_office_id, listing_agent_id,
-                            address, city, state, zip_code, list_price, square_footage,
+                            address, city, state, zip_code, location_id, list_price, square_footage,
                             bedrooms, bathrooms, current_status, date_listed
                         ) VALUES (
-                            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
                         )
                         ON CONFLICT (mls_number) DO UPDATE SET
                             current_status = EXCLUDED.current_status,
-                            list_price = EXCLUDED.list_price
+                            list_price = EXCLUDED.list_price,
+                            location_id = EXCLUDED.location_id
+                        WHERE Property.current_status IS DISTINCT FROM EXCLUDED.current_status
+                           OR Property.list_price IS DISTINCT FROM EXCLUDED.list_price
+                           OR Property.location_id IS DISTINCT FROM EXCLUDED.location_id
                         RETURNING property_id
                     """, (
                         row['mls_listing_number'],
@@ -818,6 +978,7 @@ class EnhancedDreamHomesETL:
                         city,
                         state,
                         zip_code,
+                        self.get_location_id(city, state, zip_code),
                         self.safe_decimal(row['list_price']),
                         self.safe_int(row['square_feet']),
                         bedrooms,
@@ -825,6 +986,7 @@ class EnhancedDreamHomesETL:
                         self.map_transaction_status(row['status_current']),
                         self.safe_date(row['listing_date'])
                     ))
+                    self.mark_touched('Property', 'PropertyHistory')
                     
                     property_result = self.cursor.fetchone()
                     if property_result:
@@ -851,6 +1013,7 @@ class EnhancedDreamHomesETL:
                                     'amenity',
                                     feature
                                 ))
+                                self.mark_touched('PropertyFeature')
                     
                     # 7. Insert transaction information
                     transaction_amount = self.safe_decimal(row['final_price']) or self.safe_decimal(row['offer_amount'])
@@ -873,13 +1036,17 @@ class EnhancedDreamHomesETL:
                                 transaction_code, property_id, listing_agent_id, selling_agent_id,
                                 buyer_id, seller_id, renter_id, landlord_id,
                                 transaction_type, status, offer_date, offer_amount,
-                                accepted_date, transaction_amount, closing_date
+                                accepted_date, transaction_amount, closing_date,
+                                agent_notes, transaction_notes, special_conditions
                             ) VALUES (
-                                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
                             )
                             ON CONFLICT (transaction_code) DO UPDATE SET
                                 status = EXCLUDED.status,
-                                transaction_amount = EXCLUDED.transaction_amount
+                                transaction_amount = EXCLUDED.transaction_amount,
+                                agent_notes = EXCLUDED.agent_notes,
+                                transaction_notes = EXCLUDED.transaction_notes,
+                                special_conditions = EXCLUDED.special_conditions
                             RETURNING transaction_id
                         """, (
                             row['transaction_id'],
@@ -896,8 +1063,13 @@ class EnhancedDreamHomesETL:
                             offer_amount,
                             self.safe_date(row['accepted_date']),
                             transaction_amount,
-                            self.safe_date(row['closing_date'])
+                            self.safe_date(row['closing_date']),
+                            self.safe_text(row['notes_agent']),
+                            self.safe_text(row['notes_transaction']),
+                            self.safe_text(row['special_conditions'])
                         ))
+                        # Transaction triggers also update Property and may create Commission rows
+                        self.mark_touched('Transaction', 'Property', 'PropertyHistory', 'Commission')
                         
                         result = self.cursor.fetchone()
                         if result:
@@ -1025,6 +1197,7 @@ class EnhancedDreamHomesETL:
                                 row['lease_terms'],
                                 listing_agent_id
                             ))
+                            self.mark_touched('Lease')
                             
                             result = self.cursor.fetchone()
                             if result:
@@ -1035,10 +1208,13 @@ class EnhancedDreamHomesETL:
                                 self.insert_payment_records(
                                     lease_id,
                                     row['monthly_rent'],
-                                    row['security_deposit']
+                                    row['security_deposit'],
+                                    lease_start
                                 )
                         
                         self.conn.commit()
+                        if lease_id:
+                            new_lease_ids.append(lease_id)
                     except Exception as e:
                         logger.warning(f"Lease/payment record insertion failed: {e}")
                         self.conn.rollback()
@@ -1066,6 +1242,7 @@ class EnhancedDreamHomesETL:
                                 self.safe_decimal(row['marketing_spend']),
                                 listing_agent_id
                             ))
+                            self.mark_touched('MarketingCampaign')
                         
                         self.conn.commit()
                     except Exception as e:
@@ -1077,22 +1254,35 @@ class EnhancedDreamHomesETL:
                 except Exception as e:
                     logger.error(f"Error processing record {index + 1}: {e}")
                     self.conn.rollback()
+                    # Locations created in the rolled-back transaction no longer exist
+                    self.location_ids.clear()
                     continue
             
             logger.info(f"Successfully processed {processed_count} records.")
+            logger.info(f"Address normalizer cache: {normalize_address.cache_info()}")
+            
+            # 16. Build the rent schedule of this batch's leases in one set-based statement
+            self.refresh_rent_roll(new_lease_ids)
+            return processed_count
             
         except Exception as e:
             logger.error(f"An error occurred during processing: {e}")
             self.conn.rollback()
             raise
-        finally:
-            self.close_db()
 
 def main():
     """Main function"""
+    import config
     from config import DATABASE_CONFIG, CSV_FILE_PATH
+    from media_store import BlobStore
     
-    etl = EnhancedDreamHomesETL(DATABASE_CONFIG)
+    # MEDIA_ROOT in config.py enables the content-addressed media store
+    media_root = getattr(config, 'MEDIA_ROOT', None)
+    etl = EnhancedDreamHomesETL(
+        DATABASE_CONFIG,
+        rejects_path='rejected_records.csv',
+        media_store=BlobStore(media_root) if media_root else None
+    )
     etl.process_data(CSV_FILE_PATH)
 
 if __name__ == "__main__":
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import importlib.util
+import os
+
+ETL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'etl_enhanced(1).py')
+
+
+def load_etl_module():
+    """Imports etl_enhanced(1).py, whose file name is not a valid module name."""
+    spec = importlib.util.spec_from_file_location('etl_enhanced', ETL_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_etl_class():
+    """Returns the EnhancedDreamHomesETL class."""
+    return load_etl_module().EnhancedDreamHomesETL
@@ -0,0 +1,55 @@
+-- Change tracking for the incremental Parquet snapshot export (parquet_export.py).
+-- Property already maintains updated_at; the other exported tables get the same
+-- column and trigger so status and amount changes are picked up, not only new rows.
+
+ALTER TABLE "Transaction" ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE Commission ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE Lease ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE PaymentRecord ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE MarketingCampaign ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE ClientLead ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+
+DROP TRIGGER IF EXISTS update_transaction_timestamp ON "Transaction";
+CREATE TRIGGER update_transaction_timestamp
+BEFORE UPDATE ON "Transaction"
+FOR EACH ROW
+EXECUTE FUNCTION update_timestamp();
+
+DROP TRIGGER IF EXISTS update_commission_timestamp ON Commission;
+CREATE TRIGGER update_commission_timestamp
+BEFORE UPDATE ON Commission
+FOR EACH ROW
+EXECUTE FUNCTION update_timestamp();
+
+DROP TRIGGER IF EXISTS update_lease_timestamp ON Lease;
+CREATE TRIGGER update_lease_timestamp
+BEFORE UPDATE ON Lease
+FOR EACH ROW
+EXECUTE FUNCTION update_timestamp();
+
+DROP TRIGGER IF EXISTS update_payment_timestamp ON PaymentRecord;
+CREATE TRIGGER update_payment_timestamp
+BEFORE UPDATE ON PaymentRecord
+FOR EACH ROW
+EXECUTE FUNCTION update_timestamp();
+
+DROP TRIGGER IF EXISTS update_campaign_timestamp ON MarketingCampaign;
+CREATE TRIGGER update_campaign_timestamp
+BEFORE UPDATE ON MarketingCampaign
+FOR EACH ROW
+EXECUTE FUNCTION update_timestamp();
+
+DROP TRIGGER IF EXISTS update_lead_timestamp ON ClientLead;
+CREATE TRIGGER update_lead_timestamp
+BEFORE UPDATE ON ClientLead
+FOR EACH ROW
+EXECUTE FUNCTION update_timestamp();
+
+-- Watermark scans read only rows changed since the previous export
+CREATE INDEX IF NOT EXISTS idx_property_updated ON Property (updated_at);
+CREATE INDEX IF NOT EXISTS idx_transaction_updated ON "Transaction" (updated_at);
+CREATE INDEX IF NOT EXISTS idx_commission_updated ON Commission (updated_at);
+CREATE INDEX IF NOT EXISTS idx_lease_updated ON Lease (updated_at);
+CREATE INDEX IF NOT EXISTS idx_payment_updated ON PaymentRecord (updated_at);
+CREATE INDEX IF NOT EXISTS idx_campaign_updated ON MarketingCampaign (updated_at);
+CREATE INDEX IF NOT EXISTS idx_lead_updated ON ClientLead (updated_at);
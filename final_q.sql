@@ -233,7 +233,7 @@ ORDER BY avg_price_per_sqft ASC;
 
 -- Question 11: How does neighborhood safety affect home prices?
 WITH neighborhood_metrics AS (
-    SELECT p.city, p.zip_code,
+    SELECT p.location_id,
            COUNT(*) as total_properties,
            AVG(p.list_price) as avg_property_value,
            COUNT(pf.feature_id) as security_features_count,
@@ -242,10 +242,10 @@ WITH neighborhood_metrics AS (
     LEFT JOIN PropertyFeature pf ON p.property_id = pf.property_id
     WHERE p.current_status IN ('active', 'sold')
       AND p.list_price > 0
-    GROUP BY p.city, p.zip_code
+    GROUP BY p.location_id
     HAVING COUNT(*) >= 5
 )
-SELECT city, zip_code,
+SELECT l.borough, l.neighborhood, l.city, l.zip_code,
        total_properties,
        ROUND(avg_property_value, 0) as avg_property_value,
        security_properties,
@@ -256,7 +256,8 @@ SELECT city, zip_code,
            ELSE 'Standard Area'
        END as security_rating,
        ROUND(avg_property_value / (SELECT AVG(avg_property_value) FROM neighborhood_metrics) * 100, 2) as relative_value_index
-FROM neighborhood_metrics
+FROM neighborhood_metrics nm
+JOIN Location l ON l.location_id = nm.location_id
 ORDER BY security_feature_percentage DESC, avg_property_value DESC;
 
 -- Question 12: Which property management company should I choose?
@@ -0,0 +1,116 @@
+-- Append-only list price and status history for Property, with as-of lookups.
+-- Run after ans_psql.sql and tri_psql.sql. A row is written only when list_price or
+-- current_status actually changes; rows are never updated or deleted. Re-running the
+-- script keeps the log and only seeds properties that have no history yet.
+
+-- 24. PropertyHistory: one row per price or status change, appended in time order
+CREATE TABLE IF NOT EXISTS PropertyHistory (
+    property_id INTEGER NOT NULL,
+    effective_at TIMESTAMP NOT NULL DEFAULT clock_timestamp(),
+    list_price DECIMAL(12,2) NOT NULL,
+    status property_status_enum NOT NULL,
+    -- Deliberate: a property with history cannot be deleted, since the log cannot lose rows.
+    -- Take a listing off the market with current_status = 'withdrawn' instead.
+    FOREIGN KEY (property_id) REFERENCES Property(property_id) ON DELETE RESTRICT
+);
+
+-- Rows arrive in effective_at order, so a BRIN index stays tiny and prunes time windows
+CREATE INDEX IF NOT EXISTS idx_property_history_time ON PropertyHistory USING BRIN (effective_at) WITH (pages_per_range = 32);
+-- Latest row at or before a point in time for one property
+CREATE INDEX IF NOT EXISTS idx_property_history_property ON PropertyHistory (property_id, effective_at DESC);
+
+CREATE OR REPLACE FUNCTION trg_record_property_history()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- clock_timestamp(): a sale closed in the same transaction as the upsert gets its own row
+    INSERT INTO PropertyHistory (property_id, effective_at, list_price, status)
+    VALUES (NEW.property_id, clock_timestamp(), NEW.list_price, NEW.current_status);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Neither table is dropped above, so their triggers survive a re-run of this script
+DROP TRIGGER IF EXISTS trg_property_history_insert ON Property;
+CREATE TRIGGER trg_property_history_insert
+AFTER INSERT ON Property
+FOR EACH ROW
+EXECUTE FUNCTION trg_record_property_history();
+
+DROP TRIGGER IF EXISTS trg_property_history_update ON Property;
+CREATE TRIGGER trg_property_history_update
+AFTER UPDATE OF list_price, current_status ON Property
+FOR EACH ROW
+WHEN (OLD.list_price IS DISTINCT FROM NEW.list_price
+      OR OLD.current_status IS DISTINCT FROM NEW.current_status)
+EXECUTE FUNCTION trg_record_property_history();
+
+CREATE OR REPLACE FUNCTION trg_property_history_append_only()
+RETURNS TRIGGER AS $$
+BEGIN
+    RAISE EXCEPTION 'PropertyHistory is append-only (% rejected)', TG_OP;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_property_history_append_only ON PropertyHistory;
+CREATE TRIGGER trg_property_history_append_only
+BEFORE UPDATE OR DELETE ON PropertyHistory
+FOR EACH ROW
+EXECUTE FUNCTION trg_property_history_append_only();
+
+DROP TRIGGER IF EXISTS trg_property_history_no_truncate ON PropertyHistory;
+CREATE TRIGGER trg_property_history_no_truncate
+BEFORE TRUNCATE ON PropertyHistory
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_property_history_append_only();
+
+-- Price and status of one property at a point in time
+CREATE OR REPLACE FUNCTION property_as_of(p_property_id INTEGER, p_at TIMESTAMP)
+RETURNS TABLE (list_price DECIMAL(12,2), status property_status_enum, effective_at TIMESTAMP) AS $$
+    SELECT h.list_price, h.status, h.effective_at
+    FROM PropertyHistory h
+    WHERE h.property_id = p_property_id
+      AND h.effective_at <= p_at
+    ORDER BY h.effective_at DESC
+    LIMIT 1;
+$$ LANGUAGE sql STABLE;
+
+-- Snapshot of every property's price and status as of a point in time
+CREATE OR REPLACE FUNCTION properties_as_of(p_at TIMESTAMP)
+RETURNS TABLE (property_id INTEGER, list_price DECIMAL(12,2), status property_status_enum, effective_at TIMESTAMP) AS $$
+    SELECT DISTINCT ON (h.property_id) h.property_id, h.list_price, h.status, h.effective_at
+    FROM PropertyHistory h
+    WHERE h.effective_at <= p_at
+    ORDER BY h.property_id, h.effective_at DESC;
+$$ LANGUAGE sql STABLE;
+
+-- Changes within [p_from, p_to) with the values they replaced (NULL for a new listing)
+CREATE OR REPLACE FUNCTION property_changes(p_from TIMESTAMP, p_to TIMESTAMP)
+RETURNS TABLE (
+    property_id INTEGER,
+    effective_at TIMESTAMP,
+    list_price DECIMAL(12,2),
+    status property_status_enum,
+    previous_price DECIMAL(12,2),
+    previous_status property_status_enum
+) AS $$
+    SELECT h.property_id, h.effective_at, h.list_price, h.status, prev.list_price, prev.status
+    FROM PropertyHistory h
+    LEFT JOIN LATERAL (
+        SELECT p.list_price, p.status
+        FROM PropertyHistory p
+        WHERE p.property_id = h.property_id
+          AND p.effective_at < h.effective_at
+        ORDER BY p.effective_at DESC
+        LIMIT 1
+    ) prev ON TRUE
+    WHERE h.effective_at >= p_from
+      AND h.effective_at < p_to
+    ORDER BY h.effective_at;
+$$ LANGUAGE sql STABLE;
+
+-- Seed one row per property loaded before the history existed, oldest first
+INSERT INTO PropertyHistory (property_id, effective_at, list_price, status)
+SELECT p.property_id, COALESCE(p.created_at, p.date_listed::TIMESTAMP), p.list_price, p.current_status
+FROM Property p
+WHERE NOT EXISTS (SELECT 1 FROM PropertyHistory h WHERE h.property_id = p.property_id)
+ORDER BY COALESCE(p.created_at, p.date_listed::TIMESTAMP);
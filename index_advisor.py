@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import hashlib
+import json
+import logging
+import re
+import statistics
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from query_api import QueryLibrary
+from result_cache import KNOWN_TABLES
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Tables created with a quoted (case-sensitive) name in ans_psql.sql
+QUOTED_TABLES = {'Transaction'}
+
+TABLE_ALIAS = re.compile(
+    r'\b(?:FROM|JOIN)\s+"?(\w+)"?(?:\s+(?:AS\s+)?(?!(?:ON|WHERE|JOIN|LEFT|RIGHT|FULL|INNER|CROSS|GROUP|'
+    r'ORDER|USING|HAVING|LIMIT|UNION)\b)(\w+))?',
+    re.IGNORECASE
+)
+COMPARISON = re.compile(
+    r'(?<![\w.])(?:(\w+)\.)?(\w+)\s*(=|>=|<=|<>|>|<|\bIN\s*\(|\bBETWEEN\b|\bIS\s+NOT\s+NULL\b)\s*'
+    r"((?:\w+\.\w+)|'[^']*'|[\w.]+)?",
+    re.IGNORECASE
+)
+GROUP_BY = re.compile(r'\bGROUP\s+BY\s+(.+?)(?=\bHAVING\b|\bORDER\b|\bLIMIT\b|\)|$)', re.IGNORECASE | re.DOTALL)
+CASE_EXPRESSION = re.compile(r'\bCASE\b.*?\bEND\b', re.IGNORECASE | re.DOTALL)
+RANGE_OPERATORS = {'>', '<', '>=', '<=', 'BETWEEN', 'IS NOT NULL'}
+SQL_WORDS = {'and', 'or', 'not', 'null', 'true', 'false', 'current_date', 'now', 'interval', 'select'}
+
+# Column types for which a literal equality is better expressed as a partial index predicate
+PARTIAL_TYPES = {'USER-DEFINED', 'boolean'}
+MAX_KEY_COLUMNS = 3
+MAX_INCLUDE_COLUMNS = 5
+
+CANONICAL_TABLES = {table.lower(): table for table in KNOWN_TABLES}
+
+
+def canonical_table(name):
+    """Maps a table reference to its canonical name, or None for CTEs and unknown names."""
+    return CANONICAL_TABLES.get(name.lower())
+
+
+def quote_table(table):
+    return f'"{table}"' if table in QUOTED_TABLES else table
+
+
+class IndexCandidate:
+    """A proposed index: key columns, optional INCLUDE columns and an optional partial predicate."""
+
+    def __init__(self, table, columns, include=(), where=None):
+        self.table = table
+        self.columns = tuple(columns)
+        self.include = tuple(c for c in include if c not in self.columns)
+        self.where = where
+        self.queries = set()
+        self.results = {}
+        self.size_bytes = None
+
+    @property
+    def key(self):
+        return (self.table, self.columns, self.include, self.where)
+
+    @property
+    def name(self):
+        base = f"idx_{self.table.lower()}_{'_'.join(self.columns)}"
+        if self.include or self.where:
+            digest = hashlib.md5(repr(self.key).encode('utf-8')).hexdigest()[:6]
+            base = f"{base[:55]}_{digest}"
+        return base[:63]
+
+    def definition(self, concurrently=False, if_not_exists=False):
+        sql = (
+            f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}{'IF NOT EXISTS ' if if_not_exists else ''}"
+            f"{self.name} ON {quote_table(self.table)} ({', '.join(self.columns)})"
+        )
+        if self.include:
+            sql += f" INCLUDE ({', '.join(self.include)})"
+        if self.where:
+            sql += f" WHERE {self.where}"
+        return sql
+
+
+class WorkloadAnalyzer:
+    """Extracts per-table filter, join, grouping and output columns from query text."""
+
+    def __init__(self, schema):
+        # {table: {column: data_type}}
+        self.schema = schema
+
+    def tables(self, sql):
+        """Returns {alias or table name (lower case): table} for the schema tables a query reads."""
+        aliases = {}
+        for name, alias in TABLE_ALIAS.findall(sql):
+            table = canonical_table(name)
+            if table and table in self.schema:
+                aliases[name.lower()] = table
+                if alias:
+                    aliases[alias.lower()] = table
+        return aliases
+
+    def resolve(self, aliases, alias, column):
+        """Returns the table a column reference belongs to, or None."""
+        column = column.lower()
+        if alias:
+            table = aliases.get(alias.lower())
+            return table if table and column in self.schema[table] else None
+        owners = {table for table in aliases.values() if column in self.schema[table]}
+        return owners.pop() if len(owners) == 1 else None
+
+    def analyze(self, sql):
+        """Returns {table: usage} where usage holds eq/range/join/group/used column lists."""
+        aliases = self.tables(sql)
+        usage = {
+            table: {'eq': {}, 'range': [], 'join': [], 'group': [], 'used': []}
+            for table in set(aliases.values())
+        }
+
+        def add(values, item):
+            if item not in values:
+                values.append(item)
+
+        for alias, column in re.findall(r'\b(\w+)\.(\w+)\b', sql):
+            table = self.resolve(aliases, alias, column)
+            if table:
+                add(usage[table]['used'], column.lower())
+
+        predicates = CASE_EXPRESSION.sub(' ', sql)
+        for alias, column, operator, rhs in COMPARISON.findall(predicates):
+            if column.lower() in SQL_WORDS:
+                continue
+            table = self.resolve(aliases, alias, column)
+            if not table:
+                continue
+            column = column.lower()
+            operator = ' '.join(operator.upper().replace('(', '').split())
+            add(usage[table]['used'], column)
+
+            other = rhs.split('.') if rhs and '.' in rhs and not rhs.startswith("'") else None
+            other_table = self.resolve(aliases, other[0], other[1]) if other else None
+            if other_table:
+                if operator == '=':
+                    add(usage[table]['join'], column)
+                    add(usage[other_table]['join'], other[1].lower())
+                else:
+                    add(usage[table]['range'], column)
+            elif operator == '=' and rhs and (rhs.startswith("'") or rhs.upper() in ('TRUE', 'FALSE')):
+                usage[table]['eq'].setdefault(column, []).append(rhs)
+            elif operator == 'IN':
+                values = re.search(rf'\b{re.escape(column)}\s+IN\s*\(([^)]*)\)', predicates, re.IGNORECASE)
+                if values and "'" in values.group(1):
+                    usage[table]['eq'].setdefault(column, []).extend(v.strip() for v in values.group(1).split(','))
+                else:
+                    add(usage[table]['range'], column)
+            elif operator in RANGE_OPERATORS:
+                add(usage[table]['range'], column)
+
+        for clause in GROUP_BY.findall(sql):
+            for alias, column in re.findall(r'(?:(\w+)\.)?(\w+)', clause):
+                table = self.resolve(aliases, alias, column) if column.lower() not in SQL_WORDS else None
+                if table:
+                    add(usage[table]['group'], column.lower())
+
+        return usage
+
+    def candidates(self, sql):
+        """Proposes composite, covering, partial and grouping indexes for one query."""
+        proposals = []
+        for table, use in self.analyze(sql).items():
+            columns = self.schema[table]
+            eq_columns = list(use['eq'])
+            partial = [c for c in eq_columns if columns[c] in PARTIAL_TYPES]
+
+            # Equality columns first, then join probes, then one range column
+            key = []
+            for column in eq_columns + use['join'] + use['range'][:1]:
+                if column not in key:
+                    key.append(column)
+            key = key[:MAX_KEY_COLUMNS]
+            include = [c for c in use['used'] if c not in key and columns[c] != 'text'][:MAX_INCLUDE_COLUMNS]
+
+            if key:
+                proposals.append(IndexCandidate(table, key))
+                if include:
+                    proposals.append(IndexCandidate(table, key, include))
+
+            for column in partial:
+                partial_key = [c for c in key if c != column]
+                if not partial_key:
+                    continue
+                literals = sorted(set(use['eq'][column]))
+                predicate = (f"{column} = {literals[0]}" if len(literals) == 1
+                             else f"{column} IN ({', '.join(literals)})")
+                proposals.append(IndexCandidate(table, partial_key, include, predicate))
+
+            group = use['group'][:MAX_KEY_COLUMNS]
+            if group and group != key:
+                proposals.append(IndexCandidate(table, group, [c for c in use['used'] if c not in group
+                                                               and columns[c] != 'text'][:MAX_INCLUDE_COLUMNS]))
+        return proposals
+
+
+class IndexAdvisor:
+    """Proposes indexes for a query workload and measures each one with hypothetical or real builds."""
+
+    def __init__(self, db_config, mode='auto', repeat=3, min_gain=0.10, statement_timeout_ms=60000):
+        self.db_config = db_config
+        self.mode = mode
+        self.repeat = repeat
+        self.min_gain = min_gain
+        self.statement_timeout_ms = statement_timeout_ms
+        self.conn = None
+        self.cursor = None
+        self.workload = {}
+        self.baseline = {}
+        self.candidates = {}
+        self.accepted = []
+        self.final = {}
+
+    def connect_db(self):
+        """Connects to the database."""
+        try:
+            self.conn = psycopg2.connect(**self.db_config)
+            self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
+            self.cursor.execute("SET statement_timeout = %s", (self.statement_timeout_ms,))
+            self.conn.commit()
+            logger.info("Database connection successful.")
+        except Exception as e:
+            logger.error(f"Database connection failed: {e}")
+            raise
+
+    def close_db(self):
+        """Closes the database connection."""
+        if self.cursor:
+            self.cursor.close()
+        if self.conn:
+            self.conn.rollback()
+            self.conn.close()
+        logger.info("Database connection closed.")
+
+    def load_schema(self):
+        """Returns {table: {column: data_type}} for the workload tables."""
+        self.cursor.execute("""
+            SELECT table_name, column_name, data_type
+            FROM information_schema.columns
+            WHERE table_schema = 'public'
+        """)
+        schema = {}
+        for row in self.cursor.fetchall():
+            table = canonical_table(row['table_name'])
+            if table:
+                schema.setdefault(table, {})[row['column_name']] = row['data_type']
+        self.conn.rollback()
+        return schema
+
+    def existing_indexes(self):
+        """Returns {table: [(key column tuple, is_unique)]} of the full indexes already present."""
+        self.cursor.execute("""
+            SELECT t.relname AS table_name,
+                   ix.indisunique AS is_unique,
+                   ARRAY(SELECT pg_get_indexdef(ix.indexrelid, k, TRUE)
+                         FROM generate_series(1, ix.indnkeyatts) AS k) AS key_columns
+            FROM pg_index ix
+            JOIN pg_class t ON t.oid = ix.indrelid
+            JOIN pg_namespace n ON n.oid = t.relnamespace
+            WHERE n.nspname = 'public'
+              AND ix.indpred IS NULL
+        """)
+        existing = {}
+        for row in self.cursor.fetchall():
+            table = canonical_table(row['table_name'])
+            if table:
+                existing.setdefault(table, []).append(
+                    (tuple(c.strip('"') for c in row['key_columns']), row['is_unique'])
+                )
+        self.conn.rollback()
+        return existing
+
+    def load_workload(self, source='files', names=None, limit=30):
+        """Loads queries from the query files or from pg_stat_statements; returns {name: workload entry}."""
+        if source == 'pg_stat_statements':
+            self.cursor.execute("""
+                SELECT queryid, query, calls, total_exec_time
+                FROM pg_stat_statements
+                WHERE query ~* '^\\s*(WITH|SELECT)\\b'
+                  AND query !~* '(pg_catalog|information_schema|pg_stat)'
+                ORDER BY total_exec_time DESC
+                LIMIT %s
+            """, (limit,))
+            for row in self.cursor.fetchall():
+                self.workload[f"pgss_{row['queryid']}"] = {
+                    'sql': row['query'], 'title': row['query'][:80].replace('\n', ' '), 'weight': row['calls'],
+                }
+            self.conn.rollback()
+        else:
+            library = QueryLibrary()
+            for name in names or library.names():
+                self.workload[name] = {'sql': library.get(name), 'title': library.title(name), 'weight': 1}
+        logger.info(f"Workload: {len(self.workload)} queries from {source}.")
+        return self.workload
+
+    def use_hypopg(self):
+        """Decides between hypothetical (hypopg) and real builds."""
+        if self.mode in ('hypothetical', 'real'):
+            return self.mode == 'hypothetical'
+        try:
+            self.cursor.execute("CREATE EXTENSION IF NOT EXISTS hypopg")
+            self.conn.commit()
+            return True
+        except psycopg2.Error:
+            self.conn.rollback()
+            logger.info("hypopg is not available; measuring real index builds inside rolled-back transactions.")
+            return False
+
+    def measure(self, sql, analyze):
+        """Returns (estimated cost, median execution ms or None, plan text) of one query."""
+        # Queries from pg_stat_statements carry $n placeholders and can only be planned generically
+        generic = re.search(r'\$\d+', sql) is not None
+        analyze = analyze and not generic
+        options = 'ANALYZE, ' if analyze else ('GENERIC_PLAN, ' if generic else '')
+        timings, cost, plan_text = [], None, ''
+        for _ in range(self.repeat if analyze else 1):
+            self.cursor.execute(f"EXPLAIN ({options}FORMAT JSON) {sql}")
+            plan = list(self.cursor.fetchone().values())[0][0]
+            cost = plan['Plan']['Total Cost']
+            plan_text = json.dumps(plan)
+            if analyze:
+                timings.append(plan['Execution Time'])
+        return cost, (statistics.median(timings) if timings else None), plan_text
+
+    def measure_workload(self, names, analyze):
+        """Measures several queries; a failing query is skipped without losing the open transaction."""
+        results = {}
+        for name in names:
+            self.cursor.execute("SAVEPOINT measure_query")
+            try:
+                cost, ms, plan = self.measure(self.workload[name]['sql'], analyze)
+                results[name] = {'cost': cost, 'ms': ms, 'plan': plan}
+                self.cursor.execute("RELEASE SAVEPOINT measure_query")
+            except psycopg2.Error as e:
+                logger.warning(f"Could not measure {name}: {e}")
+                self.cursor.execute("ROLLBACK TO SAVEPOINT measure_query")
+        return results
+
+    def propose(self):
+        """Collects deduplicated candidates from every workload query."""
+        analyzer = WorkloadAnalyzer(self.load_schema())
+        existing = self.existing_indexes()
+        for name, entry in self.workload.items():
+            for candidate in analyzer.candidates(entry['sql']):
+                indexes = existing.get(candidate.table, [])
+                # Lookups by a unique key (primary keys) are already a single index probe
+                if any(is_unique and columns == candidate.columns[:len(columns)] for columns, is_unique in indexes):
+                    continue
+                already = any(columns[:len(candidate.columns)] == candidate.columns for columns, _ in indexes)
+                if already and not candidate.include and not candidate.where:
+                    continue
+                candidate = self.candidates.setdefault(candidate.key, candidate)
+                candidate.queries.add(name)
+        logger.info(f"Proposed {len(self.candidates)} candidate indexes.")
+        return list(self.candidates.values())
+
+    def evaluate(self, candidate, hypothetical):
+        """Measures the queries a candidate could serve with the index in place, then discards it."""
+        try:
+            if hypothetical:
+                self.cursor.execute("SELECT indexrelid, indexname FROM hypopg_create_index(%s)",
+                                    (candidate.definition(),))
+                created = self.cursor.fetchone()
+                index_name = created['indexname']
+                self.cursor.execute("SELECT hypopg_relation_size(%s) AS size", (created['indexrelid'],))
+            else:
+                self.cursor.execute(candidate.definition())
+                index_name = candidate.name
+                self.cursor.execute("SELECT pg_relation_size(%s::regclass) AS size", (candidate.name,))
+            candidate.size_bytes = self.cursor.fetchone()['size']
+
+            for name, result in self.measure_workload(sorted(candidate.queries & set(self.workload)),
+                                                      not hypothetical).items():
+                result['used'] = f'"{index_name}"' in result['plan']
+                candidate.results[name] = result
+        finally:
+            if hypothetical:
+                self.cursor.execute("SELECT hypopg_reset()")
+            self.conn.rollback()
+
+    def gain(self, name, result, reference):
+        """Relative improvement of a measurement over a reference (time when measured, else cost)."""
+        metric = 'ms' if result.get('ms') is not None and reference.get('ms') else 'cost'
+        if not reference[metric]:
+            return 0.0
+        return (reference[metric] - result[metric]) / reference[metric]
+
+    def run(self):
+        """Baseline, proposal, per-candidate evaluation, greedy selection and a combined re-measurement."""
+        hypothetical = self.use_hypopg()
+        self.baseline = self.measure_workload(list(self.workload), not hypothetical)
+        self.conn.rollback()
+        self.workload = {name: entry for name, entry in self.workload.items() if name in self.baseline}
+
+        for candidate in self.propose():
+            try:
+                self.evaluate(candidate, hypothetical)
+            except psycopg2.Error as e:
+                logger.warning(f"Skipping {candidate.definition()}: {e}")
+                self.conn.rollback()
+
+        # Greedy: strongest weighted benefit first; keep an index only if it beats what is already
+        # accepted for at least one query by min_gain
+        def benefit(candidate):
+            return sum(max(self.gain(name, result, self.baseline[name]), 0) * self.workload[name]['weight']
+                       for name, result in candidate.results.items() if result['used'])
+
+        best = dict(self.baseline)
+        for candidate in sorted(self.candidates.values(), key=benefit, reverse=True):
+            improved = [name for name, result in candidate.results.items()
+                        if result['used'] and self.gain(name, result, best[name]) >= self.min_gain]
+            if improved:
+                self.accepted.append(candidate)
+                for name in improved:
+                    best[name] = candidate.results[name]
+
+        self.final = self.measure_pack(hypothetical)
+        return self.accepted
+
+    def measure_pack(self, hypothetical):
+        """Re-measures the whole workload with every accepted index in place together."""
+        if not self.accepted:
+            return dict(self.baseline)
+        try:
+            for candidate in self.accepted:
+                if hypothetical:
+                    self.cursor.execute("SELECT * FROM hypopg_create_index(%s)", (candidate.definition(),))
+                else:
+                    self.cursor.execute(candidate.definition())
+            return self.measure_workload(list(self.workload), not hypothetical)
+        finally:
+            if hypothetical:
+                self.cursor.execute("SELECT hypopg_reset()")
+            self.conn.rollback()
+
+    def write_migration(self, path):
+        """Writes the accepted indexes as a migration to review before applying."""
+        lines = [
+            "-- Index proposals generated by index_advisor.py; review before applying.",
+            "-- CONCURRENTLY cannot run inside a transaction block: apply with psql in autocommit mode.",
+            "",
+        ]
+        for candidate in self.accepted:
+            gains = ', '.join(
+                f"{name} {self.gain(name, candidate.results[name], self.baseline[name]):.0%}"
+                for name in sorted(candidate.queries) if candidate.results.get(name, {}).get('used')
+            )
+            lines.append(f"-- Serves: {gains}; size {candidate.size_bytes or 0:,} bytes")
+            lines.append(candidate.definition(concurrently=True, if_not_exists=True) + ';')
+            lines.append("")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+        logger.info(f"Wrote {len(self.accepted)} index proposals to {path}")
+
+    def write_report(self, path):
+        """Writes a Markdown report of baseline vs. pack timings per query."""
+        lines = [
+            "| Query | Baseline | With index pack | Unit | Speedup | Indexes used |",
+            "|---|---:|---:|---|---:|---|",
+        ]
+        for name in self.workload:
+            before, after = self.baseline[name], self.final.get(name, self.baseline[name])
+            used = [c.name for c in self.accepted if f'"{c.name}"' in after['plan']]
+            # Generic plans from pg_stat_statements are only costed, never timed
+            metric = 'ms' if before.get('ms') is not None and after.get('ms') is not None else 'cost'
+            speedup = before[metric] / after[metric] if after[metric] else float('inf')
+            lines.append(
+                f"| {name} | {before[metric]:.2f} | {after[metric]:.2f} | {metric} | {speedup:.2f}x "
+                f"| {', '.join(used) or '-'} |"
+            )
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        logger.info(f"Wrote speedup report to {path}")
+
+
+def main():
+    """Main function"""
+    from config import DATABASE_CONFIG
+
+    parser = argparse.ArgumentParser(description="Propose and test indexes for the analyst query workload.")
+    parser.add_argument('queries', nargs='*', help="Query names to analyze (default: all)")
+    parser.add_argument('--source', choices=['files', 'pg_stat_statements'], default='files')
+    parser.add_argument('--mode', choices=['auto', 'hypothetical', 'real'], default='auto')
+    parser.add_argument('--database', help="Scratch database to run against instead of the configured one")
+    parser.add_argument('--seed-rows', type=int, default=0,
+                        help="Load this many synthetic records through the ETL first (scratch databases only)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-gain', type=float, default=0.10)
+    parser.add_argument('--migration', default='index_proposals_psql.sql')
+    parser.add_argument('--report', default='index_report.md')
+    args = parser.parse_args()
+
+    db_config = dict(DATABASE_CONFIG)
+    if args.database:
+        db_config['database'] = args.database
+        db_config.pop('dbname', None)
+    if args.seed_rows:
+        if not args.database:
+            parser.error("--seed-rows writes synthetic data; pass --database with a scratch database")
+        from synthetic_data import load_synthetic
+        load_synthetic(db_config, args.seed_rows)
+
+    advisor = IndexAdvisor(db_config, args.mode, args.repeat, args.min_gain)
+    advisor.connect_db()
+    try:
+        advisor.load_workload(args.source, args.queries or None)
+        advisor.run()
+        advisor.write_migration(args.migration)
+        advisor.write_report(args.report)
+    finally:
+        advisor.close_db()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+-- Reviewed index pack for the analyst workload (final_q.sql, Complex Query.sql).
+-- Proposed by index_advisor.py and measured against synthetic data; run after ans_psql.sql.
+-- CONCURRENTLY cannot run inside a transaction block: apply with psql in autocommit mode
+-- (the default), e.g. psql -f index_pack_psql.sql.
+
+-- Lease joined on property with a status filter: Questions 3, 4, 6, 12
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_lease_property_status
+    ON Lease (property_id, lease_status) INCLUDE (lease_id, monthly_rent);
+
+-- Commissions of the last 12 months by listing agent: Complex 1
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_commission_created
+    ON Commission (created_at) INCLUDE (listing_agent_id, total_commission_amount);
+
+-- Feature rollups grouped by (feature_type, feature_name): Questions 1, 3
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_feature_type_name
+    ON PropertyFeature (feature_type, feature_name) INCLUDE (property_id);
+
+-- Feature lookups per property as index-only scans: Questions 1, 3, 11, Complex 4.
+-- Supersedes idx_feature_property (property_id).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_feature_property_covering
+    ON PropertyFeature (property_id) INCLUDE (feature_type, feature_name);
+DROP INDEX CONCURRENTLY IF EXISTS idx_feature_property;
+
+-- Closed sales by date: Question 7, Complex 5, Complex 6
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transaction_type_closing
+    ON "Transaction" (transaction_type, closing_date) INCLUDE (status, property_id, transaction_amount, offer_date);
+
+-- Transactions of a property in a date window: Complex 8, Questions 10, 12.
+-- Supersedes idx_transaction_property (property_id).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transaction_property_closing
+    ON "Transaction" (property_id, closing_date) INCLUDE (transaction_amount, status);
+DROP INDEX CONCURRENTLY IF EXISTS idx_transaction_property;
+
+-- Market activity by offer month: Question 9
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_transaction_offer_date
+    ON "Transaction" (offer_date) INCLUDE (transaction_type, status, transaction_amount);
+
+-- Monthly rent income: Complex 6
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_payment_rent_date
+    ON PaymentRecord (payment_date) INCLUDE (amount, lease_id)
+    WHERE payment_type = 'rent';
+
+-- Completed campaigns of the last 18 months: Question 2
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_campaign_completed_start
+    ON MarketingCampaign (start_date) INCLUDE (campaign_type, property_id, budget, actual_cost, leads_generated)
+    WHERE status = 'completed';
+
+-- Year-to-date lead funnel: Complex 3
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_lead_created
+    ON ClientLead (created_at) INCLUDE (lead_source, lead_status);
+
+ANALYZE Lease, Commission, PropertyFeature, "Transaction", PaymentRecord, MarketingCampaign, ClientLead;
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from collections import Counter
+from datetime import timedelta
+from queue import Empty
+
+import psycopg2
+from psycopg2.extras import RealDictCursor, execute_values
+
+from result_cache import bump_data_epochs
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ('new', 'contacted', 'qualified')
+# Days until the next follow-up, by the status a contact leaves the lead in
+NEXT_FOLLOW_UP_DAYS = {'contacted': 3, 'qualified': 7}
+QUALIFY_SCORE = 0.5
+CONVERT_SCORE = 0.8
+# A lead still open after this many follow-ups is closed as lost
+MAX_FOLLOW_UPS = 6
+# Failed jobs wait RETRY_DELAY * 2^(attempts - 1) seconds before the next attempt
+RETRY_DELAY = 60
+
+
+def plan_follow_up(job):
+    """Decides what a due lead's follow-up does: (outcome, new status, next follow-up date)."""
+    status = job['lead_status']
+    score = float(job['lead_score']) if job['lead_score'] is not None else None
+
+    if status not in OPEN_STATUSES:
+        return 'skipped', status, job['follow_up_date']
+    if job['follow_up_date'] is not None and job['follow_up_date'] > job['due_at']:
+        # Rescheduled by an agent after the job was queued
+        return 'rescheduled', status, job['follow_up_date']
+    if status == 'qualified' and score is not None and score >= CONVERT_SCORE:
+        return 'converted', 'converted', None
+    if job['follow_up_count'] + 1 >= MAX_FOLLOW_UPS:
+        return 'closed_lost', 'closed_lost', None
+
+    if status == 'new':
+        status = 'contacted'
+    elif status == 'contacted' and score is not None and score >= QUALIFY_SCORE:
+        status = 'qualified'
+    return 'followed_up', status, job['today'] + timedelta(days=NEXT_FOLLOW_UP_DAYS[status])
+
+
+class LeadFollowUpQueue:
+    """Queues due lead follow-ups and reports on the queue (LeadFollowUpJob)."""
+
+    def __init__(self, db_config):
+        self.db_config = db_config
+        self.conn = None
+        self.cursor = None
+
+    def connect_db(self):
+        """Connects to the database."""
+        try:
+            self.conn = psycopg2.connect(**self.db_config)
+            self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
+            logger.info("Database connection successful.")
+        except Exception as e:
+            logger.error(f"Database connection failed: {e}")
+            raise
+
+    def close_db(self):
+        """Closes the database connection."""
+        if self.cursor:
+            self.cursor.close()
+        if self.conn:
+            self.conn.close()
+        logger.info("Database connection closed.")
+
+    def enqueue(self, until=None):
+        """Queues every open lead due by until (default today); returns the number queued."""
+        self.cursor.execute("SELECT enqueue_due_follow_ups(COALESCE(%s::DATE, CURRENT_DATE)) AS queued", (until,))
+        queued = self.cursor.fetchone()['queued']
+        self.conn.commit()
+        logger.info(f"Queued {queued} lead follow-ups.")
+        return queued
+
+    def stats(self, since=None):
+        """Backlog, throughput and lag of the queue; throughput and lag cover jobs finished since since."""
+        self.cursor.execute("""
+            SELECT COUNT(*) FILTER (WHERE status = 'pending' AND run_after <= CURRENT_TIMESTAMP) AS ready,
+                   COUNT(*) FILTER (WHERE status = 'pending' AND run_after > CURRENT_TIMESTAMP) AS delayed,
+                   COUNT(*) FILTER (WHERE status = 'running') AS running,
+                   COUNT(*) FILTER (WHERE status = 'dead') AS dead,
+                   EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - MIN(run_after)
+                       FILTER (WHERE status = 'pending' AND run_after <= CURRENT_TIMESTAMP)) AS oldest_ready_seconds
+            FROM LeadFollowUpJob
+            WHERE status <> 'done'
+        """)
+        backlog = self.cursor.fetchone()
+
+        # Lag: from when a job became due (its due date, or when it was queued if later) until done
+        self.cursor.execute("""
+            WITH finished AS (
+                SELECT outcome, started_at, finished_at,
+                       EXTRACT(EPOCH FROM finished_at - GREATEST(due_at::TIMESTAMP, enqueued_at)) AS lag
+                FROM LeadFollowUpJob
+                WHERE status = 'done'
+                  AND finished_at >= COALESCE(%s::TIMESTAMP, CURRENT_TIMESTAMP - INTERVAL '1 hour')
+            )
+            SELECT COUNT(*) AS done,
+                   EXTRACT(EPOCH FROM MAX(finished_at) - MIN(started_at)) AS busy_seconds,
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY lag) AS lag_p50_seconds,
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY lag) AS lag_p95_seconds,
+                   MAX(lag) AS lag_max_seconds,
+                   (SELECT jsonb_object_agg(outcome, n)
+                    FROM (SELECT outcome, COUNT(*) AS n FROM finished GROUP BY outcome) counts) AS outcomes
+            FROM finished
+        """, (since,))
+        throughput = self.cursor.fetchone()
+        self.conn.rollback()
+
+        result = {**backlog, **throughput}
+        busy = float(result['busy_seconds'] or 0)
+        result['jobs_per_second'] = round(result['done'] / busy, 2) if busy > 0 else None
+        return result
+
+    def purge(self, days=30, batch_size=5000):
+        """Deletes finished jobs older than days, one short transaction per batch."""
+        total = 0
+        while True:
+            self.cursor.execute("""
+                DELETE FROM LeadFollowUpJob
+                WHERE job_id IN (
+                    SELECT job_id FROM LeadFollowUpJob
+                    WHERE status = 'done' AND finished_at < CURRENT_TIMESTAMP - make_interval(days => %s)
+                    LIMIT %s
+                )
+            """, (days, batch_size))
+            deleted = self.cursor.rowcount
+            self.conn.commit()
+            total += deleted
+            if deleted < batch_size:
+                break
+        logger.info(f"Purged {total} finished follow-up jobs.")
+        return total
+
+
+class LeadFollowUpWorker(LeadFollowUpQueue):
+    """
+    Claims due follow-ups in batches and applies them with bulk updates. Claims are leases
+    (locked_until), taken with FOR UPDATE SKIP LOCKED so concurrent workers never wait on
+    each other; a job is only completed by the worker that still holds its lease.
+    """
+
+    def __init__(self, db_config, worker_id=None, batch_size=200, visibility_timeout=300, page_size=1000):
+        super().__init__(db_config)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.batch_size = batch_size
+        self.visibility_timeout = visibility_timeout
+        self.page_size = page_size
+
+    def claim(self):
+        """Leases the next batch of ready jobs, highest lead score first."""
+        self.cursor.execute("SELECT release_expired_follow_ups() AS released")
+        released = self.cursor.fetchone()['released']
+        if released:
+            logger.warning(f"{self.worker_id}: released {released} follow-ups with expired leases.")
+
+        self.cursor.execute("""
+            WITH next AS (
+                SELECT job_id
+                FROM LeadFollowUpJob
+                WHERE status = 'pending' AND run_after <= CURRENT_TIMESTAMP
+                ORDER BY priority DESC, run_after
+                LIMIT %(batch_size)s
+                FOR UPDATE SKIP LOCKED
+            ),
+            claimed AS (
+                UPDATE LeadFollowUpJob j
+                SET status = 'running',
+                    attempts = j.attempts + 1,
+                    locked_by = %(worker_id)s,
+                    locked_until = CURRENT_TIMESTAMP + make_interval(secs => %(timeout)s),
+                    started_at = CURRENT_TIMESTAMP
+                FROM next
+                WHERE j.job_id = next.job_id
+                RETURNING j.job_id, j.lead_id, j.due_at, j.attempts, j.max_attempts
+            )
+            SELECT c.*, l.lead_status, l.lead_score, l.follow_up_date, l.follow_up_count,
+                   CURRENT_DATE AS today
+            FROM claimed c
+            JOIN ClientLead l ON l.lead_id = c.lead_id
+            ORDER BY c.lead_id
+        """, {'batch_size': self.batch_size, 'worker_id': self.worker_id, 'timeout': self.visibility_timeout})
+        jobs = self.cursor.fetchall()
+        self.conn.commit()
+        return jobs
+
+    def complete(self, jobs):
+        """Applies a batch in one transaction: lead updates, job results and the epoch bump."""
+        # Jobs whose lease expired and were taken by another worker are left to that worker
+        self.cursor.execute("""
+            SELECT job_id FROM LeadFollowUpJob
+            WHERE job_id = ANY(%s) AND status = 'running' AND locked_by = %s
+            ORDER BY job_id
+            FOR UPDATE
+        """, ([job['job_id'] for job in jobs], self.worker_id))
+        owned = {row['job_id'] for row in self.cursor.fetchall()}
+        jobs = [job for job in jobs if job['job_id'] in owned]
+
+        plans = {job['job_id']: plan_follow_up(job) for job in jobs}
+        changes = [
+            (job['lead_id'], job['lead_status'], plans[job['job_id']][1], plans[job['job_id']][2])
+            for job in jobs if plans[job['job_id']][0] not in ('skipped', 'rescheduled')
+        ]
+        updated = set()
+        if changes:
+            # The status guard skips leads an agent changed since the claim; conversions create
+            # their clients in the statement-level trigger of this one UPDATE
+            rows = execute_values(self.cursor, """
+                UPDATE ClientLead l
+                SET lead_status = v.lead_status,
+                    follow_up_date = v.follow_up_date,
+                    follow_up_count = l.follow_up_count + 1,
+                    last_contacted_at = CURRENT_TIMESTAMP
+                FROM (VALUES %s) AS v(lead_id, expected_status, lead_status, follow_up_date)
+                WHERE l.lead_id = v.lead_id AND l.lead_status = v.expected_status
+                RETURNING l.lead_id
+            """, changes, template="(%s, %s::lead_status_enum, %s::lead_status_enum, %s::DATE)",
+                page_size=self.page_size, fetch=True)
+            updated = {row['lead_id'] for row in rows}
+
+        outcomes = []
+        for job in jobs:
+            outcome = plans[job['job_id']][0]
+            if outcome not in ('skipped', 'rescheduled') and job['lead_id'] not in updated:
+                outcome = 'stale'
+            outcomes.append((job['job_id'], outcome))
+        if outcomes:
+            execute_values(self.cursor, """
+                UPDATE LeadFollowUpJob j
+                SET status = 'done',
+                    outcome = v.outcome,
+                    locked_by = NULL,
+                    locked_until = NULL,
+                    last_error = NULL,
+                    finished_at = CURRENT_TIMESTAMP
+                FROM (VALUES %s) AS v(job_id, outcome)
+                WHERE j.job_id = v.job_id
+            """, outcomes, template="(%s::BIGINT, %s)", page_size=self.page_size)
+
+        if updated:
+            converted = any(outcome == 'converted' for _, outcome in outcomes)
+            bump_data_epochs(self.cursor, ['ClientLead', 'Client'] if converted else ['ClientLead'])
+        self.conn.commit()
+        return Counter(outcome for _, outcome in outcomes)
+
+    def fail(self, jobs, error):
+        """Schedules a retry with exponential backoff, or buries jobs that are out of attempts."""
+        self.cursor.execute("""
+            UPDATE LeadFollowUpJob
+            SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'pending' END,
+                run_after = CURRENT_TIMESTAMP + make_interval(secs => %s * power(2, attempts - 1)),
+                finished_at = CASE WHEN attempts >= max_attempts THEN CURRENT_TIMESTAMP END,
+                last_error = %s,
+                locked_by = NULL,
+                locked_until = NULL
+            WHERE job_id = ANY(%s) AND status = 'running' AND locked_by = %s
+        """, (RETRY_DELAY, str(error)[:1000], [job['job_id'] for job in jobs], self.worker_id))
+        self.conn.commit()
+
+    def process(self, jobs):
+        """Completes a batch; if it fails, completes its jobs one by one so one bad lead fails alone."""
+        try:
+            return self.complete(jobs)
+        except Exception as e:
+            self.conn.rollback()
+            if len(jobs) == 1:
+                logger.error(f"{self.worker_id}: follow-up job {jobs[0]['job_id']} failed: {e}")
+                self.fail(jobs, e)
+                return Counter(failed=1)
+            logger.warning(f"{self.worker_id}: batch of {len(jobs)} failed ({e}); retrying jobs one by one.")
+
+        outcomes = Counter()
+        for job in jobs:
+            outcomes.update(self.process([job]))
+        return outcomes
+
+    def run(self, follow=False, poll_interval=5.0, max_batches=None):
+        """Processes batches until the queue is empty (or forever with follow); returns counters."""
+        outcomes = Counter()
+        batches = 0
+        started = time.perf_counter()
+        while max_batches is None or batches < max_batches:
+            jobs = self.claim()
+            if not jobs:
+                if not follow:
+                    break
+                time.sleep(poll_interval)
+                continue
+            outcomes.update(self.process(jobs))
+            batches += 1
+
+        elapsed = time.perf_counter() - started
+        jobs_done = sum(outcomes.values())
+        logger.info(f"{self.worker_id}: {jobs_done} jobs in {batches} batches, "
+                    f"{jobs_done / elapsed if elapsed else 0:.1f} jobs/s {dict(outcomes)}")
+        return {'worker_id': self.worker_id, 'jobs': jobs_done, 'batches': batches,
+                'seconds': elapsed, 'outcomes': dict(outcomes)}
+
+
+def run_worker(db_config, worker_number, options, results):
+    """Process entry point: one worker with its own connection."""
+    worker = LeadFollowUpWorker(db_config, f"{socket.gethostname()}:{os.getpid()}:{worker_number}",
+                                options['batch_size'], options['visibility_timeout'])
+    worker.connect_db()
+    try:
+        results.put(worker.run(options['follow'], options['poll_interval'], options['max_batches']))
+    finally:
+        worker.close_db()
+
+
+def run_workers(db_config, workers=4, batch_size=200, visibility_timeout=300, follow=False,
+                poll_interval=5.0, max_batches=None):
+    """Runs worker processes in parallel until the queue drains; returns per-worker results."""
+    options = {'batch_size': batch_size, 'visibility_timeout': visibility_timeout, 'follow': follow,
+               'poll_interval': poll_interval, 'max_batches': max_batches}
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    processes = [context.Process(target=run_worker, args=(db_config, n, options, results))
+                 for n in range(workers)]
+    for process in processes:
+        process.start()
+
+    reports = []
+    try:
+        while len(reports) < len(processes):
+            if not any(process.is_alive() for process in processes) and results.empty():
+                break
+            try:
+                reports.append(results.get(timeout=1))
+            except Empty:
+                continue
+    finally:
+        for process in processes:
+            process.join()
+
+    failed = [process.pid for process in processes if process.exitcode]
+    if failed:
+        logger.error(f"Worker processes exited with errors: {failed}")
+    return reports
+
+
+def log_stats(stats):
+    def seconds(value):
+        return '-' if value is None else f"{float(value):.1f}s"
+
+    logger.info(f"Backlog: {stats['ready']} ready, {stats['delayed']} delayed, {stats['running']} running, "
+                f"{stats['dead']} dead; oldest ready {seconds(stats['oldest_ready_seconds'])}")
+    logger.info(f"Finished: {stats['done']} jobs, {stats['jobs_per_second'] or '-'} jobs/s; "
+                f"lag p50 {seconds(stats['lag_p50_seconds'])}, p95 {seconds(stats['lag_p95_seconds'])}, "
+                f"max {seconds(stats['lag_max_seconds'])}; {stats['outcomes'] or {}}")
+
+
+def main():
+    """Main function"""
+    from config import DATABASE_CONFIG
+
+    parser = argparse.ArgumentParser(description="Process due client lead follow-ups.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    enqueue = commands.add_parser('enqueue', help="Queue open leads due by a date")
+    enqueue.add_argument('--until', help="Due date cut-off (YYYY-MM-DD, default today)")
+    work = commands.add_parser('work', help="Queue due leads and process them with parallel workers")
+    work.add_argument('--workers', type=int, default=4)
+    work.add_argument('--batch-size', type=int, default=200)
+    work.add_argument('--visibility-timeout', type=int, default=300,
+                      help="Seconds before a claimed job is handed to another worker")
+    work.add_argument('--follow', action='store_true', help="Keep polling instead of stopping when empty")
+    work.add_argument('--poll-interval', type=float, default=5.0)
+    work.add_argument('--max-batches', type=int, help="Batches per worker before it stops")
+    work.add_argument('--no-enqueue', action='store_true')
+    commands.add_parser('stats', help="Backlog, throughput and lag over the last hour")
+    purge = commands.add_parser('purge', help="Delete finished jobs")
+    purge.add_argument('--days', type=int, default=30)
+    args = parser.parse_args()
+
+    queue = LeadFollowUpQueue(DATABASE_CONFIG)
+    queue.connect_db()
+    try:
+        if args.command == 'enqueue':
+            queue.enqueue(args.until)
+        elif args.command == 'stats':
+            log_stats(queue.stats())
+        elif args.command == 'purge':
+            queue.purge(args.days)
+        elif args.command == 'work':
+            if not args.no_enqueue:
+                queue.enqueue()
+            queue.cursor.execute("SELECT CURRENT_TIMESTAMP AS now")
+            started_at = queue.cursor.fetchone()['now']
+            queue.conn.rollback()
+
+            started = time.perf_counter()
+            reports = run_workers(DATABASE_CONFIG, args.workers, args.batch_size, args.visibility_timeout,
+                                  args.follow, args.poll_interval, args.max_batches)
+            elapsed = time.perf_counter() - started
+            jobs_done = sum(report['jobs'] for report in reports)
+            logger.info(f"{len(reports)} workers processed {jobs_done} jobs in {elapsed:.1f}s "
+                        f"({jobs_done / elapsed if elapsed else 0:.1f} jobs/s)")
+            log_stats(queue.stats(started_at))
+    finally:
+        queue.close_db()
+
+
+if __name__ == "__main__":
+    main()
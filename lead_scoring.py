@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2.extras import RealDictCursor, execute_values
+
+from result_cache import bump_data_epochs
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Logistic model over the transformed LeadFeature columns; override with --weights
+DEFAULT_WEIGHTS = {
+    'intercept': -1.5,
+    'log_appointments': 0.35,
+    'completed_ratio': 0.4,
+    'positive_outcomes': 0.9,
+    'concern_outcomes': -0.5,
+    'no_shows': -0.8,
+    'source_conversion_rate': 1.6,
+    'log_budget_fit': 0.3,
+    'budget_unknown': -0.4,
+    'property_available': 0.5,
+    'has_contact': 0.3,
+}
+
+FEATURE_COLUMNS = [name for name in DEFAULT_WEIGHTS if name != 'intercept']
+
+
+def design_matrix(features):
+    """Transforms LeadFeature rows into the model's input columns (vectorized)."""
+    appointments = features['appointment_count'].to_numpy(dtype=np.float64)
+    budget_fit = features['budget_fit_count'].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    columns = {
+        'log_appointments': np.log1p(appointments),
+        'completed_ratio': np.divide(
+            features['completed_appointments'].to_numpy(dtype=np.float64), appointments,
+            out=np.zeros_like(appointments), where=appointments > 0
+        ),
+        'positive_outcomes': np.log1p(features['positive_outcomes'].to_numpy(dtype=np.float64)),
+        'concern_outcomes': np.log1p(features['concern_outcomes'].to_numpy(dtype=np.float64)),
+        'no_shows': np.log1p(features['no_shows'].to_numpy(dtype=np.float64)),
+        'source_conversion_rate': features['source_conversion_rate'].to_numpy(dtype=np.float64),
+        'log_budget_fit': np.log1p(np.nan_to_num(budget_fit, nan=0.0)),
+        'budget_unknown': np.isnan(budget_fit).astype(np.float64),
+        'property_available': features['property_available'].to_numpy(dtype=np.float64),
+        'has_contact': features['has_contact'].to_numpy(dtype=np.float64),
+    }
+    return np.column_stack([columns[name] for name in FEATURE_COLUMNS])
+
+
+def score_leads(features, weights=None):
+    """Returns a conversion probability per lead."""
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    if features.empty:
+        return np.empty(0)
+    coefficients = np.array([weights[name] for name in FEATURE_COLUMNS])
+    logits = design_matrix(features) @ coefficients + weights['intercept']
+    return 1.0 / (1.0 + np.exp(-logits))
+
+
+class LeadScoringPipeline:
+    """Refreshes LeadFeature, scores the leads whose inputs changed and writes scores to ClientLead."""
+
+    def __init__(self, db_config, weights=None, page_size=1000):
+        self.db_config = db_config
+        self.weights = weights
+        self.page_size = page_size
+        self.conn = None
+        self.cursor = None
+
+    def connect_db(self):
+        """Connects to the database."""
+        try:
+            self.conn = psycopg2.connect(**self.db_config)
+            self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
+            logger.info("Database connection successful.")
+        except Exception as e:
+            logger.error(f"Database connection failed: {e}")
+            raise
+
+    def close_db(self):
+        """Closes the database connection."""
+        if self.cursor:
+            self.cursor.close()
+        if self.conn:
+            self.conn.close()
+        logger.info("Database connection closed.")
+
+    def load_features(self, full=False):
+        """Loads features of leads never scored or whose features changed since their last score."""
+        self.cursor.execute("""
+            SELECT lf.*
+            FROM LeadFeature lf
+            JOIN ClientLead cl ON cl.lead_id = lf.lead_id
+            WHERE %s OR cl.scored_at IS NULL OR lf.computed_at > cl.scored_at
+            ORDER BY lf.lead_id
+        """, (full,))
+        return pd.DataFrame(self.cursor.fetchall())
+
+    def write_scores(self, lead_ids, scores):
+        """Writes scores back with one UPDATE ... FROM VALUES per page."""
+        rows = [(int(lead_id), round(float(score), 4)) for lead_id, score in zip(lead_ids, scores)]
+        execute_values(self.cursor, """
+            UPDATE ClientLead cl
+            SET lead_score = v.lead_score,
+                scored_at = CURRENT_TIMESTAMP
+            FROM (VALUES %s) AS v(lead_id, lead_score)
+            WHERE cl.lead_id = v.lead_id
+        """, rows, template="(%s, %s::DECIMAL(5,4))", page_size=self.page_size)
+
+    def run(self, full=False):
+        """Refreshes features and rescores in one transaction; returns the number of leads scored."""
+        try:
+            self.cursor.execute("SELECT refresh_lead_features() AS changed")
+            changed = self.cursor.fetchone()['changed']
+
+            features = self.load_features(full)
+            scores = score_leads(features, self.weights)
+            if len(scores):
+                self.write_scores(features['lead_id'], scores)
+                bump_data_epochs(self.cursor, ['ClientLead', 'LeadFeature'])
+            self.conn.commit()
+        except Exception as e:
+            logger.error(f"Lead scoring failed: {e}")
+            self.conn.rollback()
+            raise
+
+        logger.info(f"Lead features changed: {changed}; leads scored: {len(scores)}")
+        return len(scores)
+
+    def top_leads(self, agent_id=None, limit=20):
+        """Returns the highest-scored open leads, optionally for one agent."""
+        self.cursor.execute("""
+            SELECT lead_id, first_name, last_name, lead_source, interest_type,
+                   budget_min, budget_max, assigned_agent_id, lead_score, scored_at
+            FROM ClientLead
+            WHERE lead_status NOT IN ('converted', 'closed_lost')
+              AND lead_score IS NOT NULL
+              AND (%(agent_id)s IS NULL OR assigned_agent_id = %(agent_id)s)
+            ORDER BY lead_score DESC
+            LIMIT %(limit)s
+        """, {'agent_id': agent_id, 'limit': limit})
+        rows = self.cursor.fetchall()
+        self.conn.rollback()
+        return rows
+
+
+def main():
+    """Main function"""
+    from config import DATABASE_CONFIG
+
+    parser = argparse.ArgumentParser(description="Score open client leads.")
+    parser.add_argument('--full', action='store_true', help="Rescore every open lead, not only changed ones")
+    parser.add_argument('--weights', help="JSON file overriding model weights")
+    parser.add_argument('--top', type=int, default=0, help="Print the N best leads after scoring")
+    parser.add_argument('--agent-id', type=int)
+    args = parser.parse_args()
+
+    weights = None
+    if args.weights:
+        with open(args.weights, encoding='utf-8') as f:
+            weights = json.load(f)
+
+    pipeline = LeadScoringPipeline(DATABASE_CONFIG, weights)
+    pipeline.connect_db()
+    try:
+        pipeline.run(full=args.full)
+        for lead in pipeline.top_leads(args.agent_id, args.top) if args.top else []:
+            print(f"{lead['lead_score']:.3f}  #{lead['lead_id']:<6} {lead['first_name']} {lead['last_name']}"
+                  f"  ({lead['lead_source']}, {lead['interest_type']})")
+    finally:
+        pipeline.close_db()
+
+
+if __name__ == "__main__":
+    main()
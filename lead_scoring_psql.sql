@@ -0,0 +1,125 @@
+-- Lead scoring: precomputed per-lead features and the score written back to ClientLead.
+-- Run after ans_psql.sql. refresh_lead_features() is called by lead_scoring.py.
+
+ALTER TABLE ClientLead ADD COLUMN IF NOT EXISTS lead_score DECIMAL(5,4);
+ALTER TABLE ClientLead ADD COLUMN IF NOT EXISTS scored_at TIMESTAMP;
+
+-- Agents' ranked work lists: open leads by score
+CREATE INDEX IF NOT EXISTS idx_lead_open_score ON ClientLead (assigned_agent_id, lead_score DESC)
+    WHERE lead_status NOT IN ('converted', 'closed_lost');
+
+-- Budget fit counts active inventory in a price range
+CREATE INDEX IF NOT EXISTS idx_property_active_price ON Property (list_price)
+    WHERE current_status = 'active';
+
+-- 21. LeadFeature: model inputs per open lead; input_hash changes only when an input changes
+DROP TABLE IF EXISTS LeadFeature CASCADE;
+CREATE TABLE LeadFeature (
+    lead_id INTEGER PRIMARY KEY,
+    appointment_count INTEGER NOT NULL DEFAULT 0,
+    completed_appointments INTEGER NOT NULL DEFAULT 0,
+    positive_outcomes INTEGER NOT NULL DEFAULT 0,
+    concern_outcomes INTEGER NOT NULL DEFAULT 0,
+    no_shows INTEGER NOT NULL DEFAULT 0,
+    source_conversion_rate DECIMAL(5,4) NOT NULL,
+    budget_fit_count INTEGER,
+    property_available BOOLEAN NOT NULL DEFAULT FALSE,
+    has_contact BOOLEAN NOT NULL DEFAULT FALSE,
+    input_hash CHAR(32) NOT NULL,
+    computed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (lead_id) REFERENCES ClientLead(lead_id) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_lead_feature_computed ON LeadFeature (computed_at);
+
+-- Recomputes the features of every open lead in one statement and upserts only the rows whose
+-- inputs changed (computed_at moves forward for those). Features of closed leads are removed.
+-- Appointments are matched to a lead through its property and the client's name, as the ETL
+-- creates both from the same buyer record. Returns the number of leads with changed features.
+CREATE OR REPLACE FUNCTION refresh_lead_features()
+RETURNS INTEGER AS $$
+DECLARE
+    changed_count INTEGER;
+BEGIN
+    DELETE FROM LeadFeature lf
+    USING ClientLead cl
+    WHERE cl.lead_id = lf.lead_id
+      AND cl.lead_status IN ('converted', 'closed_lost');
+
+    WITH open_lead AS (
+        SELECT cl.*
+        FROM ClientLead cl
+        WHERE cl.lead_status NOT IN ('converted', 'closed_lost')
+    ),
+    -- Laplace-smoothed share of decided leads per source that converted
+    source_rate AS (
+        SELECT lead_source,
+               ROUND((COUNT(*) FILTER (WHERE lead_status = 'converted') + 1)::DECIMAL
+                     / (COUNT(*) FILTER (WHERE lead_status IN ('converted', 'closed_lost')) + 2), 4) AS rate
+        FROM ClientLead
+        GROUP BY lead_source
+    ),
+    visits AS (
+        SELECT ol.lead_id,
+               COUNT(a.appointment_id) AS appointment_count,
+               COUNT(*) FILTER (WHERE a.status = 'completed') AS completed_appointments,
+               COUNT(*) FILTER (WHERE a.feedback ILIKE ANY (ARRAY['%very interested%', '%ready to offer%', '%loved%']))
+                   AS positive_outcomes,
+               COUNT(*) FILTER (WHERE a.feedback ILIKE ANY (ARRAY['%concern%', '%not interested%']))
+                   AS concern_outcomes,
+               COUNT(*) FILTER (WHERE a.status = 'no_show') AS no_shows
+        FROM open_lead ol
+        JOIN Client c ON c.full_name = TRIM(ol.first_name || ' ' || ol.last_name)
+        JOIN Appointment a ON a.client_id = c.client_id AND a.property_id = ol.property_id
+        GROUP BY ol.lead_id
+    ),
+    features AS (
+        SELECT ol.lead_id,
+               COALESCE(v.appointment_count, 0) AS appointment_count,
+               COALESCE(v.completed_appointments, 0) AS completed_appointments,
+               COALESCE(v.positive_outcomes, 0) AS positive_outcomes,
+               COALESCE(v.concern_outcomes, 0) AS concern_outcomes,
+               COALESCE(v.no_shows, 0) AS no_shows,
+               sr.rate AS source_conversion_rate,
+               CASE WHEN ol.budget_min IS NULL AND ol.budget_max IS NULL THEN NULL ELSE (
+                   SELECT COUNT(*)
+                   FROM Property p
+                   WHERE p.current_status = 'active'
+                     AND p.list_price BETWEEN COALESCE(ol.budget_min, 0) AND COALESCE(ol.budget_max, ol.budget_min * 1.25)
+               ) END AS budget_fit_count,
+               COALESCE(p.current_status = 'active', FALSE) AS property_available,
+               (ol.email IS NOT NULL OR ol.phone IS NOT NULL) AS has_contact
+        FROM open_lead ol
+        JOIN source_rate sr ON sr.lead_source = ol.lead_source
+        LEFT JOIN visits v ON v.lead_id = ol.lead_id
+        LEFT JOIN Property p ON p.property_id = ol.property_id
+    )
+    INSERT INTO LeadFeature (
+        lead_id, appointment_count, completed_appointments, positive_outcomes, concern_outcomes,
+        no_shows, source_conversion_rate, budget_fit_count, property_available, has_contact, input_hash
+    )
+    SELECT f.lead_id, f.appointment_count, f.completed_appointments, f.positive_outcomes,
+           f.concern_outcomes, f.no_shows, f.source_conversion_rate, f.budget_fit_count,
+           f.property_available, f.has_contact,
+           md5(concat_ws('|', f.appointment_count, f.completed_appointments, f.positive_outcomes,
+                         f.concern_outcomes, f.no_shows, f.source_conversion_rate, f.budget_fit_count,
+                         f.property_available, f.has_contact))
+    FROM features f
+    ON CONFLICT (lead_id) DO UPDATE SET
+        appointment_count = EXCLUDED.appointment_count,
+        completed_appointments = EXCLUDED.completed_appointments,
+        positive_outcomes = EXCLUDED.positive_outcomes,
+        concern_outcomes = EXCLUDED.concern_outcomes,
+        no_shows = EXCLUDED.no_shows,
+        source_conversion_rate = EXCLUDED.source_conversion_rate,
+        budget_fit_count = EXCLUDED.budget_fit_count,
+        property_available = EXCLUDED.property_available,
+        has_contact = EXCLUDED.has_contact,
+        input_hash = EXCLUDED.input_hash,
+        computed_at = CURRENT_TIMESTAMP
+    WHERE LeadFeature.input_hash <> EXCLUDED.input_hash;
+
+    GET DIAGNOSTICS changed_count = ROW_COUNT;
+    RETURN changed_count;
+END;
+$$ LANGUAGE plpgsql;
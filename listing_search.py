@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import logging
+import time
+from array import array
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Same bands as final_q.sql Question 1
+PRICE_BANDS = [
+    (300000, 'Under $300K'),
+    (500000, '$300K-500K'),
+    (750000, '$500K-750K'),
+    (None, 'Over $750K'),
+]
+
+FACETS = ['city', 'zip_code', 'property_type', 'bedrooms', 'price_band', 'status', 'amenity']
+
+LISTING_SQL = """
+    SELECT p.property_id, p.city, p.zip_code, pt.type_name AS property_type,
+           p.bedrooms, p.bathrooms, p.square_footage, p.list_price,
+           p.current_status AS status,
+           ARRAY_REMOVE(ARRAY_AGG(DISTINCT LOWER(pf.feature_name)), NULL) AS amenities
+    FROM Property p
+    JOIN PropertyType pt ON pt.type_id = p.property_type_id
+    LEFT JOIN PropertyFeature pf ON pf.property_id = p.property_id
+    {where}
+    GROUP BY p.property_id, pt.type_name
+"""
+
+
+def price_band(list_price):
+    """Maps a list price to its band label."""
+    for upper, label in PRICE_BANDS:
+        if upper is None or list_price < upper:
+            return label
+
+
+def mask_to_bitmap(mask):
+    """Converts a NumPy boolean mask to an int bitmap (bit i = row i)."""
+    return int.from_bytes(np.packbits(mask, bitorder='little').tobytes(), 'little')
+
+
+def bitmap_to_rows(bitmap, limit=None):
+    """Returns the row numbers set in a bitmap, lowest first."""
+    if not bitmap:
+        return np.empty(0, dtype=np.int64)
+    raw = np.frombuffer(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little'), dtype=np.uint8)
+    rows = np.flatnonzero(np.unpackbits(raw, bitorder='little'))
+    return rows[:limit] if limit else rows
+
+
+class ListingSearchIndex:
+    """
+    Read-optimized listing search: array-backed numeric columns plus one bitmap per facet value.
+    Filters are ORed within a facet and ANDed across facets; counts follow the same rule, so
+    each facet's counts ignore that facet's own selection (disjunctive faceting).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Empties the index."""
+        self.property_ids = array('q')
+        self.list_price = array('d')
+        self.square_footage = array('d')
+        self.row_of = {}
+        self.row_facets = []
+        self.bitmaps = {facet: defaultdict(int) for facet in FACETS}
+        self.live = 0
+        self.synced_at = None
+
+    def __len__(self):
+        return self.live.bit_count()
+
+    def facet_values(self, listing):
+        """Returns the facet values of one listing row."""
+        return {
+            'city': (listing['city'],) if listing['city'] else (),
+            'zip_code': (listing['zip_code'],) if listing['zip_code'] else (),
+            'property_type': (listing['property_type'],) if listing['property_type'] else (),
+            'bedrooms': (int(listing['bedrooms']),) if listing['bedrooms'] is not None else (),
+            'price_band': (price_band(float(listing['list_price'])),),
+            'status': (str(listing['status']),),
+            'amenity': tuple(listing['amenities'] or ()),
+        }
+
+    def build(self, listings):
+        """Builds the index from scratch; bitmaps are packed column-wise from NumPy masks."""
+        self.reset()
+        columns = defaultdict(list)
+        for row, listing in enumerate(listings):
+            self.row_of[listing['property_id']] = row
+            self.property_ids.append(listing['property_id'])
+            self.list_price.append(float(listing['list_price']))
+            self.square_footage.append(float(listing['square_footage'] or 'nan'))
+            values = self.facet_values(listing)
+            self.row_facets.append(values)
+            for facet, facet_values in values.items():
+                for value in facet_values:
+                    columns[(facet, value)].append(row)
+
+        size = len(self.property_ids)
+        for (facet, value), rows in columns.items():
+            mask = np.zeros(size, dtype=bool)
+            mask[rows] = True
+            self.bitmaps[facet][value] = mask_to_bitmap(mask)
+        self.live = (1 << size) - 1
+        logger.info(f"Built listing index: {size} listings, "
+                    f"{sum(len(values) for values in self.bitmaps.values())} facet bitmaps.")
+
+    def upsert(self, listing):
+        """Applies one changed listing (delta) in place."""
+        row = self.row_of.get(listing['property_id'])
+        if row is None:
+            row = len(self.property_ids)
+            self.row_of[listing['property_id']] = row
+            self.property_ids.append(listing['property_id'])
+            self.list_price.append(0.0)
+            self.square_footage.append(float('nan'))
+            self.row_facets.append({facet: () for facet in FACETS})
+
+        bit = 1 << row
+        for facet, old_values in self.row_facets[row].items():
+            for value in old_values:
+                self.bitmaps[facet][value] &= ~bit
+
+        values = self.facet_values(listing)
+        for facet, new_values in values.items():
+            for value in new_values:
+                self.bitmaps[facet][value] |= bit
+
+        self.row_facets[row] = values
+        self.list_price[row] = float(listing['list_price'])
+        self.square_footage[row] = float(listing['square_footage'] or 'nan')
+        self.live |= bit
+
+    def remove(self, property_id):
+        """Drops a listing from all results."""
+        row = self.row_of.get(property_id)
+        if row is not None:
+            self.live &= ~(1 << row)
+
+    def selection(self, facet, values):
+        """OR of the bitmaps of the selected values of one facet."""
+        if not isinstance(values, (list, tuple, set)):
+            values = [values]
+        bitmap = 0
+        for value in values:
+            bitmap |= self.bitmaps[facet].get(value, 0)
+        return bitmap
+
+    def range_bitmap(self, price_min=None, price_max=None, sqft_min=None):
+        """Bitmap of rows inside numeric ranges, evaluated over the array columns."""
+        mask = np.ones(len(self.list_price), dtype=bool)
+        prices = np.frombuffer(self.list_price, dtype=np.float64)
+        if price_min is not None:
+            mask &= prices >= price_min
+        if price_max is not None:
+            mask &= prices <= price_max
+        if sqft_min is not None:
+            mask &= np.frombuffer(self.square_footage, dtype=np.float64) >= sqft_min
+        return mask_to_bitmap(mask)
+
+    def search(self, filters=None, price_min=None, price_max=None, sqft_min=None,
+               limit=20, facets=FACETS):
+        """Returns matching property ids, the total, and per-facet counts for a combined query."""
+        filters = {facet: values for facet, values in (filters or {}).items() if values not in (None, [], ())}
+        base = self.live
+        if price_min is not None or price_max is not None or sqft_min is not None:
+            base &= self.range_bitmap(price_min, price_max, sqft_min)
+
+        selections = {facet: self.selection(facet, values) for facet, values in filters.items()}
+        matched = base
+        for bitmap in selections.values():
+            matched &= bitmap
+
+        counts = {}
+        for facet in facets:
+            # Counts for a facet apply every filter except the facet's own
+            scope = base
+            for other, bitmap in selections.items():
+                if other != facet:
+                    scope &= bitmap
+            counts[facet] = {
+                value: count for value, bitmap in self.bitmaps[facet].items()
+                if (count := (scope & bitmap).bit_count())
+            }
+
+        rows = bitmap_to_rows(matched, limit)
+        return {
+            'total': matched.bit_count(),
+            'property_ids': [self.property_ids[row] for row in rows],
+            'facets': counts,
+        }
+
+
+class ListingSearchService:
+    """Keeps a ListingSearchIndex in sync with Property/PropertyFeature and benchmarks it against SQL."""
+
+    def __init__(self, db_config, overlap_seconds=60):
+        self.db_config = db_config
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.index = ListingSearchIndex()
+        self.conn = None
+        self.cursor = None
+
+    def connect_db(self):
+        """Connects to the database."""
+        try:
+            self.conn = psycopg2.connect(**self.db_config)
+            self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
+            logger.info("Database connection successful.")
+        except Exception as e:
+            logger.error(f"Database connection failed: {e}")
+            raise
+
+    def close_db(self):
+        """Closes the database connection."""
+        if self.cursor:
+            self.cursor.close()
+        if self.conn:
+            self.conn.close()
+        logger.info("Database connection closed.")
+
+    def database_now(self):
+        self.cursor.execute("SELECT LOCALTIMESTAMP AS now")
+        return self.cursor.fetchone()['now']
+
+    def load(self):
+        """Builds the index from all listings."""
+        synced_at = self.database_now()
+        self.cursor.execute(LISTING_SQL.format(where=''))
+        self.index.build(self.cursor.fetchall())
+        self.index.synced_at = synced_at
+        self.conn.rollback()
+
+    def sync(self):
+        """
+        Applies listings changed since the last sync: Property updates, new or deleted features
+        (re-read), and deleted properties (removed), the deletes found in RowDeletion (V0008).
+        """
+        if self.index.synced_at is None:
+            return self.load()
+
+        synced_at = self.database_now()
+        since = self.index.synced_at - self.overlap
+        self.cursor.execute("""
+            SELECT DISTINCT row_id AS property_id FROM RowDeletion
+            WHERE table_name = 'property' AND deleted_at > %(since)s
+        """, {'since': since})
+        deleted = [row['property_id'] for row in self.cursor.fetchall()]
+        for property_id in deleted:
+            self.index.remove(property_id)
+
+        self.cursor.execute(LISTING_SQL.format(where="""
+            WHERE p.updated_at > %(since)s
+               OR p.property_id IN (SELECT property_id FROM PropertyFeature WHERE created_at > %(since)s)
+               OR p.property_id IN (SELECT parent_id FROM RowDeletion
+                                    WHERE table_name = 'propertyfeature' AND deleted_at > %(since)s)
+        """), {'since': since})
+        changed = self.cursor.fetchall()
+        for listing in changed:
+            self.index.upsert(listing)
+        self.index.synced_at = synced_at
+        self.conn.rollback()
+        logger.info(f"Synced {len(changed)} changed and {len(deleted)} deleted listings.")
+        return len(changed) + len(deleted)
+
+    def sql_search(self, filters=None, price_min=None, price_max=None, limit=20, facets=FACETS):
+        """Answers the same faceted query in SQL: one result query plus one GROUP BY per facet."""
+        filters = {facet: values for facet, values in (filters or {}).items() if values not in (None, [], ())}
+        facet_sql = {
+            'city': 'p.city',
+            'zip_code': 'p.zip_code',
+            'property_type': 'pt.type_name',
+            'bedrooms': 'p.bedrooms',
+            'status': 'p.current_status::text',
+            'price_band': """CASE WHEN p.list_price < 300000 THEN 'Under $300K'
+                                  WHEN p.list_price < 500000 THEN '$300K-500K'
+                                  WHEN p.list_price < 750000 THEN '$500K-750K'
+                                  ELSE 'Over $750K' END""",
+        }
+
+        def where(skip=None):
+            clauses, params = ['TRUE'], []
+            if price_min is not None:
+                clauses.append('p.list_price >= %s')
+                params.append(price_min)
+            if price_max is not None:
+                clauses.append('p.list_price <= %s')
+                params.append(price_max)
+            for facet, values in filters.items():
+                if facet == skip:
+                    continue
+                values = list(values) if isinstance(values, (list, tuple, set)) else [values]
+                if facet == 'amenity':
+                    clauses.append("""EXISTS (SELECT 1 FROM PropertyFeature f
+                                              WHERE f.property_id = p.property_id
+                                                AND LOWER(f.feature_name) = ANY(%s))""")
+                else:
+                    clauses.append(f"({facet_sql[facet]}) = ANY(%s)")
+                params.append(values)
+            return ' AND '.join(clauses), params
+
+        base_from = """FROM Property p JOIN PropertyType pt ON pt.type_id = p.property_type_id"""
+        clause, params = where()
+        self.cursor.execute(f"SELECT COUNT(*) AS total {base_from} WHERE {clause}", params)
+        total = self.cursor.fetchone()['total']
+        self.cursor.execute(
+            f"SELECT p.property_id {base_from} WHERE {clause} ORDER BY p.property_id LIMIT %s", params + [limit]
+        )
+        property_ids = [row['property_id'] for row in self.cursor.fetchall()]
+
+        counts = {}
+        for facet in facets:
+            clause, params = where(skip=facet)
+            if facet == 'amenity':
+                sql = f"""SELECT LOWER(f.feature_name) AS value, COUNT(DISTINCT p.property_id) AS n
+                          {base_from} JOIN PropertyFeature f ON f.property_id = p.property_id
+                          WHERE {clause} GROUP BY 1"""
+            else:
+                sql = f"SELECT {facet_sql[facet]} AS value, COUNT(*) AS n {base_from} WHERE {clause} GROUP BY 1"
+            self.cursor.execute(sql, params)
+            counts[facet] = {row['value']: row['n'] for row in self.cursor.fetchall() if row['value'] is not None}
+        self.conn.rollback()
+        return {'total': total, 'property_ids': property_ids, 'facets': counts}
+
+    def check_answers(self, query):
+        """Raises ValueError unless the index and SQL agree on a query's total and facet counts."""
+        memory, sql = self.index.search(**query), self.sql_search(**query)
+        problems = []
+        if memory['total'] != sql['total']:
+            problems.append(f"total {memory['total']} in memory, {sql['total']} in SQL")
+        for facet, counts in sql['facets'].items():
+            if memory['facets'].get(facet) != counts:
+                problems.append(f"{facet} counts {memory['facets'].get(facet)} in memory, {counts} in SQL")
+        if problems:
+            raise ValueError(f"Index out of sync for {query}: {'; '.join(problems)}")
+
+    def benchmark(self, queries, repeat=50):
+        """
+        Times each faceted query in memory and in SQL; returns rows of median latencies in ms.
+        Each query is first checked to give the same answer both ways, so no speedup is
+        reported for a stale index.
+        """
+        for query in queries:
+            self.check_answers(query)
+
+        results = []
+        for query in queries:
+            timings = {}
+            for name, runner in (('memory', self.index.search), ('sql', self.sql_search)):
+                samples = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    answer = runner(**query)
+                    samples.append((time.perf_counter() - started) * 1000)
+                timings[name] = float(np.median(samples))
+                timings[f"{name}_total"] = answer['total']
+            results.append({'query': query, **timings, 'speedup': timings['sql'] / max(timings['memory'], 1e-9)})
+        return results
+
+
+# Representative combined queries used by the benchmark
+BENCHMARK_QUERIES = [
+    {'filters': {'city': ['Brooklyn'], 'bedrooms': [2, 3]}},
+    {'filters': {'status': ['active'], 'price_band': ['$500K-750K'], 'amenity': ['doorman']}},
+    {'filters': {'property_type': ['Condominium', 'Cooperative'], 'amenity': ['gym', 'elevator']},
+     'price_min': 400000, 'price_max': 900000},
+    {'filters': {}},
+]
+
+
+def main():
+    """Main function"""
+    from config import DATABASE_CONFIG
+
+    parser = argparse.ArgumentParser(description="In-memory faceted listing search.")
+    parser.add_argument('--benchmark', action='store_true', help="Compare with the equivalent SQL")
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--city', action='append')
+    parser.add_argument('--bedrooms', type=int, action='append')
+    parser.add_argument('--amenity', action='append')
+    parser.add_argument('--price-min', type=float)
+    parser.add_argument('--price-max', type=float)
+    args = parser.parse_args()
+
+    service = ListingSearchService(DATABASE_CONFIG)
+    service.connect_db()
+    try:
+        service.load()
+        if args.benchmark:
+            for result in service.benchmark(BENCHMARK_QUERIES, args.repeat):
+                print(f"memory {result['memory']:8.3f} ms | sql {result['sql']:8.3f} ms | "
+                      f"x{result['speedup']:7.1f} | {result['memory_total']} hits | {result['query']}")
+        else:
+            answer = service.index.search(
+                {'city': args.city, 'bedrooms': args.bedrooms, 'amenity': args.amenity},
+                args.price_min, args.price_max
+            )
+            print(f"{answer['total']} listings: {answer['property_ids']}")
+            for facet, counts in answer['facets'].items():
+                print(f"  {facet}: {dict(sorted(counts.items(), key=lambda kv: -kv[1]))}")
+    finally:
+        service.close_db()
+
+
+if __name__ == "__main__":
+    main()
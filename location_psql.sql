@@ -0,0 +1,186 @@
+-- Location dimension: zip -> borough/neighborhood reference and an integer location key
+-- on Property and Office. Run after ans_psql.sql; the ETL fills location_id on load.
+
+-- 22. ZipNeighborhood: local reference of the service area's zip codes
+DROP TABLE IF EXISTS ZipNeighborhood CASCADE;
+CREATE TABLE ZipNeighborhood (
+    zip_code VARCHAR(10) PRIMARY KEY,
+    state CHAR(2) NOT NULL,
+    city VARCHAR(50) NOT NULL,
+    borough VARCHAR(50),
+    neighborhood VARCHAR(100) NOT NULL
+);
+
+INSERT INTO ZipNeighborhood (zip_code, state, city, borough, neighborhood) VALUES
+    -- Manhattan
+    ('10001', 'NY', 'New York', 'Manhattan', 'Chelsea'),
+    ('10002', 'NY', 'New York', 'Manhattan', 'Lower East Side'),
+    ('10003', 'NY', 'New York', 'Manhattan', 'East Village'),
+    ('10004', 'NY', 'New York', 'Manhattan', 'Financial District'),
+    ('10005', 'NY', 'New York', 'Manhattan', 'Financial District'),
+    ('10006', 'NY', 'New York', 'Manhattan', 'Financial District'),
+    ('10007', 'NY', 'New York', 'Manhattan', 'Tribeca'),
+    ('10009', 'NY', 'New York', 'Manhattan', 'East Village'),
+    ('10010', 'NY', 'New York', 'Manhattan', 'Gramercy'),
+    ('10011', 'NY', 'New York', 'Manhattan', 'Chelsea'),
+    ('10012', 'NY', 'New York', 'Manhattan', 'SoHo'),
+    ('10013', 'NY', 'New York', 'Manhattan', 'Tribeca'),
+    ('10014', 'NY', 'New York', 'Manhattan', 'West Village'),
+    ('10016', 'NY', 'New York', 'Manhattan', 'Murray Hill'),
+    ('10017', 'NY', 'New York', 'Manhattan', 'Midtown East'),
+    ('10018', 'NY', 'New York', 'Manhattan', 'Garment District'),
+    ('10019', 'NY', 'New York', 'Manhattan', 'Midtown West'),
+    ('10021', 'NY', 'New York', 'Manhattan', 'Upper East Side'),
+    ('10022', 'NY', 'New York', 'Manhattan', 'Midtown East'),
+    ('10023', 'NY', 'New York', 'Manhattan', 'Upper West Side'),
+    ('10024', 'NY', 'New York', 'Manhattan', 'Upper West Side'),
+    ('10025', 'NY', 'New York', 'Manhattan', 'Upper West Side'),
+    ('10026', 'NY', 'New York', 'Manhattan', 'Harlem'),
+    ('10027', 'NY', 'New York', 'Manhattan', 'Harlem'),
+    ('10028', 'NY', 'New York', 'Manhattan', 'Upper East Side'),
+    ('10029', 'NY', 'New York', 'Manhattan', 'East Harlem'),
+    ('10030', 'NY', 'New York', 'Manhattan', 'Harlem'),
+    ('10031', 'NY', 'New York', 'Manhattan', 'Hamilton Heights'),
+    ('10032', 'NY', 'New York', 'Manhattan', 'Washington Heights'),
+    ('10033', 'NY', 'New York', 'Manhattan', 'Washington Heights'),
+    ('10034', 'NY', 'New York', 'Manhattan', 'Inwood'),
+    ('10035', 'NY', 'New York', 'Manhattan', 'East Harlem'),
+    ('10036', 'NY', 'New York', 'Manhattan', 'Hell''s Kitchen'),
+    ('10037', 'NY', 'New York', 'Manhattan', 'Harlem'),
+    ('10038', 'NY', 'New York', 'Manhattan', 'Financial District'),
+    ('10039', 'NY', 'New York', 'Manhattan', 'Harlem'),
+    ('10040', 'NY', 'New York', 'Manhattan', 'Washington Heights'),
+    ('10044', 'NY', 'New York', 'Manhattan', 'Roosevelt Island'),
+    ('10065', 'NY', 'New York', 'Manhattan', 'Upper East Side'),
+    ('10069', 'NY', 'New York', 'Manhattan', 'Upper West Side'),
+    ('10075', 'NY', 'New York', 'Manhattan', 'Upper East Side'),
+    ('10105', 'NY', 'New York', 'Manhattan', 'Midtown'),
+    ('10110', 'NY', 'New York', 'Manhattan', 'Midtown'),
+    ('10115', 'NY', 'New York', 'Manhattan', 'Morningside Heights'),
+    ('10118', 'NY', 'New York', 'Manhattan', 'Midtown'),
+    ('10128', 'NY', 'New York', 'Manhattan', 'Upper East Side'),
+    ('10271', 'NY', 'New York', 'Manhattan', 'Financial District'),
+    ('10280', 'NY', 'New York', 'Manhattan', 'Battery Park City'),
+    ('10282', 'NY', 'New York', 'Manhattan', 'Battery Park City'),
+    -- Brooklyn
+    ('11201', 'NY', 'Brooklyn', 'Brooklyn', 'Brooklyn Heights'),
+    ('11205', 'NY', 'Brooklyn', 'Brooklyn', 'Fort Greene'),
+    ('11206', 'NY', 'Brooklyn', 'Brooklyn', 'Williamsburg'),
+    ('11210', 'NY', 'Brooklyn', 'Brooklyn', 'Flatbush'),
+    ('11211', 'NY', 'Brooklyn', 'Brooklyn', 'Williamsburg'),
+    ('11212', 'NY', 'Brooklyn', 'Brooklyn', 'Brownsville'),
+    ('11213', 'NY', 'Brooklyn', 'Brooklyn', 'Crown Heights'),
+    ('11215', 'NY', 'Brooklyn', 'Brooklyn', 'Park Slope'),
+    ('11216', 'NY', 'Brooklyn', 'Brooklyn', 'Bedford-Stuyvesant'),
+    ('11217', 'NY', 'Brooklyn', 'Brooklyn', 'Boerum Hill'),
+    ('11221', 'NY', 'Brooklyn', 'Brooklyn', 'Bushwick'),
+    ('11222', 'NY', 'Brooklyn', 'Brooklyn', 'Greenpoint'),
+    ('11225', 'NY', 'Brooklyn', 'Brooklyn', 'Crown Heights'),
+    ('11226', 'NY', 'Brooklyn', 'Brooklyn', 'Flatbush'),
+    ('11230', 'NY', 'Brooklyn', 'Brooklyn', 'Midwood'),
+    ('11231', 'NY', 'Brooklyn', 'Brooklyn', 'Carroll Gardens'),
+    ('11234', 'NY', 'Brooklyn', 'Brooklyn', 'Marine Park'),
+    ('11237', 'NY', 'Brooklyn', 'Brooklyn', 'Bushwick'),
+    ('11238', 'NY', 'Brooklyn', 'Brooklyn', 'Prospect Heights'),
+    -- Queens, Bronx, Staten Island
+    ('11101', 'NY', 'Long Island City', 'Queens', 'Long Island City'),
+    ('11102', 'NY', 'Astoria', 'Queens', 'Astoria'),
+    ('11354', 'NY', 'Flushing', 'Queens', 'Flushing'),
+    ('11372', 'NY', 'Jackson Heights', 'Queens', 'Jackson Heights'),
+    ('11375', 'NY', 'Forest Hills', 'Queens', 'Forest Hills'),
+    ('10451', 'NY', 'Bronx', 'Bronx', 'Mott Haven'),
+    ('10463', 'NY', 'Bronx', 'Bronx', 'Riverdale'),
+    ('10301', 'NY', 'Staten Island', 'Staten Island', 'St. George'),
+    -- New Jersey
+    ('07020', 'NJ', 'Edgewater', NULL, 'Edgewater'),
+    ('07024', 'NJ', 'Fort Lee', NULL, 'Fort Lee'),
+    ('07030', 'NJ', 'Hoboken', NULL, 'Hoboken'),
+    ('07086', 'NJ', 'Weehawken', NULL, 'Weehawken'),
+    ('07102', 'NJ', 'Newark', NULL, 'Downtown Newark'),
+    ('07302', 'NJ', 'Jersey City', NULL, 'Downtown Jersey City'),
+    ('07306', 'NJ', 'Jersey City', NULL, 'Journal Square'),
+    ('07310', 'NJ', 'Jersey City', NULL, 'Newport'),
+    -- Connecticut
+    ('06824', 'CT', 'Fairfield', NULL, 'Fairfield'),
+    ('06830', 'CT', 'Greenwich', NULL, 'Greenwich'),
+    ('06870', 'CT', 'Greenwich', NULL, 'Old Greenwich'),
+    ('06901', 'CT', 'Stamford', NULL, 'Downtown Stamford'),
+    ('06902', 'CT', 'Stamford', NULL, 'Stamford');
+
+-- 23. Location: one row per zip code in use; the integer key neighborhood rollups group on
+DROP TABLE IF EXISTS Location CASCADE;
+CREATE TABLE Location (
+    location_id SERIAL PRIMARY KEY,
+    zip_code VARCHAR(10) NOT NULL,
+    state CHAR(2) NOT NULL,
+    city VARCHAR(50) NOT NULL,
+    borough VARCHAR(50),
+    neighborhood VARCHAR(100) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_location_zip UNIQUE (state, zip_code)
+);
+
+ALTER TABLE Property ADD COLUMN IF NOT EXISTS location_id INTEGER;
+ALTER TABLE Office ADD COLUMN IF NOT EXISTS location_id INTEGER;
+
+-- Location was just rebuilt (the CASCADE above also dropped the foreign keys), so ids kept
+-- from a previous run would dangle or name the wrong zip; the backfill below recomputes them
+UPDATE Property SET location_id = NULL WHERE location_id IS NOT NULL;
+UPDATE Office SET location_id = NULL WHERE location_id IS NOT NULL;
+
+ALTER TABLE Property DROP CONSTRAINT IF EXISTS fk_property_location;
+ALTER TABLE Property ADD CONSTRAINT fk_property_location
+    FOREIGN KEY (location_id) REFERENCES Location(location_id);
+ALTER TABLE Office DROP CONSTRAINT IF EXISTS fk_office_location;
+ALTER TABLE Office ADD CONSTRAINT fk_office_location
+    FOREIGN KEY (location_id) REFERENCES Location(location_id);
+CREATE INDEX IF NOT EXISTS idx_property_location_id ON Property (location_id);
+CREATE INDEX IF NOT EXISTS idx_office_location_id ON Office (location_id);
+
+-- Returns the location of a zip code, creating it on first use. Borough and neighborhood come
+-- from ZipNeighborhood; zips missing there fall back to the borough implied by the city name.
+CREATE OR REPLACE FUNCTION get_or_create_location(p_city VARCHAR, p_state CHAR(2), p_zip_code VARCHAR)
+RETURNS INTEGER AS $$
+DECLARE
+    found_id INTEGER;
+BEGIN
+    SELECT location_id INTO found_id
+    FROM Location
+    WHERE state = p_state AND zip_code = p_zip_code;
+
+    IF found_id IS NOT NULL THEN
+        RETURN found_id;
+    END IF;
+
+    INSERT INTO Location (zip_code, state, city, borough, neighborhood)
+    SELECT p_zip_code, p_state,
+           COALESCE(zn.city, p_city, p_zip_code),
+           COALESCE(zn.borough, CASE
+               WHEN p_state <> 'NY' THEN NULL
+               WHEN p_city = 'New York' THEN 'Manhattan'
+               WHEN p_city IN ('Brooklyn', 'Bronx', 'Staten Island') THEN p_city
+               WHEN p_city IN ('Queens', 'Long Island City', 'Astoria', 'Flushing', 'Jamaica', 'Forest Hills') THEN 'Queens'
+           END),
+           COALESCE(zn.neighborhood, p_city, p_zip_code)
+    FROM (SELECT 1) AS one
+    LEFT JOIN ZipNeighborhood zn ON zn.zip_code = p_zip_code AND zn.state = p_state
+    ON CONFLICT (state, zip_code) DO NOTHING
+    RETURNING location_id INTO found_id;
+
+    IF found_id IS NULL THEN
+        -- Created concurrently by another session
+        SELECT location_id INTO found_id
+        FROM Location
+        WHERE state = p_state AND zip_code = p_zip_code;
+    END IF;
+
+    RETURN found_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill rows loaded before the location key existed, or before Location was rebuilt
+UPDATE Office SET location_id = get_or_create_location(city, state, zip_code)
+WHERE location_id IS NULL AND zip_code IS NOT NULL;
+
+UPDATE Property SET location_id = get_or_create_location(city, state, zip_code)
+WHERE location_id IS NULL AND zip_code IS NOT NULL;
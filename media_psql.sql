@@ -0,0 +1,132 @@
+-- Content-addressed media: PropertyMedia and Document rows reference shared blobs by SHA-256.
+-- Run after ans_psql.sql. Files live in the blob store managed by media_store.py; this table
+-- records each distinct content once, with a reference count kept by triggers. Re-running
+-- the script keeps the catalog and recounts the references.
+
+-- 25. MediaBlob: one row per distinct file content
+CREATE TABLE IF NOT EXISTS MediaBlob (
+    sha256 CHAR(64) PRIMARY KEY,
+    size_bytes BIGINT NOT NULL,
+    content_type VARCHAR(100) NOT NULL DEFAULT 'application/octet-stream',
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    -- Set while ref_count is 0; the garbage collector removes blobs unreferenced past a grace period
+    unreferenced_since TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT chk_blob_sha256 CHECK (sha256 ~ '^[0-9a-f]{64}$'),
+    CONSTRAINT chk_blob_ref_count CHECK (ref_count >= 0)
+);
+
+CREATE INDEX IF NOT EXISTS idx_blob_unreferenced ON MediaBlob (unreferenced_since) WHERE ref_count = 0;
+
+ALTER TABLE PropertyMedia ADD COLUMN IF NOT EXISTS blob_sha256 CHAR(64);
+ALTER TABLE Document ADD COLUMN IF NOT EXISTS blob_sha256 CHAR(64);
+
+-- Named, so a re-run replaces the foreign keys instead of skipping them with the existing columns
+-- (the *_blob_sha256_fkey names are those of the inline REFERENCES of earlier versions)
+ALTER TABLE PropertyMedia DROP CONSTRAINT IF EXISTS propertymedia_blob_sha256_fkey;
+ALTER TABLE PropertyMedia DROP CONSTRAINT IF EXISTS fk_media_blob;
+ALTER TABLE PropertyMedia ADD CONSTRAINT fk_media_blob
+    FOREIGN KEY (blob_sha256) REFERENCES MediaBlob(sha256);
+ALTER TABLE Document DROP CONSTRAINT IF EXISTS document_blob_sha256_fkey;
+ALTER TABLE Document DROP CONSTRAINT IF EXISTS fk_document_blob;
+ALTER TABLE Document ADD CONSTRAINT fk_document_blob
+    FOREIGN KEY (blob_sha256) REFERENCES MediaBlob(sha256);
+
+CREATE INDEX IF NOT EXISTS idx_media_blob ON PropertyMedia (blob_sha256);
+CREATE INDEX IF NOT EXISTS idx_document_blob ON Document (blob_sha256);
+
+-- Statement-level so a bulk insert or delete adjusts each blob once, not once per row
+CREATE OR REPLACE FUNCTION trg_media_blob_ref_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE MediaBlob b
+        SET ref_count = b.ref_count - r.refs,
+            unreferenced_since = CASE WHEN b.ref_count - r.refs = 0 THEN CURRENT_TIMESTAMP END
+        FROM (
+            SELECT blob_sha256, COUNT(*) AS refs
+            FROM old_rows
+            WHERE blob_sha256 IS NOT NULL
+            GROUP BY blob_sha256
+        ) r
+        WHERE b.sha256 = r.blob_sha256;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE MediaBlob b
+        SET ref_count = b.ref_count + r.refs,
+            unreferenced_since = NULL
+        FROM (
+            SELECT blob_sha256, COUNT(*) AS refs
+            FROM new_rows
+            WHERE blob_sha256 IS NOT NULL
+            GROUP BY blob_sha256
+        ) r
+        WHERE b.sha256 = r.blob_sha256;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow one event per trigger. PropertyMedia and Document are not dropped
+-- above, so their triggers survive a re-run of this script.
+DROP TRIGGER IF EXISTS trg_media_blob_insert ON PropertyMedia;
+CREATE TRIGGER trg_media_blob_insert
+AFTER INSERT ON PropertyMedia
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_media_blob_ref_count();
+
+DROP TRIGGER IF EXISTS trg_media_blob_update ON PropertyMedia;
+CREATE TRIGGER trg_media_blob_update
+AFTER UPDATE ON PropertyMedia
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_media_blob_ref_count();
+
+DROP TRIGGER IF EXISTS trg_media_blob_delete ON PropertyMedia;
+CREATE TRIGGER trg_media_blob_delete
+AFTER DELETE ON PropertyMedia
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_media_blob_ref_count();
+
+DROP TRIGGER IF EXISTS trg_document_blob_insert ON Document;
+CREATE TRIGGER trg_document_blob_insert
+AFTER INSERT ON Document
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_media_blob_ref_count();
+
+DROP TRIGGER IF EXISTS trg_document_blob_update ON Document;
+CREATE TRIGGER trg_document_blob_update
+AFTER UPDATE ON Document
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_media_blob_ref_count();
+
+DROP TRIGGER IF EXISTS trg_document_blob_delete ON Document;
+CREATE TRIGGER trg_document_blob_delete
+AFTER DELETE ON Document
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_media_blob_ref_count();
+
+-- Recount from the referencing rows: references made while the triggers were missing, or before
+-- an earlier version of this script rebuilt the catalog, must keep their blobs from collection
+UPDATE MediaBlob b
+SET ref_count = r.refs,
+    unreferenced_since = CASE WHEN r.refs = 0 THEN COALESCE(b.unreferenced_since, CURRENT_TIMESTAMP) END
+FROM (
+    SELECT m.sha256, COUNT(refs.blob_sha256) AS refs
+    FROM MediaBlob m
+    LEFT JOIN (
+        SELECT blob_sha256 FROM PropertyMedia
+        UNION ALL
+        SELECT blob_sha256 FROM Document
+    ) refs ON refs.blob_sha256 = m.sha256
+    GROUP BY m.sha256
+) r
+WHERE b.sha256 = r.sha256
+  AND (b.ref_count <> r.refs OR (r.refs = 0) <> (b.unreferenced_since IS NOT NULL));
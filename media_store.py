@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import hashlib
+import logging
+import mimetypes
+import mmap
+import os
+import re
+import tempfile
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+MEDIA_ROOT = 'media_store'
+# Boilerplate files the ETL attaches to every property and transaction (property/, documents/)
+TEMPLATE_DIR = 'media_templates'
+BLOB_URL_PREFIX = '/blobs/'
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+MAX_THUMBNAIL_SIZE = 1024
+
+StagedBlob = namedtuple('StagedBlob', ['sha256', 'size_bytes', 'temp_path'])
+
+
+def blob_url(sha256):
+    """URL under which media_store.py serves a blob; stored in file_url/file_path."""
+    return f"{BLOB_URL_PREFIX}{sha256}"
+
+
+def iter_file(path, chunk_size=CHUNK_SIZE):
+    """Yields a file's content in fixed-size chunks."""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+class BlobStore:
+    """
+    Files addressed by the SHA-256 of their content under root/ab/cd/<sha256>.
+    Identical content is stored once; writes are staged in root/tmp and renamed into place.
+    """
+
+    def __init__(self, root=MEDIA_ROOT, chunk_size=CHUNK_SIZE):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.tmp_dir = os.path.join(root, 'tmp')
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path(self, sha256):
+        if not SHA256_PATTERN.match(sha256):
+            raise ValueError(f"Not a SHA-256 digest: {sha256!r}")
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def exists(self, sha256):
+        return os.path.exists(self.path(sha256))
+
+    def stage(self, chunks):
+        """Streams chunks to a temporary file while hashing them; nothing is visible until place()."""
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception:
+            os.unlink(temp_path)
+            raise
+        return StagedBlob(digest.hexdigest(), size, temp_path)
+
+    def place(self, staged):
+        """Moves a staged file into place, or drops it when the content is already stored."""
+        target = self.path(staged.sha256)
+        if os.path.exists(target):
+            os.unlink(staged.temp_path)
+            return False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(staged.temp_path, target)
+        return True
+
+    def iter_chunks(self, sha256, offset=0, length=None):
+        """
+        Yields the blob as zero-copy memoryview slices of a read-only mmap.
+        Each slice is released when the next one is requested; copy it to keep it longer.
+        """
+        path = self.path(sha256)
+        size = os.path.getsize(path)
+        end = size if length is None else min(size, offset + length)
+        if size == 0 or offset >= end:
+            return
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for start in range(offset, end, self.chunk_size):
+                    chunk = view[start:min(start + self.chunk_size, end)]
+                    try:
+                        yield chunk
+                    finally:
+                        chunk.release()
+            finally:
+                view.release()
+
+    def send(self, sha256, sock, offset=0, length=None):
+        """Sends the blob to a socket with sendfile (no copy through user space); returns bytes sent."""
+        with open(self.path(sha256), 'rb') as f:
+            return sock.sendfile(f, offset, length)
+
+    def delete(self, sha256):
+        try:
+            os.unlink(self.path(sha256))
+        except FileNotFoundError:
+            pass
+
+
+def store_blob(cursor, store, chunks, content_type=None):
+    """
+    Adds content to the store and registers it in MediaBlob; returns (sha256, size_bytes).
+    The MediaBlob row lock is held while the file is placed, so a concurrent garbage collection
+    of the same content cannot remove the file underneath it. The caller commits.
+    """
+    staged = store.stage(chunks)
+    try:
+        cursor.execute("""
+            INSERT INTO MediaBlob (sha256, size_bytes, content_type)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (sha256) DO UPDATE SET
+                unreferenced_since = CASE WHEN MediaBlob.ref_count = 0
+                                          THEN CURRENT_TIMESTAMP END
+        """, (staged.sha256, staged.size_bytes, content_type or 'application/octet-stream'))
+        store.place(staged)
+    except Exception:
+        if os.path.exists(staged.temp_path):
+            os.unlink(staged.temp_path)
+        raise
+    return staged.sha256, staged.size_bytes
+
+
+def register_templates(cursor, store, template_dir=TEMPLATE_DIR):
+    """Stores every file under template_dir once; returns {relative path: (sha256, size_bytes)}."""
+    blobs = {}
+    if not os.path.isdir(template_dir):
+        return blobs
+    for directory, _, files in os.walk(template_dir):
+        for name in sorted(files):
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, template_dir).replace(os.sep, '/')
+            blobs[relative] = store_blob(cursor, store, iter_file(path, store.chunk_size),
+                                         mimetypes.guess_type(name)[0])
+    return blobs
+
+
+class ThumbnailCache:
+    """Thumbnails generated on first request and kept on disk, evicting least recently used past max_bytes."""
+
+    def __init__(self, store, max_bytes=256 * 1024 * 1024):
+        self.store = store
+        self.max_bytes = max_bytes
+        self.cache_dir = os.path.join(store.root, 'thumbs')
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Handler threads evict concurrently; one scan at a time keeps the size accounting right
+        self.evict_lock = threading.Lock()
+
+    def path(self, sha256, width, height):
+        return os.path.join(self.cache_dir, f"{sha256}_{width}x{height}.jpg")
+
+    def get(self, sha256, width=320, height=240):
+        """Returns the thumbnail's path, generating it on a miss."""
+        path = self.path(sha256, width, height)
+        try:
+            # The modification time doubles as the last-use time for eviction
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+
+        from PIL import Image
+
+        with Image.open(self.store.path(sha256)) as image:
+            image.thumbnail((width, height))
+            fd, temp_path = tempfile.mkstemp(dir=self.store.tmp_dir, suffix='.jpg')
+            with os.fdopen(fd, 'wb') as f:
+                image.convert('RGB').save(f, 'JPEG', quality=85)
+        os.replace(temp_path, path)
+        self.evict()
+        return path
+
+    def open(self, sha256, width=320, height=240):
+        """Opens the thumbnail for reading; an open file survives a concurrent eviction."""
+        for _ in range(3):
+            try:
+                return open(self.get(sha256, width, height), 'rb')
+            except FileNotFoundError:
+                # Evicted between generating and opening it
+                continue
+        raise FileNotFoundError(self.path(sha256, width, height))
+
+    def evict(self):
+        with self.evict_lock:
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                except FileNotFoundError:
+                    continue
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    # Removed by another server process sharing the cache
+                    pass
+                total -= size
+
+
+class MediaStore:
+    """Blob store plus its MediaBlob catalog: uploads, attachments and garbage collection."""
+
+    def __init__(self, db_config, root=MEDIA_ROOT, chunk_size=CHUNK_SIZE):
+        self.db_config = db_config
+        self.store = BlobStore(root, chunk_size)
+        self.thumbnails = ThumbnailCache(self.store)
+        self.conn = None
+        self.cursor = None
+        # The HTTP server's threads share this connection for content-type lookups
+        self.lock = threading.Lock()
+
+    def connect_db(self):
+        """Connects to the database."""
+        try:
+            self.conn = psycopg2.connect(**self.db_config)
+            self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
+            logger.info("Database connection successful.")
+        except Exception as e:
+            logger.error(f"Database connection failed: {e}")
+            raise
+
+    def close_db(self):
+        """Closes the database connection."""
+        if self.cursor:
+            self.cursor.close()
+        if self.conn:
+            self.conn.close()
+        logger.info("Database connection closed.")
+
+    def put(self, chunks, content_type=None):
+        """Uploads content from an iterable of chunks; returns (sha256, size_bytes)."""
+        try:
+            result = store_blob(self.cursor, self.store, chunks, content_type)
+            self.conn.commit()
+            return result
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        """Uploads a file and links it to a property; returns the media_id (the existing one if already linked)."""
+        """Uploads a file and links it to a property; returns the media_id."""
+        try:
+            sha256, _ = store_blob(self.cursor, self.store, iter_file(path, self.store.chunk_size),
+                                   mimetypes.guess_type(path)[0])
+            self.cursor.execute("""
+                INSERT INTO PropertyMedia (
+                    property_id, media_type, file_url, title, is_primary, uploaded_by, blob_sha256
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (property_id, file_url) DO UPDATE SET
+                    is_primary = PropertyMedia.is_primary OR EXCLUDED.is_primary
+                RETURNING media_id
+            """, (property_id, media_type, blob_url(sha256), title or os.path.basename(path),
+                  is_primary, uploaded_by, sha256))
+            media_id = self.cursor.fetchone()['media_id']
+            self.conn.commit()
+            return media_id
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    def attach_document(self, path, document_type, uploaded_by, transaction_id=None, property_id=None,
+                        document_name=None):
+        """Uploads a file and records it as a Document; returns the document_id."""
+        try:
+            sha256, size = store_blob(self.cursor, self.store, iter_file(path, self.store.chunk_size),
+                                      mimetypes.guess_type(path)[0])
+            self.cursor.execute("""
+                INSERT INTO Document (
+                    transaction_id, property_id, document_type, document_name,
+                    file_path, file_size_bytes, uploaded_by, blob_sha256
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING document_id
+            """, (transaction_id, property_id, document_type, document_name or os.path.basename(path),
+                  blob_url(sha256), size, uploaded_by, sha256))
+            document_id = self.cursor.fetchone()['document_id']
+            self.conn.commit()
+            return document_id
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    def content_type(self, sha256):
+        with self.lock:
+            self.cursor.execute("SELECT content_type FROM MediaBlob WHERE sha256 = %s", (sha256,))
+            row = self.cursor.fetchone()
+            self.conn.rollback()
+        return row['content_type'] if row else None
+
+    def collect_garbage(self, grace=timedelta(hours=24), limit=1000):
+        """
+        Deletes blobs unreferenced for longer than grace, one short transaction each.
+        A blob being re-uploaded or attached holds its row lock and is skipped.
+        """
+        removed = 0
+        cutoff = datetime.now() - grace
+        while removed < limit:
+            self.cursor.execute("""
+                DELETE FROM MediaBlob
+                WHERE sha256 = (
+                    SELECT sha256 FROM MediaBlob
+                    WHERE ref_count = 0 AND unreferenced_since < %s
+                    ORDER BY unreferenced_since
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING sha256
+            """, (cutoff,))
+            row = self.cursor.fetchone()
+            if not row:
+                self.conn.rollback()
+                break
+            # Unlink before commit: the row lock keeps uploads of this content waiting until then
+            self.store.delete(row['sha256'])
+            self.conn.commit()
+            removed += 1
+        logger.info(f"Removed {removed} unreferenced blobs.")
+        return removed
+
+    def stats(self):
+        """Stored bytes against the bytes the referencing rows would take as separate copies."""
+        self.cursor.execute("""
+            SELECT COUNT(*) AS blobs,
+                   COALESCE(SUM(size_bytes), 0) AS stored_bytes,
+                   COALESCE(SUM(size_bytes * ref_count), 0) AS referenced_bytes,
+                   COALESCE(SUM(ref_count), 0) AS references
+            FROM MediaBlob
+        """)
+        row = dict(self.cursor.fetchone())
+        self.conn.rollback()
+        return row
+
+
+class BlobRequestHandler(BaseHTTPRequestHandler):
+    """GET /blobs/<sha256> streams a blob with sendfile; GET /thumbs/<sha256>?w=&h= serves a thumbnail."""
+
+    media = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.strip('/').split('/')
+        if len(parts) != 2 or parts[0] not in ('blobs', 'thumbs') or not SHA256_PATTERN.match(parts[1]):
+            self.send_error(404)
+            return
+        sha256 = parts[1]
+        store = self.media.store
+        if not store.exists(sha256):
+            self.send_error(404)
+            return
+
+        if parts[0] == 'thumbs':
+            query = parse_qs(url.query)
+            try:
+                # Clamped so arbitrary sizes cannot flood the cache
+                width = min(max(int(query.get('w', [320])[0]), 16), MAX_THUMBNAIL_SIZE)
+                height = min(max(int(query.get('h', [240])[0]), 16), MAX_THUMBNAIL_SIZE)
+                f = self.media.thumbnails.open(sha256, width, height)
+            except Exception as e:
+                logger.warning(f"Thumbnail of {sha256} failed: {e}")
+                self.send_error(415)
+                return
+            content_type = 'image/jpeg'
+        else:
+            try:
+                f = open(store.path(sha256), 'rb')
+            except FileNotFoundError:
+                # Collected since the existence check
+                self.send_error(404)
+                return
+            content_type = self.media.content_type(sha256) or 'application/octet-stream'
+
+        # Size from the open file: the path may be evicted or collected meanwhile
+        with f:
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(os.fstat(f.fileno()).st_size))
+            # Content never changes under its address
+            self.send_header('Cache-Control', 'public, max-age=31536000, immutable')
+            self.send_header('ETag', f'"{sha256}"')
+            self.end_headers()
+            self.wfile.flush()
+            self.connection.sendfile(f)
+
+
+def main():
+    """Main function"""
+    from config import DATABASE_CONFIG
+
+    parser = argparse.ArgumentParser(description="Content-addressed media and document store.")
+    parser.add_argument('--root', default=MEDIA_ROOT)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    put = commands.add_parser('put', help="Upload a file and attach it to a property or transaction")
+    put.add_argument('path')
+    put.add_argument('--uploaded-by', type=int, required=True)
+    put.add_argument('--property-id', type=int)
+    put.add_argument('--transaction-id', type=int)
+    put.add_argument('--media-type', choices=['photo', 'video', 'document', 'floor_plan'])
+    put.add_argument('--document-type', choices=['contract', 'disclosure', 'inspection_report', 'appraisal',
+                                                 'title_report', 'insurance', 'other'])
+    put.add_argument('--title')
+
+    get = commands.add_parser('get', help="Download a blob")
+    get.add_argument('sha256')
+    get.add_argument('--output', required=True)
+
+    gc = commands.add_parser('gc', help="Remove blobs no longer referenced")
+    gc.add_argument('--grace-hours', type=float, default=24)
+
+    commands.add_parser('stats', help="Show deduplication statistics")
+
+    serve = commands.add_parser('serve', help="Serve blobs and thumbnails over HTTP")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8081)
+    args = parser.parse_args()
+
+    media = MediaStore(DATABASE_CONFIG, args.root)
+    media.connect_db()
+    try:
+        if args.command == 'put':
+            if args.document_type:
+                document_id = media.attach_document(args.path, args.document_type, args.uploaded_by,
+                                                    args.transaction_id, args.property_id, args.title)
+                logger.info(f"Stored {args.path} as document {document_id}")
+            elif args.property_id and args.media_type:
+                media_id = media.attach_property_media(args.property_id, args.path, args.media_type,
+                                                       args.uploaded_by, args.title)
+                logger.info(f"Stored {args.path} as property media {media_id}")
+            else:
+                parser.error("put needs --document-type, or --property-id with --media-type")
+        elif args.command == 'get':
+            with open(args.output, 'wb') as f:
+                for chunk in media.store.iter_chunks(args.sha256):
+                    f.write(chunk)
+            logger.info(f"Wrote {args.sha256} to {args.output}")
+        elif args.command == 'gc':
+            media.collect_garbage(timedelta(hours=args.grace_hours))
+        elif args.command == 'stats':
+            stats = media.stats()
+            saved = stats['referenced_bytes'] - stats['stored_bytes']
+            logger.info(f"{stats['blobs']} blobs, {stats['references']} references, "
+                        f"{stats['stored_bytes']} bytes stored, {saved} bytes saved by deduplication")
+        elif args.command == 'serve':
+            BlobRequestHandler.media = media
+            server = ThreadingHTTPServer((args.host, args.port), BlobRequestHandler)
+            logger.info(f"Serving {args.root} on http://{args.host}:{args.port}{BLOB_URL_PREFIX}")
+            server.serve_forever()
+    finally:
+        media.close_db()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import ast
+import hashlib
+import importlib.util
+import logging
+import os
+import re
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import errors
+from psycopg2.extras import RealDictCursor
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATIONS_DIR = os.path.join(ROOT_DIR, 'migrations')
+# V0006__ingest_record_version.sql / V0003__lead_follow_up.py
+MIGRATION_FILE = re.compile(r'^V(\d{4})__([a-z0-9_]+)\.(sql|py)$')
+# First-line directive for SQL that cannot run in a transaction block (CREATE INDEX CONCURRENTLY)
+NO_TRANSACTION = re.compile(r'^\s*--\s*migrate:no-transaction\s*$', re.MULTILINE)
+CONCURRENT_INDEX = re.compile(
+    r'^(?:\s*--[^\n]*\n)*\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)', re.IGNORECASE
+)
+DOLLAR_TAG = re.compile(r'\$(?:[A-Za-z_][A-Za-z_0-9]*)?\$')
+# pg_advisory_lock key held by the running migrator
+LOCK_KEY = 53100042
+
+Migration = namedtuple('Migration', ['version', 'name', 'path', 'kind', 'checksum', 'transactional', 'scripts'])
+
+
+class MigrationError(Exception):
+    pass
+
+
+def declared_scripts(path):
+    """The SCRIPTS list of a Python migration: repo files it runs, read without importing it."""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, 'id', None) == 'SCRIPTS' for t in node.targets):
+            return tuple(ast.literal_eval(node.value))
+    return ()
+
+
+def migration_checksum(path, scripts=()):
+    """
+    SHA-256 of a migration file and of every script it runs, with line endings normalized,
+    so editing a referenced script counts as editing the migration.
+    """
+    digest = hashlib.sha256()
+    for name in (path,) + tuple(os.path.join(ROOT_DIR, script) for script in scripts):
+        with open(name, 'rb') as f:
+            content = f.read().replace(b'\r\n', b'\n')
+        digest.update(os.path.basename(name).encode('utf-8') + b'\0')
+        digest.update(hashlib.sha256(content).digest())
+    return digest.hexdigest()
+
+
+def split_statements(script):
+    """Splits a SQL script on top-level semicolons; quotes, dollar quotes and comments are respected."""
+    statements = []
+    start, i, n = 0, 0, len(script)
+    while i < n:
+        if script.startswith('--', i):
+            end = script.find('\n', i)
+            i = n if end < 0 else end + 1
+            continue
+        if script.startswith('/*', i):
+            end = script.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        c = script[i]
+        if c in ("'", '"'):
+            # E'...' strings take backslash escapes (E'it\'s')
+            escapes = c == "'" and i > 0 and script[i - 1] in 'Ee' and (
+                i < 2 or not (script[i - 2].isalnum() or script[i - 2] == '_'))
+            j = i + 1
+            while j < n:
+                if escapes and script[j] == '\\':
+                    j += 2
+                    continue
+                if script[j] == c:
+                    if j + 1 < n and script[j + 1] == c:
+                        j += 2
+                        continue
+                    break
+                j += 1
+            i = j + 1
+            continue
+        if c == '$':
+            tag = DOLLAR_TAG.match(script, i)
+            if tag:
+                end = script.find(tag.group(0), tag.end())
+                i = n if end < 0 else end + len(tag.group(0))
+                continue
+        if c == ';':
+            statements.append(script[start:i])
+            start = i + 1
+        i += 1
+    statements.append(script[start:])
+    # Drop fragments that hold nothing but whitespace and comments
+    return [s.strip() for s in statements
+            if re.sub(r'--[^\n]*', '', s).strip()]
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """Returns the migration files of a directory in version order."""
+    migrations = []
+    for name in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(name)
+        if not match:
+            continue
+        path = os.path.join(directory, name)
+        kind = match.group(3)
+        transactional = True
+        scripts = ()
+        if kind == 'sql':
+            with open(path, encoding='utf-8') as f:
+                transactional = not NO_TRANSACTION.search(f.read())
+        else:
+            # Python migrations run in autocommit and manage their own (short) transactions
+            transactional = False
+            scripts = declared_scripts(path)
+        migrations.append(Migration(int(match.group(1)), match.group(2), path, kind,
+                                    migration_checksum(path, scripts), transactional, scripts))
+
+    versions = [m.version for m in migrations]
+    duplicates = sorted({v for v in versions if versions.count(v) > 1})
+    if duplicates:
+        raise MigrationError(f"Duplicate migration versions: {duplicates}")
+    return migrations
+
+
+class MigrationContext:
+    """
+    Connection and online schema-change helpers handed to Python migrations.
+    Runs in autocommit; every helper keeps its locks short so a loaded database stays writable.
+    """
+
+    def __init__(self, conn, lock_timeout='5s', batch_size=5000, throttle=0.05, retries=5, scripts=()):
+        self.conn = conn
+        self.lock_timeout = lock_timeout
+        self.batch_size = batch_size
+        self.throttle = throttle
+        self.retries = retries
+        self.root = ROOT_DIR
+        self.scripts = scripts
+
+    def fail(self, message):
+        raise MigrationError(message)
+
+    def path(self, name):
+        """Path of a repo script; only scripts in the migration's SCRIPTS are covered by its checksum."""
+        if name not in self.scripts:
+            raise MigrationError(f"{name} is not listed in the migration's SCRIPTS")
+        return os.path.join(self.root, name)
+
+    def query(self, sql, params=None):
+        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def execute(self, sql, params=None):
+        """Runs one statement, retrying when it cannot get its lock within lock_timeout."""
+        index = CONCURRENT_INDEX.match(sql)
+        for attempt in range(1, self.retries + 1):
+            if index:
+                # A CREATE INDEX CONCURRENTLY that timed out leaves an INVALID index behind,
+                # which IF NOT EXISTS would otherwise accept on the next attempt
+                self.drop_invalid_index(index.group(1))
+            try:
+                with self.conn.cursor() as cursor:
+                    cursor.execute("SELECT set_config('lock_timeout', %s, false)", (self.lock_timeout,))
+                    cursor.execute(sql, params)
+                    return cursor.rowcount
+            except errors.LockNotAvailable:
+                if not self.conn.autocommit or attempt == self.retries:
+                    raise
+                logger.warning(f"Lock not available (attempt {attempt}/{self.retries}), retrying.")
+                time.sleep(min(2 ** attempt, 30))
+
+    @contextmanager
+    def transaction(self):
+        """Groups statements into one transaction."""
+        self.conn.autocommit = False
+        try:
+            yield
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            self.conn.autocommit = True
+
+    def table_exists(self, table):
+        return self.query("SELECT to_regclass(%s) IS NOT NULL AS found", (table,))[0]['found']
+
+    def constraint_exists(self, table, name):
+        return bool(self.query("""
+            SELECT 1 FROM pg_constraint
+            WHERE conrelid = to_regclass(%s) AND conname = %s
+        """, (table, name.lower())))
+
+    def drop_invalid_index(self, name):
+        """Drops what a failed CREATE INDEX CONCURRENTLY left behind, so IF NOT EXISTS does not keep it."""
+        rows = self.query("""
+            SELECT c.relname FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = %s AND NOT i.indisvalid
+        """, (name.lower(),))
+        for row in rows:
+            logger.warning(f"Dropping invalid index {row['relname']} left by an interrupted build.")
+            self.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {row['relname']}")
+
+    def create_index(self, name, table, definition, unique=False):
+        """CREATE INDEX CONCURRENTLY: builds without blocking writes."""
+        self.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY IF NOT EXISTS "
+                     f"{name} ON {table} {definition}")
+
+    def add_column(self, table, column, definition):
+        """Adds a column; without a volatile default this only changes the catalog."""
+        self.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {definition}")
+
+    def add_constraint(self, table, name, definition, validate=True):
+        """
+        Adds a constraint as NOT VALID (enforced for new writes, no table scan under a strong lock),
+        then validates existing rows under a lock that does not block reads or writes.
+        """
+        if not self.constraint_exists(table, name):
+            self.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition} NOT VALID")
+        if validate:
+            self.validate_constraint(table, name)
+
+    def validate_constraint(self, table, name):
+        self.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+
+    def set_not_null(self, table, column):
+        """SET NOT NULL without a scan under an exclusive lock: a validated CHECK proves it first."""
+        check = 'chk_{}_{}_not_null'.format(table.strip('"').lower(), column)
+        self.add_constraint(table, check, f"CHECK ({column} IS NOT NULL)")
+        self.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+        self.execute(f"ALTER TABLE {table} DROP CONSTRAINT {check}")
+
+    def backfill(self, table, key, assignments, where, params=None, batch_size=None):
+        """
+        Runs UPDATE table SET assignments WHERE where over consecutive key ranges, one short
+        transaction per batch with a pause in between. The where clause must exclude rows
+        already done, so an interrupted backfill resumes where it stopped.
+        """
+        batch_size = batch_size or self.batch_size
+        bounds = self.query(f"SELECT MIN({key}) AS low, MAX({key}) AS high FROM {table} WHERE {where}", params)[0]
+        if bounds['low'] is None:
+            logger.info(f"Backfill of {table}: nothing to do.")
+            return 0
+
+        total = 0
+        for low in range(bounds['low'], bounds['high'] + 1, batch_size):
+            for attempt in range(1, self.retries + 1):
+                try:
+                    with self.transaction():
+                        changed = self.execute(
+                            f"UPDATE {table} SET {assignments} "
+                            f"WHERE {key} >= %(low)s AND {key} < %(high)s AND ({where})",
+                            dict(params or {}, low=low, high=low + batch_size)
+                        )
+                    break
+                except errors.LockNotAvailable:
+                    if attempt == self.retries:
+                        raise
+                    logger.warning(f"Backfill batch at {key} {low} waited too long for row locks, retrying.")
+                    time.sleep(min(2 ** attempt, 30))
+            total += changed
+            logger.info(f"Backfill of {table}: {total} rows through {key} {low + batch_size - 1}.")
+            time.sleep(self.throttle)
+        return total
+
+    def run_file(self, name):
+        """Runs a SQL script statement by statement in autocommit (it may use CONCURRENTLY)."""
+        with open(self.path(name), encoding='utf-8') as f:
+            statements = split_statements(f.read())
+        for statement in statements:
+            self.execute(statement)
+
+
+class Migrator:
+    """Applies versioned migrations in order and records them in schema_migrations."""
+
+    def __init__(self, db_config, directory=MIGRATIONS_DIR, lock_timeout='5s', batch_size=5000, throttle=0.05):
+        self.db_config = db_config
+        self.directory = directory
+        self.lock_timeout = lock_timeout
+        self.batch_size = batch_size
+        self.throttle = throttle
+        self.conn = None
+        self.cursor = None
+
+    def connect_db(self):
+        """Connects to the database."""
+        try:
+            self.conn = psycopg2.connect(**self.db_config)
+            self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
+            logger.info("Database connection successful.")
+        except Exception as e:
+            logger.error(f"Database connection failed: {e}")
+            raise
+
+    def close_db(self):
+        """Closes the database connection."""
+        if self.cursor:
+            self.cursor.close()
+        if self.conn:
+            self.conn.close()
+        logger.info("Database connection closed.")
+
+    def ensure_state_table(self):
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name VARCHAR(200) NOT NULL,
+                checksum CHAR(64) NOT NULL,
+                kind VARCHAR(10) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                execution_ms INTEGER,
+                baseline BOOLEAN NOT NULL DEFAULT FALSE
+            )
+        """)
+        self.conn.commit()
+
+    def lock(self):
+        """Takes the session advisory lock, so only one migrator runs against a database."""
+        self.cursor.execute("SELECT pg_try_advisory_lock(%s) AS locked", (LOCK_KEY,))
+        locked = self.cursor.fetchone()['locked']
+        self.conn.commit()
+        if not locked:
+            raise MigrationError("Another migration run holds the migration lock.")
+
+    def unlock(self):
+        self.cursor.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+        self.conn.commit()
+
+    def applied(self):
+        self.cursor.execute("SELECT * FROM schema_migrations ORDER BY version")
+        rows = {row['version']: row for row in self.cursor.fetchall()}
+        self.conn.commit()
+        return rows
+
+    def verify(self, migrations, applied):
+        """Returns problems: applied migrations edited after the fact or missing from disk."""
+        problems = []
+        on_disk = {m.version: m for m in migrations}
+        for version, row in applied.items():
+            migration = on_disk.get(version)
+            if migration is None:
+                problems.append(f"V{version:04d} {row['name']} is applied but missing from {self.directory}")
+            elif migration.checksum != row['checksum'].strip():
+                problems.append(f"V{version:04d} {row['name']} changed after it was applied (checksum mismatch)")
+        return problems
+
+    def record(self, migration, elapsed_ms, baseline=False):
+        self.cursor.execute("""
+            INSERT INTO schema_migrations (version, name, checksum, kind, execution_ms, baseline)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (migration.version, migration.name, migration.checksum, migration.kind, elapsed_ms, baseline))
+
+    def apply(self, migration):
+        logger.info(f"Applying V{migration.version:04d} {migration.name} "
+                    f"({migration.kind}{'' if migration.transactional else ', no transaction'})")
+        started = time.perf_counter()
+        scripts = migration.scripts
+        if migration.kind == 'sql':
+            scripts = (os.path.relpath(migration.path, ROOT_DIR),)
+        context = MigrationContext(self.conn, self.lock_timeout, self.batch_size, self.throttle, scripts=scripts)
+
+        if migration.kind == 'sql' and migration.transactional:
+            # Schema change and its state row commit together
+            with open(migration.path, encoding='utf-8') as f:
+                script = f.read()
+            try:
+                self.cursor.execute("SELECT set_config('lock_timeout', %s, true)", (self.lock_timeout,))
+                self.cursor.execute(script)
+                self.record(migration, int((time.perf_counter() - started) * 1000))
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            return
+
+        # Non-transactional steps must be idempotent: a failed run is simply re-run
+        self.conn.autocommit = True
+        try:
+            if migration.kind == 'sql':
+                context.run_file(os.path.relpath(migration.path, ROOT_DIR))
+            else:
+                spec = importlib.util.spec_from_file_location(f"migration_{migration.version:04d}", migration.path)
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                module.migrate(context)
+        finally:
+            self.conn.autocommit = False
+        self.record(migration, int((time.perf_counter() - started) * 1000))
+        self.conn.commit()
+
+    def migrate(self, target=None, dry_run=False):
+        """Applies pending migrations up to target; returns the applied versions."""
+        migrations = load_migrations(self.directory)
+        self.ensure_state_table()
+        self.lock()
+        try:
+            applied = self.applied()
+            problems = self.verify(migrations, applied)
+            if problems:
+                raise MigrationError('; '.join(problems))
+
+            pending = [m for m in migrations
+                       if m.version not in applied and (target is None or m.version <= target)]
+            if applied and pending and pending[0].version < max(applied):
+                logger.warning(f"V{pending[0].version:04d} is older than the newest applied migration; "
+                               f"applying it out of order.")
+            if dry_run:
+                for migration in pending:
+                    logger.info(f"Would apply V{migration.version:04d} {migration.name}")
+                return []
+
+            done = []
+            for migration in pending:
+                self.apply(migration)
+                done.append(migration.version)
+            logger.info(f"Applied {len(done)} migrations." if done else "Database is up to date.")
+            return done
+        finally:
+            self.unlock()
+
+    def baseline(self, version):
+        """Marks migrations up to version as applied without running them (databases built by the scripts)."""
+        migrations = load_migrations(self.directory)
+        self.ensure_state_table()
+        self.lock()
+        try:
+            applied = self.applied()
+            for migration in migrations:
+                if migration.version <= version and migration.version not in applied:
+                    self.record(migration, 0, baseline=True)
+                    logger.info(f"Marked V{migration.version:04d} {migration.name} as applied.")
+            self.conn.commit()
+        finally:
+            self.unlock()
+
+    def status(self):
+        migrations = load_migrations(self.directory)
+        self.ensure_state_table()
+        applied = self.applied()
+        for migration in migrations:
+            row = applied.get(migration.version)
+            if row is None:
+                state = 'pending'
+            elif row['checksum'].strip() != migration.checksum:
+                state = 'CHANGED'
+            else:
+                state = f"{'baseline' if row['baseline'] else 'applied'} {row['applied_at']:%Y-%m-%d %H:%M}"
+            logger.info(f"V{migration.version:04d} {migration.name:<32} {state}")
+        for problem in self.verify(migrations, applied):
+            logger.warning(problem)
+
+
+def new_migration(name, python=False, no_transaction=False, directory=MIGRATIONS_DIR):
+    """Creates the next migration file from a template; returns its path."""
+    migrations = load_migrations(directory)
+    version = (migrations[-1].version if migrations else 0) + 1
+    slug = re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+    path = os.path.join(directory, f"V{version:04d}__{slug}.{'py' if python else 'sql'}")
+    with open(path, 'x', encoding='utf-8') as f:
+        if python:
+            f.write(f'"""{name}."""\n\n\ndef migrate(ctx):\n    pass\n')
+        else:
+            f.write(f"{'-- migrate:no-transaction' + chr(10) if no_transaction else ''}-- {name}\n")
+    return path
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Versioned online schema migrations.")
+    parser.add_argument('--directory', default=MIGRATIONS_DIR)
+    parser.add_argument('--lock-timeout', default='5s', help="Give up on a lock after this long and retry")
+    parser.add_argument('--batch-size', type=int, default=5000, help="Rows per backfill transaction")
+    parser.add_argument('--throttle', type=float, default=0.05, help="Seconds to pause between backfill batches")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status')
+    commands.add_parser('verify')
+    run = commands.add_parser('migrate')
+    run.add_argument('--target', type=int)
+    run.add_argument('--dry-run', action='store_true')
+    mark = commands.add_parser('baseline', help="Mark migrations up to VERSION as already applied")
+    mark.add_argument('version', type=int)
+    create = commands.add_parser('new')
+    create.add_argument('name')
+    create.add_argument('--python', action='store_true')
+    create.add_argument('--no-transaction', action='store_true')
+    args = parser.parse_args()
+
+    if args.command == 'new':
+        logger.info(f"Created {new_migration(args.name, args.python, args.no_transaction, args.directory)}")
+        return
+
+    from config import DATABASE_CONFIG
+
+    migrator = Migrator(DATABASE_CONFIG, args.directory, args.lock_timeout, args.batch_size, args.throttle)
+    migrator.connect_db()
+    try:
+        if args.command == 'status':
+            migrator.status()
+        elif args.command == 'verify':
+            migrator.ensure_state_table()
+            problems = migrator.verify(load_migrations(args.directory), migrator.applied())
+            for problem in problems:
+                logger.error(problem)
+            if problems:
+                raise SystemExit(1)
+            logger.info("All applied migrations match their files.")
+        elif args.command == 'migrate':
+            migrator.migrate(args.target, args.dry_run)
+        elif args.command == 'baseline':
+            migrator.baseline(args.version)
+    finally:
+        migrator.close_db()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""Baseline: the schema scripts as they stood before versioned migrations, for an empty database."""
+
+# Dependency order; ans_psql.sql drops and recreates every core table. Part of the checksum.
+SCRIPTS = [
+    'ans_psql.sql',
+    'tri_psql.sql',
+    'cache_psql.sql',
+    'export_psql.sql',
+    'rent_roll_psql.sql',
+    'calendar_psql.sql',
+    'payout_psql.sql',
+    'lead_scoring_psql.sql',
+    'location_psql.sql',
+    'history_psql.sql',
+    'search_psql.sql',
+    'media_psql.sql',
+]
+
+
+def migrate(ctx):
+    if ctx.table_exists('Property'):
+        ctx.fail("The warehouse schema already exists; record it with 'python migrate.py baseline 1' "
+                 "instead of rebuilding it.")
+    with ctx.transaction():
+        for script in SCRIPTS:
+            with open(ctx.path(script), encoding='utf-8') as f:
+                ctx.execute(f.read())
@@ -0,0 +1,8 @@
+"""The reviewed covering and partial indexes of index_pack_psql.sql, built online."""
+
+SCRIPTS = ['index_pack_psql.sql']
+
+
+def migrate(ctx):
+    # CREATE INDEX CONCURRENTLY per statement; invalid leftovers of an interrupted run are rebuilt
+    ctx.run_file('index_pack_psql.sql')
@@ -0,0 +1,14 @@
+"""Every open lead gets a follow-up date, so the follow-up queue can schedule it."""
+
+OPEN_WITHOUT_DATE = "follow_up_date IS NULL AND lead_status IN ('new', 'contacted', 'qualified')"
+
+
+def migrate(ctx):
+    # NOT VALID first: new writes are checked at once, so the backfill cannot fall behind them
+    ctx.add_constraint('ClientLead', 'chk_open_lead_follow_up',
+                       "CHECK (lead_status IN ('converted', 'closed_lost') OR follow_up_date IS NOT NULL)",
+                       validate=False)
+    ctx.backfill('ClientLead', 'lead_id',
+                 "follow_up_date = COALESCE(created_at::DATE, CURRENT_DATE) + 1",
+                 OPEN_WITHOUT_DATE)
+    ctx.validate_constraint('ClientLead', 'chk_open_lead_follow_up')
@@ -0,0 +1,3 @@
+-- migrate:no-transaction
+-- Lead conversion looks up an existing client by email for every converted lead
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_client_email ON Client (email);
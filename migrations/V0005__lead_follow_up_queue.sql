@@ -0,0 +1,118 @@
+-- Follow-up work queue for open leads, claimed in batches by lead_followup.py workers.
+-- A claim is a lease: a worker sets locked_until and commits, so no row lock is held while it
+-- works, and a job whose worker died becomes visible again once the lease expires.
+
+ALTER TABLE ClientLead ADD COLUMN IF NOT EXISTS follow_up_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE ClientLead ADD COLUMN IF NOT EXISTS last_contacted_at TIMESTAMP;
+
+-- 26. LeadFollowUpJob: one job per lead and due date
+CREATE TABLE LeadFollowUpJob (
+    job_id BIGSERIAL PRIMARY KEY,
+    lead_id INTEGER NOT NULL REFERENCES ClientLead(lead_id) ON DELETE CASCADE,
+    due_at DATE NOT NULL,
+    priority DECIMAL(5,4) NOT NULL DEFAULT 0,
+    status VARCHAR(10) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_after TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_by VARCHAR(100),
+    locked_until TIMESTAMP,
+    outcome VARCHAR(20),
+    last_error TEXT,
+    enqueued_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    CONSTRAINT chk_follow_up_job_status CHECK (status IN ('pending', 'running', 'done', 'dead')),
+    CONSTRAINT chk_follow_up_job_attempts CHECK (attempts >= 0 AND max_attempts > 0)
+);
+
+-- At most one live job per lead
+CREATE UNIQUE INDEX idx_follow_up_job_active ON LeadFollowUpJob (lead_id)
+    WHERE status IN ('pending', 'running');
+-- Claim order: best-scored leads first, then the longest waiting
+CREATE INDEX idx_follow_up_job_claim ON LeadFollowUpJob (priority DESC, run_after)
+    WHERE status = 'pending';
+CREATE INDEX idx_follow_up_job_lease ON LeadFollowUpJob (locked_until)
+    WHERE status = 'running';
+CREATE INDEX idx_follow_up_job_lead ON LeadFollowUpJob (lead_id, due_at);
+CREATE INDEX idx_follow_up_job_finished ON LeadFollowUpJob (finished_at)
+    WHERE status = 'done';
+
+-- Queues every open lead due by p_until that has no live job. A lead whose job for the same
+-- due date went dead is left for a person to look at rather than retried forever.
+CREATE OR REPLACE FUNCTION enqueue_due_follow_ups(p_until DATE DEFAULT CURRENT_DATE)
+RETURNS INTEGER AS $$
+    WITH queued AS (
+        INSERT INTO LeadFollowUpJob (lead_id, due_at, priority)
+        SELECT l.lead_id, l.follow_up_date, COALESCE(l.lead_score, 0)
+        FROM ClientLead l
+        WHERE l.follow_up_date <= p_until
+          AND l.lead_status IN ('new', 'contacted', 'qualified')
+          AND NOT EXISTS (
+              SELECT 1 FROM LeadFollowUpJob j
+              WHERE j.lead_id = l.lead_id
+                AND j.due_at = l.follow_up_date
+                AND j.status = 'dead'
+          )
+        ON CONFLICT (lead_id) WHERE status IN ('pending', 'running') DO NOTHING
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM queued;
+$$ LANGUAGE sql;
+
+-- Returns jobs whose lease expired to the queue, or buries them once out of attempts
+CREATE OR REPLACE FUNCTION release_expired_follow_ups()
+RETURNS INTEGER AS $$
+    WITH expired AS (
+        SELECT job_id
+        FROM LeadFollowUpJob
+        WHERE status = 'running' AND locked_until < CURRENT_TIMESTAMP
+        FOR UPDATE SKIP LOCKED
+    ),
+    released AS (
+        UPDATE LeadFollowUpJob j
+        SET status = CASE WHEN j.attempts >= j.max_attempts THEN 'dead' ELSE 'pending' END,
+            last_error = COALESCE(j.last_error, 'lease expired'),
+            locked_by = NULL,
+            locked_until = NULL,
+            finished_at = CASE WHEN j.attempts >= j.max_attempts THEN CURRENT_TIMESTAMP END
+        FROM expired
+        WHERE j.job_id = expired.job_id
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM released;
+$$ LANGUAGE sql;
+
+-- Conversion per statement instead of per row: a batch of converted leads creates its clients
+-- in one INSERT, one client per new email.
+DROP TRIGGER IF EXISTS trg_convert_lead_to_client ON ClientLead;
+DROP FUNCTION IF EXISTS trg_convert_lead_to_client();
+
+CREATE OR REPLACE FUNCTION trg_convert_leads_to_clients()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO Client (client_type, full_name, email, phone, assigned_agent_id, notes)
+    SELECT DISTINCT ON (n.email)
+           'individual',
+           n.first_name || ' ' || n.last_name,
+           n.email,
+           n.phone,
+           n.assigned_agent_id,
+           'Converted from lead ID: ' || n.lead_id
+    FROM new_rows n
+    JOIN old_rows o ON o.lead_id = n.lead_id
+    WHERE n.lead_status = 'converted'
+      AND o.lead_status != 'converted'
+      AND n.email IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM Client c WHERE c.email = n.email)
+    ORDER BY n.email, n.lead_id;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_convert_lead_to_client
+AFTER UPDATE ON ClientLead
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_convert_leads_to_clients();
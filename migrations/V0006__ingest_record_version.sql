@@ -0,0 +1,14 @@
+-- Per-key versions of records loaded by stream_ingest.py, so source precedence and
+-- last-write-wins hold across micro-batches, not only within one.
+
+-- 27. IngestRecordVersion: the winning (precedence, event time) of each transaction or listing key
+CREATE TABLE IngestRecordVersion (
+    -- transaction_id, or MLS:<mls_listing_number> for listing-level values
+    record_key VARCHAR(100) PRIMARY KEY,
+    precedence INTEGER NOT NULL,
+    event_time TIMESTAMPTZ NOT NULL,
+    source_name VARCHAR(100) NOT NULL,
+    -- Listing columns as loaded, restored when a later record of the listing loses to them
+    listing_values JSONB,
+    loaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
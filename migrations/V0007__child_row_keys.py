@@ -0,0 +1,54 @@
+"""Natural keys for the ETL's child rows, so reloading a transaction cannot duplicate them."""
+
+import logging
+
+from psycopg2 import errors
+
+logger = logging.getLogger(__name__)
+
+# (table, primary key, unique index, natural key, rows the key covers or None for all);
+# the ETL inserts with ON CONFLICT on these
+KEYS = [
+    ('Appointment', 'appointment_id', 'uq_appointment_history',
+     ['agent_id', 'client_id', 'property_id', 'scheduled_datetime', 'md5(notes)'], "status = 'completed'"),
+    ('Document', 'document_id', 'uq_document_required',
+     ['transaction_id', 'document_type', 'document_name'], 'is_required'),
+    ('ClientLead', 'lead_id', 'uq_client_lead_property',
+     ['property_id', 'first_name', 'last_name', 'lead_source'], 'property_id IS NOT NULL'),
+    ('PropertyMedia', 'media_id', 'uq_media_property_file',
+     ['property_id', 'file_url'], None),
+]
+
+
+def remove_duplicates(ctx, table, key, columns, where):
+    """Deletes all but the oldest row of each natural key (NULLs never conflict, so they are kept)."""
+    columns_sql = ', '.join(columns)
+    not_null = ' AND '.join(f"{column} IS NOT NULL" for column in columns)
+    deleted = ctx.execute(f"""
+        DELETE FROM {table}
+        WHERE {key} IN (
+            SELECT {key} FROM (
+                SELECT {key}, row_number() OVER (PARTITION BY {columns_sql} ORDER BY {key}) AS n
+                FROM {table}
+                WHERE ({where or 'TRUE'}) AND {not_null}
+            ) ranked
+            WHERE n > 1
+        )
+    """)
+    if deleted:
+        logger.info(f"Removed {deleted} duplicate {table} rows.")
+
+
+def migrate(ctx):
+    for table, key, index, columns, where in KEYS:
+        for attempt in range(1, ctx.retries + 1):
+            # Loaders keep running: a duplicate inserted after the cleanup fails the build, which is retried
+            remove_duplicates(ctx, table, key, columns, where)
+            try:
+                predicate = f" WHERE {where}" if where else ''
+                ctx.create_index(index, table, f"({', '.join(columns)}){predicate}", unique=True)
+                break
+            except errors.UniqueViolation:
+                if attempt == ctx.retries:
+                    raise
+                logger.warning(f"New duplicates in {table} while building {index}, retrying.")
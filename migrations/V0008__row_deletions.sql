@@ -0,0 +1,41 @@
+-- Delete log for the readers that follow the warehouse by updated_at/created_at watermarks
+-- (listing_search.py). A watermark sees inserts and updates but never a delete, so each
+-- deleted row leaves a tombstone here, read with the same watermark.
+
+-- 28. RowDeletion: one tombstone per deleted row
+CREATE TABLE RowDeletion (
+    deletion_id BIGSERIAL PRIMARY KEY,
+    -- TG_TABLE_NAME of the deleted row: property, propertyfeature, ...
+    table_name VARCHAR(63) NOT NULL,
+    row_id INTEGER NOT NULL,
+    -- Key of the row it belonged to (property_id of a feature), NULL for top-level rows
+    parent_id INTEGER,
+    deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_row_deletion_time ON RowDeletion (table_name, deleted_at);
+
+-- Statement-level, like the blob reference counts: a bulk or cascaded delete writes its
+-- tombstones in one INSERT. TG_ARGV: the key column and, optionally, the parent key column.
+CREATE OR REPLACE FUNCTION trg_record_row_deletions()
+RETURNS TRIGGER AS $$
+BEGIN
+    EXECUTE format(
+        'INSERT INTO RowDeletion (table_name, row_id, parent_id) SELECT %L, %I, %s FROM old_rows',
+        TG_TABLE_NAME, TG_ARGV[0], COALESCE(quote_ident(TG_ARGV[1]), 'NULL')
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_property_deletion
+AFTER DELETE ON Property
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_record_row_deletions('property_id');
+
+CREATE TRIGGER trg_property_feature_deletion
+AFTER DELETE ON PropertyFeature
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_record_row_deletions('feature_id', 'property_id');
@@ -0,0 +1,40 @@
+-- Tombstones for the other tables parquet_export.py copies by updated_at watermark, so a
+-- deleted row is dropped from the snapshots and fact tables instead of staying in them.
+-- Property and PropertyFeature are already logged by V0008.
+
+CREATE TRIGGER trg_transaction_deletion
+AFTER DELETE ON "Transaction"
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_record_row_deletions('transaction_id');
+
+-- Parent keys let fact_sales and fact_leases re-export the row a deleted child belonged to
+CREATE TRIGGER trg_commission_deletion
+AFTER DELETE ON Commission
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_record_row_deletions('commission_id', 'transaction_id');
+
+CREATE TRIGGER trg_lease_deletion
+AFTER DELETE ON Lease
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_record_row_deletions('lease_id');
+
+CREATE TRIGGER trg_payment_deletion
+AFTER DELETE ON PaymentRecord
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_record_row_deletions('payment_id', 'lease_id');
+
+CREATE TRIGGER trg_campaign_deletion
+AFTER DELETE ON MarketingCampaign
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_record_row_deletions('campaign_id');
+
+CREATE TRIGGER trg_lead_deletion
+AFTER DELETE ON ClientLead
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_record_row_deletions('lead_id');
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from query_api import StreamingQueryAPI
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+STATE_FILE = '_export_state.json'
+
+# First export starts here; every later run starts from the saved watermark
+INITIAL_WATERMARK = datetime(1970, 1, 1)
+
+
+def tombstone_sql(table, key, partition):
+    """Export SQL for the rows of one table deleted in the watermark window (RowDeletion)."""
+    return f"""
+        SELECT row_id AS {key}, NULL::text AS {partition},
+               %(until)s::timestamp AS _exported_at, TRUE AS _deleted
+        FROM RowDeletion
+        WHERE table_name = '{table}'
+          AND deleted_at > %(since)s
+          AND deleted_at <= %(until)s
+    """
+
+
+# Each dataset: export SQL with %(since)s/%(until)s watermark bounds and its partition column.
+# Rows are appended per run with an _exported_at version; readers keep the newest row per key.
+# The window filters on bare updated_at (set by its default on insert and by trigger on update)
+# so the idx_*_updated indexes of export_psql.sql serve it. Deletes never move updated_at, so
+# 'deletes' appends a tombstone (_deleted) per key logged in RowDeletion (V0008/V0009).
+# {columns} expands to every column of 'table' except 'exclude', such as the generated
+# search_vector of search_psql.sql, which is an index input and would only export as text.
+EXPORT_TABLES = {
+    'property': {
+        'key': 'property_id',
+        'partition': 'city',
+        'deletes': tombstone_sql('property', 'property_id', 'city'),
+        'sql': """
+            SELECT p.*, %(until)s::timestamp AS _exported_at
+            FROM Property p
+            WHERE p.updated_at > %(since)s
+              AND p.updated_at <= %(until)s
+        """,
+    },
+    'transaction': {
+        'key': 'transaction_id',
+        'partition': 'month',
+        'deletes': tombstone_sql('Transaction', 'transaction_id', 'month'),
+        'table': '"Transaction"',
+        'exclude': ['search_vector'],
+        'sql': """
+            SELECT {columns}, to_char(COALESCE(t.closing_date, t.offer_date), 'YYYY-MM') AS month,
+                   %(until)s::timestamp AS _exported_at
+            FROM "Transaction" t
+            WHERE t.updated_at > %(since)s
+              AND t.updated_at <= %(until)s
+        """,
+    },
+    'commission': {
+        'key': 'commission_id',
+        'partition': 'month',
+        'deletes': tombstone_sql('commission', 'commission_id', 'month'),
+        'sql': """
+            SELECT c.*, to_char(c.created_at, 'YYYY-MM') AS month,
+                   %(until)s::timestamp AS _exported_at
+            FROM Commission c
+            WHERE c.updated_at > %(since)s
+              AND c.updated_at <= %(until)s
+        """,
+    },
+    'lease': {
+        'key': 'lease_id',
+        'partition': 'month',
+        'deletes': tombstone_sql('lease', 'lease_id', 'month'),
+        'sql': """
+            SELECT l.*, to_char(l.lease_start_date, 'YYYY-MM') AS month,
+                   %(until)s::timestamp AS _exported_at
+            FROM Lease l
+            WHERE l.updated_at > %(since)s
+              AND l.updated_at <= %(until)s
+        """,
+    },
+    'payment_record': {
+        'key': 'payment_id',
+        'partition': 'month',
+        'deletes': tombstone_sql('paymentrecord', 'payment_id', 'month'),
+        'sql': """
+            SELECT pr.*, to_char(pr.payment_date, 'YYYY-MM') AS month,
+                   %(until)s::timestamp AS _exported_at
+            FROM PaymentRecord pr
+            WHERE pr.updated_at > %(since)s
+              AND pr.updated_at <= %(until)s
+        """,
+    },
+    'marketing_campaign': {
+        'key': 'campaign_id',
+        'partition': 'month',
+        'deletes': tombstone_sql('marketingcampaign', 'campaign_id', 'month'),
+        'sql': """
+            SELECT mc.*, to_char(mc.start_date, 'YYYY-MM') AS month,
+                   %(until)s::timestamp AS _exported_at
+            FROM MarketingCampaign mc
+            WHERE mc.updated_at > %(since)s
+              AND mc.updated_at <= %(until)s
+        """,
+    },
+    'client_lead': {
+        'key': 'lead_id',
+        'partition': 'month',
+        'deletes': tombstone_sql('clientlead', 'lead_id', 'month'),
+        'table': 'ClientLead',
+        'exclude': ['search_vector'],
+        'sql': """
+            SELECT {columns}, to_char(cl.created_at, 'YYYY-MM') AS month,
+                   %(until)s::timestamp AS _exported_at
+            FROM ClientLead cl
+            WHERE cl.updated_at > %(since)s
+              AND cl.updated_at <= %(until)s
+        """,
+    },
+}
+
+# Denormalized fact tables for the common revenue, agent and amenity questions.
+# A fact row is re-exported when any of its source rows changed or a child row (commission,
+# payment) was deleted in the watermark window, and tombstoned when its own row was deleted.
+FACT_TABLES = {
+    'fact_sales': {
+        'key': 'transaction_id',
+        'partition': 'month',
+        'deletes': tombstone_sql('Transaction', 'transaction_id', 'month'),
+        'sql': """
+            WITH changed AS (
+                SELECT transaction_id FROM "Transaction"
+                WHERE updated_at > %(since)s
+                  AND updated_at <= %(until)s
+                UNION
+                SELECT transaction_id FROM Commission
+                WHERE updated_at > %(since)s
+                  AND updated_at <= %(until)s
+                UNION
+                SELECT parent_id FROM RowDeletion
+                WHERE table_name = 'commission'
+                  AND deleted_at > %(since)s
+                  AND deleted_at <= %(until)s
+                UNION
+                SELECT t.transaction_id FROM "Transaction" t
+                JOIN Property p ON p.property_id = t.property_id
+                WHERE p.updated_at > %(since)s
+                  AND p.updated_at <= %(until)s
+            )
+            SELECT t.transaction_id, t.transaction_code, t.transaction_type, t.status,
+                   t.offer_date, t.accepted_date, t.closing_date,
+                   t.offer_amount, t.transaction_amount,
+                   t.closing_date - p.date_listed AS days_on_market,
+                   t.transaction_amount / NULLIF(p.list_price, 0) AS sale_to_list_ratio,
+                   p.property_id, p.mls_number, p.city, p.state, p.zip_code,
+                   pt.type_name AS property_type, p.bedrooms, p.bathrooms,
+                   p.square_footage, p.list_price, p.date_listed,
+                   o.office_id, o.office_name,
+                   t.listing_agent_id, t.selling_agent_id,
+                   c.total_commission_amount, c.listing_agent_amount,
+                   c.selling_agent_amount, c.payout_status,
+                   to_char(COALESCE(t.closing_date, t.offer_date), 'YYYY-MM') AS month,
+                   %(until)s::timestamp AS _exported_at
+            FROM changed ch
+            JOIN "Transaction" t ON t.transaction_id = ch.transaction_id
+            JOIN Property p ON p.property_id = t.property_id
+            JOIN PropertyType pt ON pt.type_id = p.property_type_id
+            JOIN Office o ON o.office_id = p.listing_office_id
+            LEFT JOIN Commission c ON c.transaction_id = t.transaction_id
+        """,
+    },
+    'fact_leases': {
+        'key': 'lease_id',
+        'partition': 'month',
+        'deletes': tombstone_sql('lease', 'lease_id', 'month'),
+        'sql': """
+            WITH changed AS (
+                SELECT lease_id FROM Lease
+                WHERE updated_at > %(since)s
+                  AND updated_at <= %(until)s
+                UNION
+                SELECT lease_id FROM PaymentRecord
+                WHERE updated_at > %(since)s
+                  AND updated_at <= %(until)s
+                UNION
+                SELECT parent_id FROM RowDeletion
+                WHERE table_name = 'paymentrecord'
+                  AND deleted_at > %(since)s
+                  AND deleted_at <= %(until)s
+            )
+            SELECT l.lease_id, l.lease_number, l.lease_status,
+                   l.lease_start_date, l.lease_end_date,
+                   l.lease_end_date - l.lease_start_date AS lease_duration_days,
+                   l.monthly_rent, l.security_deposit, l.renter_id, l.landlord_id,
+                   p.property_id, p.city, p.zip_code, pt.type_name AS property_type,
+                   p.bedrooms, p.square_footage, p.listing_agent_id,
+                   pay.payments_made, pay.rent_collected, pay.failed_payments,
+                   to_char(l.lease_start_date, 'YYYY-MM') AS month,
+                   %(until)s::timestamp AS _exported_at
+            FROM changed ch
+            JOIN Lease l ON l.lease_id = ch.lease_id
+            JOIN Property p ON p.property_id = l.property_id
+            JOIN PropertyType pt ON pt.type_id = p.property_type_id
+            LEFT JOIN LATERAL (
+                SELECT COUNT(*) AS payments_made,
+                       SUM(pr.amount) FILTER (WHERE pr.payment_type = 'rent' AND pr.status = 'completed') AS rent_collected,
+                       COUNT(*) FILTER (WHERE pr.status = 'failed') AS failed_payments
+                FROM PaymentRecord pr
+                WHERE pr.lease_id = l.lease_id
+            ) pay ON TRUE
+        """,
+    },
+    'fact_property_features': {
+        'key': 'feature_id',
+        'partition': 'city',
+        'deletes': tombstone_sql('propertyfeature', 'feature_id', 'city'),
+        'sql': """
+            SELECT pf.feature_id, pf.feature_type, pf.feature_name,
+                   p.property_id, p.city, p.zip_code, p.current_status,
+                   pt.type_name AS property_type, p.bedrooms, p.square_footage,
+                   p.list_price, p.sold_price,
+                   %(until)s::timestamp AS _exported_at
+            FROM PropertyFeature pf
+            JOIN Property p ON p.property_id = pf.property_id
+            JOIN PropertyType pt ON pt.type_id = p.property_type_id
+            WHERE (pf.created_at > %(since)s AND pf.created_at <= %(until)s)
+               OR (p.updated_at > %(since)s AND p.updated_at <= %(until)s)
+        """,
+    },
+}
+
+
+class ParquetSnapshotExporter:
+    """Exports warehouse tables and fact tables to partitioned Parquet, incrementally by watermark."""
+
+    def __init__(self, db_config, output_dir, fetch_size=50000, overlap_seconds=300):
+        self.output_dir = output_dir
+        self.state_path = os.path.join(output_dir, STATE_FILE)
+        # Re-read a small window before the last watermark to catch late-committing rows
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.api = StreamingQueryAPI(db_config, fetch_size=fetch_size)
+        self.state = {}
+
+    def load_state(self):
+        """Loads per-dataset watermarks from the previous runs."""
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                self.state = json.load(f)
+        return self.state
+
+    def save_state(self):
+        """Writes the watermark state atomically."""
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def database_now(self):
+        """Returns the database clock, used as the upper watermark of a run."""
+        with self.api.conn.cursor() as cursor:
+            cursor.execute("SELECT LOCALTIMESTAMP")
+            now = cursor.fetchone()[0]
+        self.api.conn.rollback()
+        return now
+
+    def select_sql(self, spec):
+        """Returns the dataset's export SQL with {columns} expanded from the catalog."""
+        if 'exclude' not in spec:
+            return spec['sql']
+        with self.api.conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum)
+                FROM pg_attribute
+                WHERE attrelid = %s::regclass
+                  AND attnum > 0
+                  AND NOT attisdropped
+                  AND attname <> ALL(%s)
+            """, (spec['table'], spec['exclude']))
+            columns = cursor.fetchone()[0]
+        self.api.conn.rollback()
+        return spec['sql'].format(columns=columns)
+
+    def write_batches(self, name, spec, sql, params, basename):
+        """Streams one query's rows into a dataset's partitioned Parquet directory; returns the row count."""
+        import pyarrow.dataset as ds
+
+        row_count = 0
+
+        def batches():
+            nonlocal row_count
+            for batch in self.api.iter_arrow_batches(sql, params):
+                row_count += batch.num_rows
+                yield batch
+
+        batch_iter = batches()
+        first = next(batch_iter, None)
+        if first is not None:
+            def all_batches():
+                yield first
+                yield from batch_iter
+
+            ds.write_dataset(
+                all_batches(),
+                os.path.join(self.output_dir, name),
+                schema=first.schema,
+                format='parquet',
+                partitioning=[spec['partition']],
+                partitioning_flavor='hive',
+                basename_template=f"{basename}-{{i}}.parquet",
+                existing_data_behavior='overwrite_or_ignore',
+            )
+        return row_count
+
+    def export_dataset(self, name, spec, until, full=False):
+        """Streams one dataset's changed rows, then tombstones for its deleted keys."""
+        dataset_state = self.state.get(name, {})
+        if full or 'watermark' not in dataset_state:
+            since = INITIAL_WATERMARK
+        else:
+            since = datetime.fromisoformat(dataset_state['watermark']) - self.overlap
+
+        params = {'since': since, 'until': until}
+        run_id = f"{until:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        row_count = self.write_batches(name, spec, self.select_sql(spec), params, f"part-{run_id}")
+        deleted_count = self.write_batches(name, spec, spec['deletes'], params, f"deletes-{run_id}")
+
+        self.state[name] = {
+            'watermark': until.isoformat(),
+            'key': spec['key'],
+            'last_rows': row_count,
+            'total_rows': dataset_state.get('total_rows', 0) + row_count,
+            'last_deleted': deleted_count,
+            'total_deleted': dataset_state.get('total_deleted', 0) + deleted_count,
+            'runs': dataset_state.get('runs', 0) + 1,
+        }
+        self.save_state()
+        logger.info(f"Exported {row_count} changed and {deleted_count} deleted rows to {name} "
+                    f"(since {since:%Y-%m-%d %H:%M:%S}).")
+        return row_count + deleted_count
+
+    def export(self, datasets=None, full=False):
+        """Exports all (or the selected) base and fact datasets."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.load_state()
+        self.api.connect_db()
+
+        try:
+            until = self.database_now()
+            specs = {**EXPORT_TABLES, **FACT_TABLES}
+            for name in datasets or specs:
+                try:
+                    self.export_dataset(name, specs[name], until, full)
+                except Exception as e:
+                    logger.error(f"Export of {name} failed: {e}")
+                    raise
+        finally:
+            self.api.close_db()
+
+
+def latest_rows_sql(output_dir, name, key, has_deletes=False):
+    """
+    Returns DuckDB SQL that reads a dataset keeping only the newest version of each row,
+    and none of a row whose newest version is a tombstone.
+    """
+    path = os.path.join(output_dir, name, '**', '*.parquet')
+    if not has_deletes:
+        return f"""
+            SELECT * EXCLUDE (_version_rank) FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY {key} ORDER BY _exported_at DESC) AS _version_rank
+                FROM read_parquet('{path}', hive_partitioning = true, union_by_name = true)
+            ) WHERE _version_rank = 1
+        """
+    # A row re-created after its delete in the same window outranks the tombstone
+    return f"""
+        SELECT * EXCLUDE (_version_rank, _deleted) FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY {key}
+                                         ORDER BY _exported_at DESC, _deleted NULLS FIRST) AS _version_rank
+            FROM read_parquet('{path}', hive_partitioning = true, union_by_name = true)
+        ) WHERE _version_rank = 1 AND _deleted IS NULL
+    """
+
+
+def open_duckdb(output_dir):
+    """Opens an in-memory DuckDB session with one view per exported dataset (newest live rows only)."""
+    import duckdb
+
+    with open(os.path.join(output_dir, STATE_FILE)) as f:
+        state = json.load(f)
+
+    con = duckdb.connect()
+    for name, dataset_state in state.items():
+        if os.path.isdir(os.path.join(output_dir, name)):
+            has_deletes = dataset_state.get('total_deleted', 0) > 0
+            con.execute(f"CREATE VIEW {name} AS "
+                        f"{latest_rows_sql(output_dir, name, dataset_state['key'], has_deletes)}")
+    return con
+
+
+def main():
+    """Main function"""
+    from config import DATABASE_CONFIG
+
+    parser = argparse.ArgumentParser(description="Incremental Parquet snapshot of the Dream Homes NYC warehouse.")
+    parser.add_argument('--output-dir', default='warehouse_parquet')
+    parser.add_argument('--dataset', action='append', help="Export only this dataset (repeatable)")
+    parser.add_argument('--full', action='store_true', help="Ignore watermarks and re-export everything")
+    args = parser.parse_args()
+
+    exporter = ParquetSnapshotExporter(DATABASE_CONFIG, args.output_dir)
+    exporter.export(args.dataset, args.full)
+
+
+if __name__ == "__main__":
+    main()
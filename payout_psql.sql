@@ -0,0 +1,182 @@
+-- Commission payout runs: bulk reconciliation and approved -> paid transitions.
+-- Run after ans_psql.sql. run_commission_payout() is called by commission_payout.py.
+
+-- 18. CommissionPayoutRun: one row per payout run
+DROP TABLE IF EXISTS CommissionPayoutRun CASCADE;
+CREATE TABLE CommissionPayoutRun (
+    run_id SERIAL PRIMARY KEY,
+    period_start DATE NOT NULL,
+    period_end DATE NOT NULL,
+    payout_date DATE NOT NULL,
+    final_status payout_status_enum NOT NULL,
+    commissions_count INTEGER DEFAULT 0,
+    exceptions_count INTEGER DEFAULT 0,
+    total_gross DECIMAL(14,2) DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT chk_payout_period CHECK (period_end >= period_start)
+);
+
+ALTER TABLE Commission ADD COLUMN IF NOT EXISTS payout_run_id INTEGER REFERENCES CommissionPayoutRun(run_id);
+CREATE INDEX IF NOT EXISTS idx_commission_payout_run ON Commission (payout_run_id);
+
+-- 19. CommissionPayoutLine: one line per agent share of a commission (statement detail)
+DROP TABLE IF EXISTS CommissionPayoutLine CASCADE;
+CREATE TABLE CommissionPayoutLine (
+    line_id BIGSERIAL PRIMARY KEY,
+    run_id INTEGER NOT NULL,
+    commission_id INTEGER NOT NULL,
+    transaction_id INTEGER NOT NULL,
+    agent_id INTEGER NOT NULL,
+    office_id INTEGER NOT NULL,
+    agent_role VARCHAR(10) NOT NULL,
+    gross_amount DECIMAL(10,2) NOT NULL,
+    office_share DECIMAL(10,2) NOT NULL,
+    agent_net DECIMAL(10,2) NOT NULL,
+    FOREIGN KEY (run_id) REFERENCES CommissionPayoutRun(run_id) ON DELETE CASCADE,
+    FOREIGN KEY (commission_id) REFERENCES Commission(commission_id),
+    FOREIGN KEY (agent_id) REFERENCES Employee(employee_id),
+    FOREIGN KEY (office_id) REFERENCES Office(office_id),
+    CONSTRAINT chk_agent_role CHECK (agent_role IN ('listing', 'selling'))
+);
+
+CREATE INDEX idx_payout_line_run ON CommissionPayoutLine (run_id, office_id, agent_id);
+
+-- 20. CommissionPayoutException: commissions held back because they did not reconcile
+DROP TABLE IF EXISTS CommissionPayoutException CASCADE;
+CREATE TABLE CommissionPayoutException (
+    exception_id BIGSERIAL PRIMARY KEY,
+    run_id INTEGER NOT NULL,
+    commission_id INTEGER NOT NULL,
+    reason VARCHAR(200) NOT NULL,
+    total_commission_amount DECIMAL(10,2),
+    split_total DECIMAL(10,2),
+    rate_based_amount DECIMAL(10,2),
+    FOREIGN KEY (run_id) REFERENCES CommissionPayoutRun(run_id) ON DELETE CASCADE,
+    FOREIGN KEY (commission_id) REFERENCES Commission(commission_id)
+);
+
+CREATE INDEX idx_payout_exception_run ON CommissionPayoutException (run_id);
+
+-- Picks every pending/approved commission of completed transactions closed in the period,
+-- reconciles the parsed listing/selling split against the total (or, for commissions created by
+-- trg_create_commission_record, against the agents' commission rates) and the total against the
+-- rate-based amount the trigger assumes, then moves the reconciled ones to approved and
+-- (unless p_approve_only) paid. Everything is set-based; returns the run id.
+CREATE OR REPLACE FUNCTION run_commission_payout(
+    p_period_start DATE,
+    p_period_end DATE,
+    p_payout_date DATE DEFAULT CURRENT_DATE,
+    p_approve_only BOOLEAN DEFAULT FALSE,
+    p_expected_rate DECIMAL DEFAULT 6.0,
+    p_rate_tolerance_pct DECIMAL DEFAULT 20.0
+)
+RETURNS INTEGER AS $$
+DECLARE
+    new_run_id INTEGER;
+BEGIN
+    INSERT INTO CommissionPayoutRun (period_start, period_end, payout_date, final_status)
+    VALUES (p_period_start, p_period_end, p_payout_date,
+            CASE WHEN p_approve_only THEN 'approved' ELSE 'paid' END::payout_status_enum)
+    RETURNING run_id INTO new_run_id;
+
+    -- 1. Eligible commissions, selected and locked by one statement, so a commission committed
+    --    meanwhile cannot join the run unlocked. A run that waited for another run's locks
+    --    re-checks the rows it then gets: a paid commission, or one an approve run already
+    --    approved (only approve runs leave a payout_run_id on an approved commission), drops out.
+    CREATE TEMP TABLE payout_candidate ON COMMIT DROP AS
+    SELECT c.commission_id,
+           c.transaction_id,
+           c.total_commission_amount,
+           c.listing_agent_id,
+           c.listing_agent_amount,
+           le.office_id AS listing_office_id,
+           c.selling_agent_id,
+           COALESCE(c.selling_agent_amount, 0) AS selling_agent_amount,
+           se.office_id AS selling_office_id,
+           COALESCE(c.office_split_percentage, 50) AS office_split_percentage,
+           c.listing_agent_amount + COALESCE(c.selling_agent_amount, 0) AS split_total,
+           -- The split trg_create_commission_record writes: each agent's commission_rate percent
+           ROUND(c.total_commission_amount * le.commission_rate / 100, 2) AS listing_rate_amount,
+           COALESCE(ROUND(c.total_commission_amount * se.commission_rate / 100, 2), 0) AS selling_rate_amount,
+           ROUND(t.transaction_amount * p_expected_rate / 100, 2) AS rate_based_amount
+    FROM Commission c
+    JOIN "Transaction" t ON t.transaction_id = c.transaction_id
+    JOIN Employee le ON le.employee_id = c.listing_agent_id
+    LEFT JOIN Employee se ON se.employee_id = c.selling_agent_id
+    WHERE (c.payout_status = 'pending'
+           OR (c.payout_status = 'approved' AND (NOT p_approve_only OR c.payout_run_id IS NULL)))
+      AND t.status = 'completed'
+      AND t.closing_date BETWEEN p_period_start AND p_period_end
+    FOR UPDATE OF c;
+
+    -- 2. Reconciliation exceptions are recorded and held back
+    INSERT INTO CommissionPayoutException (
+        run_id, commission_id, reason, total_commission_amount, split_total, rate_based_amount
+    )
+    SELECT new_run_id, pc.commission_id,
+           CASE
+               WHEN pc.split_mismatch
+                   THEN 'Listing/selling split matches neither the total commission nor the agent rates'
+               WHEN pc.missing_office
+                   THEN 'Agent has no office to share the commission with'
+               ELSE 'Total commission differs from the rate-based amount beyond tolerance'
+           END,
+           pc.total_commission_amount, pc.split_total, pc.rate_based_amount
+    FROM (
+        SELECT p.*,
+               ABS(p.split_total - p.total_commission_amount) > 0.01
+               AND NOT COALESCE(ABS(p.listing_agent_amount - p.listing_rate_amount) <= 0.01
+                                AND ABS(p.selling_agent_amount - p.selling_rate_amount) <= 0.01, FALSE)
+                   AS split_mismatch,
+               p.listing_office_id IS NULL
+               OR (p.selling_agent_id IS NOT NULL AND p.selling_agent_amount > 0
+                   AND p.selling_office_id IS NULL) AS missing_office
+        FROM payout_candidate p
+    ) pc
+    WHERE pc.split_mismatch
+       OR pc.missing_office
+       OR ABS(pc.total_commission_amount - pc.rate_based_amount)
+          > pc.rate_based_amount * p_rate_tolerance_pct / 100;
+
+    DELETE FROM payout_candidate pc
+    USING CommissionPayoutException ex
+    WHERE ex.run_id = new_run_id AND ex.commission_id = pc.commission_id;
+
+    -- 3. pending -> approved -> paid in one UPDATE (approved only when p_approve_only)
+    UPDATE Commission c
+    SET payout_status = CASE WHEN p_approve_only THEN 'approved' ELSE 'paid' END::payout_status_enum,
+        payout_date = CASE WHEN p_approve_only THEN c.payout_date ELSE p_payout_date END,
+        payout_run_id = new_run_id
+    FROM payout_candidate pc
+    WHERE c.commission_id = pc.commission_id;
+
+    -- 4. Statement lines: one per agent share, split between agent and office
+    INSERT INTO CommissionPayoutLine (
+        run_id, commission_id, transaction_id, agent_id, office_id, agent_role,
+        gross_amount, office_share, agent_net
+    )
+    SELECT new_run_id, s.commission_id, s.transaction_id, s.agent_id, s.office_id, s.agent_role,
+           s.amount,
+           ROUND(s.amount * s.office_split_percentage / 100, 2),
+           s.amount - ROUND(s.amount * s.office_split_percentage / 100, 2)
+    FROM (
+        SELECT commission_id, transaction_id, listing_agent_id AS agent_id, listing_office_id AS office_id,
+               'listing' AS agent_role, listing_agent_amount AS amount, office_split_percentage
+        FROM payout_candidate
+        UNION ALL
+        SELECT commission_id, transaction_id, selling_agent_id, selling_office_id, 'selling',
+               selling_agent_amount, office_split_percentage
+        FROM payout_candidate
+        WHERE selling_agent_id IS NOT NULL AND selling_agent_amount > 0
+    ) s;
+
+    UPDATE CommissionPayoutRun r
+    SET commissions_count = (SELECT COUNT(*) FROM payout_candidate),
+        exceptions_count = (SELECT COUNT(*) FROM CommissionPayoutException WHERE run_id = new_run_id),
+        total_gross = COALESCE((SELECT SUM(total_commission_amount) FROM payout_candidate), 0)
+    WHERE r.run_id = new_run_id;
+
+    DROP TABLE payout_candidate;
+    RETURN new_run_id;
+END;
+$$ LANGUAGE plpgsql;
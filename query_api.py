@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import csv
+import logging
+import os
+import re
+import uuid
+from decimal import Decimal
+
+import pandas as pd
+import psycopg2
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Named query files shipped with the project: name prefix -> file name
+QUERY_FILES = {
+    'final_q': 'final_q.sql',
+    'complex': 'Complex Query.sql',
+}
+
+# Matches the query headers used in both files, e.g.
+# "-- Question 3: How much extra rent ..." and "--6. Monthly Sale vs. Rental ..."
+QUERY_HEADER = re.compile(r'^--\s*(?:Question\s+)?(\d+)[.:]\s*(.+?)\s*$')
+
+# Postgres type OIDs -> Arrow type names used for streamed exports
+PG_TYPE_MAP = {
+    16: 'bool',
+    20: 'int64',
+    21: 'int16',
+    23: 'int32',
+    700: 'float32',
+    701: 'float64',
+    1082: 'date32',
+    1114: 'timestamp',
+    1184: 'timestamptz',
+}
+
+
+class QueryLibrary:
+    """Loads the named analyst queries from final_q.sql and Complex Query.sql."""
+
+    def __init__(self, base_dir=BASE_DIR, query_files=None):
+        self.base_dir = base_dir
+        self.queries = {}
+        for prefix, file_name in (query_files or QUERY_FILES).items():
+            self.load_file(prefix, os.path.join(base_dir, file_name))
+
+    def load_file(self, prefix, path):
+        """Splits a SQL file into named queries on its numbered header comments."""
+        with open(path, encoding='utf-8-sig') as f:
+            lines = f.read().splitlines()
+
+        name, title, body = None, None, []
+        for line in lines + ['-- 0: end']:
+            match = QUERY_HEADER.match(line)
+            if match:
+                if name and ''.join(body).strip():
+                    self.queries[name] = {
+                        'title': title,
+                        'sql': '\n'.join(body).strip().rstrip(';').strip(),
+                        'source': os.path.basename(path),
+                    }
+                name = f"{prefix}_{int(match.group(1))}"
+                title = match.group(2)
+                body = []
+            elif name:
+                body.append(line)
+
+        logger.info(f"Loaded named queries from {os.path.basename(path)}.")
+
+    def names(self):
+        """Returns all query names in file order."""
+        return list(self.queries)
+
+    def get(self, name):
+        """Returns the SQL text of a named query."""
+        if name not in self.queries:
+            raise KeyError(f"Unknown query '{name}'. Available: {', '.join(self.queries)}")
+        return self.queries[name]['sql']
+
+    def title(self, name):
+        """Returns the business question a named query answers."""
+        return self.queries[name]['title']
+
+
+class StreamingQueryAPI:
+    """Runs named or ad-hoc queries through server-side cursors in fixed-size batches."""
+
+    def __init__(self, db_config, fetch_size=10000, library=None, readonly=True):
+        self.db_config = db_config
+        self.fetch_size = fetch_size
+        self.library = library or QueryLibrary()
+        self.readonly = readonly
+        self.conn = None
+
+    def connect_db(self):
+        """Connects to the database."""
+        try:
+            self.conn = psycopg2.connect(**self.db_config)
+            if self.readonly:
+                self.conn.set_session(readonly=True)
+            logger.info("Database connection successful.")
+        except Exception as e:
+            logger.error(f"Database connection failed: {e}")
+            raise
+
+    def close_db(self):
+        """Closes the database connection."""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+        logger.info("Database connection closed.")
+
+    def __enter__(self):
+        self.connect_db()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close_db()
+
+    def resolve_sql(self, query, params=None):
+        """Returns executable SQL for a query name or raw SQL text."""
+        sql = self.library.get(query) if query in self.library.queries else query
+
+        # Literal '%' (e.g. ILIKE '%pool%') must be doubled once parameters are bound;
+        # only named placeholders such as %(city)s are supported.
+        if params:
+            sql = re.sub(r'%(?!\()', '%%', sql)
+        return sql
+
+    def stream_rows(self, query, params=None, fetch_size=None, empty_batch=False):
+        """
+        Yields (column descriptions, list of row tuples) batches from a named cursor.
+        With empty_batch, an empty result still yields one batch without rows, for its columns.
+        """
+        if not self.conn:
+            self.connect_db()
+
+        fetch_size = fetch_size or self.fetch_size
+        sql = self.resolve_sql(query, params)
+        cursor = self.conn.cursor(name=f"stream_{uuid.uuid4().hex[:12]}")
+        cursor.itersize = fetch_size
+
+        try:
+            cursor.execute(sql, params or None)
+            rows = cursor.fetchmany(fetch_size)
+            if not rows and empty_batch:
+                yield cursor.description, rows
+            while rows:
+                yield cursor.description, rows
+                rows = cursor.fetchmany(fetch_size)
+        finally:
+            cursor.close()
+            # Server-side cursors live inside a transaction; end it so the snapshot is released
+            self.conn.rollback()
+
+    def iter_dataframes(self, query, params=None, fetch_size=None):
+        """Yields the result as pandas DataFrame chunks."""
+        for description, rows in self.stream_rows(query, params, fetch_size):
+            columns = [col.name for col in description]
+            yield pd.DataFrame.from_records(rows, columns=columns)
+
+    def iter_arrow_batches(self, query, params=None, fetch_size=None):
+        """Yields the result as pyarrow RecordBatches sharing one schema."""
+        import pyarrow as pa
+
+        schema = None
+        for description, rows in self.stream_rows(query, params, fetch_size):
+            if schema is None:
+                schema = self.arrow_schema(description)
+            columns = list(zip(*rows))
+            arrays = [
+                pa.array(self.to_arrow_values(values, field.type), type=field.type)
+                for values, field in zip(columns, schema)
+            ]
+            yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def arrow_schema(self, description):
+        """Builds a stable Arrow schema from cursor column types."""
+        import pyarrow as pa
+
+        fields = []
+        for col in description:
+            type_name = PG_TYPE_MAP.get(col.type_code)
+            if type_name == 'timestamp':
+                arrow_type = pa.timestamp('us')
+            elif type_name == 'timestamptz':
+                arrow_type = pa.timestamp('us', tz='UTC')
+            elif type_name:
+                arrow_type = getattr(pa, type_name)()
+            elif col.type_code == 1700:
+                # Typed NUMERIC columns keep exact decimals; computed ones (ROUND, AVG) become float
+                if col.precision and col.scale is not None and col.precision <= 38:
+                    arrow_type = pa.decimal128(col.precision, col.scale)
+                else:
+                    arrow_type = pa.float64()
+            else:
+                # Text, varchar, enums and anything else are exported as strings
+                arrow_type = pa.string()
+            fields.append(pa.field(col.name, arrow_type))
+        return pa.schema(fields)
+
+    def to_arrow_values(self, values, arrow_type):
+        """Coerces Python values from psycopg2 to what the Arrow type accepts."""
+        import pyarrow as pa
+
+        if pa.types.is_floating(arrow_type):
+            return [float(v) if v is not None else None for v in values]
+        if pa.types.is_string(arrow_type):
+            return [str(v) if v is not None else None for v in values]
+        if pa.types.is_decimal(arrow_type):
+            return [Decimal(v) if v is not None else None for v in values]
+        return list(values)
+
+    def to_csv(self, query, path, params=None, fetch_size=None):
+        """Streams a query result into a CSV file and returns the row count (an empty result keeps its header)."""
+        row_count = 0
+        header = False
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            for description, rows in self.stream_rows(query, params, fetch_size, empty_batch=True):
+                if not header:
+                    writer.writerow([col.name for col in description])
+                    header = True
+                writer.writerows(rows)
+                row_count += len(rows)
+
+        logger.info(f"Wrote {row_count} rows to {path}.")
+        return row_count
+
+    def to_parquet(self, query, path, params=None, fetch_size=None):
+        """Streams a query result into a Parquet file, one row group per batch."""
+        import pyarrow.parquet as pq
+
+        row_count = 0
+        writer = None
+        try:
+            for batch in self.iter_arrow_batches(query, params, fetch_size):
+                if writer is None:
+                    writer = pq.ParquetWriter(path, batch.schema)
+                writer.write_batch(batch)
+                row_count += batch.num_rows
+        finally:
+            if writer:
+                writer.close()
+
+        logger.info(f"Wrote {row_count} rows to {path}.")
+        return row_count
+
+    def run(self, query, params=None):
+        """Returns a small result as a single DataFrame."""
+        chunks = list(self.iter_dataframes(query, params))
+        if not chunks:
+            return pd.DataFrame()
+        return pd.concat(chunks, ignore_index=True)
+
+
+def parse_param(text):
+    """Parses a --param key=value pair; values are sent as text and cast by Postgres."""
+    key, sep, value = text.partition('=')
+    if not sep or not key:
+        raise argparse.ArgumentTypeError(f"Expected key=value, got '{text}'")
+    return key, value
+
+
+def main():
+    """Main function"""
+    from config import DATABASE_CONFIG
+
+    parser = argparse.ArgumentParser(description="Stream Dream Homes NYC analyst queries to files.")
+    parser.add_argument('query', nargs='?', help="Query name (e.g. final_q_7, complex_6) or SQL text")
+    parser.add_argument('--output', help="Output file (.csv or .parquet)")
+    parser.add_argument('--fetch-size', type=int, default=10000)
+    parser.add_argument('--param', type=parse_param, action='append', default=[], metavar='KEY=VALUE',
+                        help="Value for a %%(key)s placeholder in the query (repeatable)")
+    parser.add_argument('--list', action='store_true', help="List the available named queries")
+    args = parser.parse_args()
+
+    library = QueryLibrary()
+    if args.list or not args.query:
+        for name in library.names():
+            print(f"{name:12} {library.title(name)}")
+        return
+
+    params = dict(args.param)
+    with StreamingQueryAPI(DATABASE_CONFIG, fetch_size=args.fetch_size, library=library) as api:
+        if args.output and args.output.endswith('.parquet'):
+            api.to_parquet(args.query, args.output, params)
+        elif args.output:
+            api.to_csv(args.query, args.output, params)
+        else:
+            for chunk in api.iter_dataframes(args.query, params):
+                print(chunk.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import logging
+from datetime import date
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from result_cache import bump_data_epochs
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class RentRollEngine:
+    """Maintains RentSchedule (rent_roll_psql.sql) and reports arrears from its partial index."""
+
+    def __init__(self, db_config, grace_days=5):
+        self.db_config = db_config
+        self.grace_days = grace_days
+        self.conn = None
+        self.cursor = None
+
+    def connect_db(self):
+        """Connects to the database."""
+        try:
+            self.conn = psycopg2.connect(**self.db_config)
+            self.cursor = self.conn.cursor(cursor_factory=RealDictCursor)
+            logger.info("Database connection successful.")
+        except Exception as e:
+            logger.error(f"Database connection failed: {e}")
+            raise
+
+    def close_db(self):
+        """Closes the database connection."""
+        if self.cursor:
+            self.cursor.close()
+        if self.conn:
+            self.conn.close()
+        logger.info("Database connection closed.")
+
+    def refresh(self, lease_ids=None, as_of=None):
+        """Generates missing schedule rows and re-allocates payments (all leases when lease_ids is None)."""
+        self.cursor.execute(
+            "SELECT refresh_rent_roll(%s, %s, %s) AS changed",
+            (lease_ids, as_of or date.today(), self.grace_days)
+        )
+        changed = self.cursor.fetchone()['changed']
+        if changed:
+            bump_data_epochs(self.cursor, ['RentSchedule'])
+        self.conn.commit()
+        logger.info(f"Rent roll refreshed: {changed} schedule rows changed.")
+        return changed
+
+    def mark_overdue(self, as_of=None):
+        """Flags unpaid items past the grace period as overdue."""
+        self.cursor.execute(
+            "SELECT mark_overdue_rent(%s, %s) AS updated", (as_of or date.today(), self.grace_days)
+        )
+        updated = self.cursor.fetchone()['updated']
+        if updated:
+            bump_data_epochs(self.cursor, ['RentSchedule'])
+        self.conn.commit()
+        logger.info(f"Marked {updated} rent items overdue.")
+        return updated
+
+    def arrears(self, month_start, overdue_only=True):
+        """Returns outstanding rent items due in the month starting at month_start."""
+        next_month = date(month_start.year + month_start.month // 12, month_start.month % 12 + 1, 1)
+        self.cursor.execute(
+            "SELECT * FROM rent_arrears(%s, %s, %s)", (month_start, next_month, overdue_only)
+        )
+        rows = self.cursor.fetchall()
+        self.conn.rollback()
+        return rows
+
+
+def main():
+    """Main function"""
+    from config import DATABASE_CONFIG
+
+    parser = argparse.ArgumentParser(description="Rent roll maintenance and arrears report.")
+    parser.add_argument('--full-refresh', action='store_true', help="Rebuild schedules and allocations for all leases")
+    parser.add_argument('--grace-days', type=int, default=5)
+    parser.add_argument('--report-month', help="YYYY-MM: list overdue items due in that month")
+    args = parser.parse_args()
+
+    engine = RentRollEngine(DATABASE_CONFIG, args.grace_days)
+    engine.connect_db()
+    try:
+        if args.full_refresh:
+            engine.refresh()
+        engine.mark_overdue()
+
+        if args.report_month:
+            year, month = map(int, args.report_month.split('-'))
+            for row in engine.arrears(date(year, month, 1)):
+                print(f"{row['lease_number']:20} due {row['due_date']}  balance {row['balance']:>10}  {row['status']}")
+    finally:
+        engine.close_db()
+
+
+if __name__ == "__main__":
+    main()
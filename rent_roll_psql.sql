@@ -0,0 +1,214 @@
+-- Rent roll: the full monthly schedule of every lease, with actual payments allocated against it.
+-- Run after ans_psql.sql. refresh_rent_roll() is called by the ETL once per batch of new leases
+-- and by rent_roll.py for the nightly overdue sweep. RentSchedule is derived from Lease and
+-- PaymentRecord, so re-running the script rebuilds it.
+--
+-- The warehouse only knows payments from the day a lease was loaded (Lease.created_at): the ETL
+-- records just the deposit and first month of a historical lease. Periods due before that day
+-- are history and count as settled, so they never show up as arrears.
+
+DO $$
+BEGIN
+    CREATE TYPE rent_schedule_status_enum AS ENUM ('scheduled', 'partial', 'paid', 'overdue');
+EXCEPTION
+    WHEN duplicate_object THEN NULL;
+END;
+$$;
+
+-- 17. RentSchedule: one row per lease month
+DROP TABLE IF EXISTS RentSchedule CASCADE;
+CREATE TABLE RentSchedule (
+    schedule_id BIGSERIAL PRIMARY KEY,
+    lease_id INTEGER NOT NULL,
+    period_number SMALLINT NOT NULL,
+    due_date DATE NOT NULL,
+    amount_due DECIMAL(8,2) NOT NULL,
+    amount_paid DECIMAL(8,2) NOT NULL DEFAULT 0,
+    last_payment_date DATE,
+    status rent_schedule_status_enum NOT NULL DEFAULT 'scheduled',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (lease_id) REFERENCES Lease(lease_id) ON DELETE CASCADE,
+    UNIQUE (lease_id, due_date),
+    CONSTRAINT chk_schedule_amounts CHECK (amount_due > 0 AND amount_paid >= 0)
+);
+
+-- Only unpaid items are indexed: "who is late this month" reads this small index
+-- instead of aggregating PaymentRecord across all leases.
+CREATE INDEX idx_rent_schedule_outstanding ON RentSchedule (due_date, lease_id)
+    INCLUDE (amount_due, amount_paid, status)
+    WHERE status <> 'paid';
+
+CREATE TRIGGER update_rent_schedule_timestamp
+BEFORE UPDATE ON RentSchedule
+FOR EACH ROW
+EXECUTE FUNCTION update_timestamp();
+
+-- Monthly periods between lease_start_date and lease_end_date (all leases when p_lease_ids is NULL);
+-- a trailing partial month is billed as its own period. tracked_from is the first day whose
+-- periods and payments the warehouse tracks.
+CREATE OR REPLACE FUNCTION rent_schedule_periods(p_lease_ids INTEGER[] DEFAULT NULL)
+RETURNS TABLE (lease_id INTEGER, period_number SMALLINT, due_date DATE, amount_due DECIMAL(8,2), tracked_from DATE) AS $$
+    SELECT l.lease_id,
+           (n + 1)::SMALLINT,
+           (l.lease_start_date + make_interval(months => n))::DATE,
+           l.monthly_rent,
+           COALESCE(l.created_at::DATE, l.lease_start_date)
+    FROM Lease l
+    CROSS JOIN LATERAL generate_series(
+        0,
+        (EXTRACT(YEAR FROM age(l.lease_end_date, l.lease_start_date)) * 12
+         + EXTRACT(MONTH FROM age(l.lease_end_date, l.lease_start_date))
+         + CASE WHEN EXTRACT(DAY FROM age(l.lease_end_date, l.lease_start_date)) > 0 THEN 1 ELSE 0 END
+        )::INTEGER - 1
+    ) AS n
+    WHERE (p_lease_ids IS NULL OR l.lease_id = ANY(p_lease_ids));
+$$ LANGUAGE sql STABLE;
+
+-- Brings the schedule of the given leases (all leases when NULL) in line with their current terms
+-- and allocates completed rent payments to it oldest-first. Returns the number of schedule rows changed.
+CREATE OR REPLACE FUNCTION refresh_rent_roll(
+    p_lease_ids INTEGER[] DEFAULT NULL,
+    p_as_of DATE DEFAULT CURRENT_DATE,
+    p_grace_days INTEGER DEFAULT 5
+)
+RETURNS INTEGER AS $$
+DECLARE
+    removed INTEGER;
+    generated INTEGER;
+    allocated INTEGER;
+BEGIN
+    -- 1. Future periods a shortened or re-dated lease no longer has; past periods stay as billed
+    DELETE FROM RentSchedule rs
+    WHERE (p_lease_ids IS NULL OR rs.lease_id = ANY(p_lease_ids))
+      AND rs.due_date >= p_as_of
+      AND NOT EXISTS (
+          SELECT 1 FROM rent_schedule_periods(p_lease_ids) s
+          WHERE s.lease_id = rs.lease_id AND s.due_date = rs.due_date
+      );
+
+    GET DIAGNOSTICS removed = ROW_COUNT;
+
+    -- 2. Missing periods; a changed rent applies to future periods only
+    INSERT INTO RentSchedule (lease_id, period_number, due_date, amount_due)
+    SELECT s.lease_id, s.period_number, s.due_date, s.amount_due
+    FROM rent_schedule_periods(p_lease_ids) s
+    ON CONFLICT (lease_id, due_date) DO UPDATE SET
+        period_number = EXCLUDED.period_number,
+        amount_due = EXCLUDED.amount_due
+    WHERE RentSchedule.due_date >= p_as_of
+      AND (RentSchedule.period_number, RentSchedule.amount_due)
+          IS DISTINCT FROM (EXCLUDED.period_number, EXCLUDED.amount_due);
+
+    GET DIAGNOSTICS generated = ROW_COUNT;
+
+    -- 3. Periods before tracked_from are settled history. Later periods get the payments made
+    --    from tracked_from on, in due-date order (amounts are recomputed, so prepayments move
+    --    with a changed schedule).
+    WITH tracked AS (
+        SELECT l.lease_id, COALESCE(l.created_at::DATE, l.lease_start_date) AS tracked_from
+        FROM Lease l
+        WHERE (p_lease_ids IS NULL OR l.lease_id = ANY(p_lease_ids))
+    ),
+    paid AS (
+        SELECT pr.lease_id,
+               SUM(pr.amount) AS total_paid,
+               MAX(pr.payment_date) AS last_payment_date
+        FROM PaymentRecord pr
+        JOIN tracked t ON t.lease_id = pr.lease_id
+        WHERE pr.payment_type = 'rent'
+          AND pr.status = 'completed'
+          AND pr.payment_date >= t.tracked_from
+        GROUP BY pr.lease_id
+    ),
+    allocation AS (
+        SELECT rs.schedule_id,
+               rs.due_date,
+               rs.amount_due,
+               p.last_payment_date,
+               LEAST(rs.amount_due, GREATEST(0,
+                   COALESCE(p.total_paid, 0)
+                   - (SUM(rs.amount_due) OVER (PARTITION BY rs.lease_id ORDER BY rs.due_date) - rs.amount_due)
+               )) AS amount_paid
+        FROM RentSchedule rs
+        JOIN tracked t ON t.lease_id = rs.lease_id
+        LEFT JOIN paid p ON p.lease_id = rs.lease_id
+        WHERE rs.due_date >= t.tracked_from
+        UNION ALL
+        SELECT rs.schedule_id, rs.due_date, rs.amount_due, NULL, rs.amount_due
+        FROM RentSchedule rs
+        JOIN tracked t ON t.lease_id = rs.lease_id
+        WHERE rs.due_date < t.tracked_from
+    ),
+    classified AS (
+        SELECT a.*,
+               CASE
+                   WHEN a.amount_paid >= a.amount_due THEN 'paid'
+                   WHEN a.due_date < p_as_of - p_grace_days THEN 'overdue'
+                   WHEN a.amount_paid > 0 THEN 'partial'
+                   ELSE 'scheduled'
+               END::rent_schedule_status_enum AS new_status
+        FROM allocation a
+    )
+    UPDATE RentSchedule rs
+    SET amount_paid = c.amount_paid,
+        status = c.new_status,
+        last_payment_date = CASE WHEN c.amount_paid > 0 THEN c.last_payment_date END
+    FROM classified c
+    WHERE rs.schedule_id = c.schedule_id
+      AND (rs.amount_paid, rs.status) IS DISTINCT FROM (c.amount_paid, c.new_status);
+
+    GET DIAGNOSTICS allocated = ROW_COUNT;
+
+    RETURN removed + generated + allocated;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Nightly sweep: unpaid items past the grace period become overdue (served by the partial index)
+CREATE OR REPLACE FUNCTION mark_overdue_rent(
+    p_as_of DATE DEFAULT CURRENT_DATE,
+    p_grace_days INTEGER DEFAULT 5
+)
+RETURNS INTEGER AS $$
+DECLARE
+    updated INTEGER;
+BEGIN
+    UPDATE RentSchedule
+    SET status = 'overdue'
+    WHERE status <> 'paid'
+      AND status <> 'overdue'
+      AND due_date < p_as_of - p_grace_days;
+
+    GET DIAGNOSTICS updated = ROW_COUNT;
+    RETURN updated;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Outstanding items due in [p_from, p_to): arrears for a month are a range scan of the partial index
+CREATE OR REPLACE FUNCTION rent_arrears(p_from DATE, p_to DATE, p_overdue_only BOOLEAN DEFAULT TRUE)
+RETURNS TABLE (
+    lease_id INTEGER,
+    lease_number VARCHAR(30),
+    renter_id INTEGER,
+    property_id INTEGER,
+    due_date DATE,
+    amount_due DECIMAL(8,2),
+    amount_paid DECIMAL(8,2),
+    balance DECIMAL(8,2),
+    status rent_schedule_status_enum
+) AS $$
+    SELECT rs.lease_id, l.lease_number, l.renter_id, l.property_id,
+           rs.due_date, rs.amount_due, rs.amount_paid,
+           rs.amount_due - rs.amount_paid AS balance,
+           rs.status
+    FROM RentSchedule rs
+    JOIN Lease l ON l.lease_id = rs.lease_id
+    WHERE rs.status <> 'paid'
+      AND rs.due_date >= p_from
+      AND rs.due_date < p_to
+      AND (NOT p_overdue_only OR rs.status = 'overdue')
+    ORDER BY rs.due_date, rs.lease_id;
+$$ LANGUAGE sql STABLE;
+
+-- Rebuild the schedule dropped above (a no-op on an empty warehouse)
+SELECT refresh_rent_roll();
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Warehouse tables (ans_psql.sql and the add-on schema files), in their canonical spelling
+KNOWN_TABLES = [
+    'Office', 'Employee', 'Client', 'ClientRole', 'PropertyType', 'Property',
+    'PropertyFeature', 'PropertyMedia', 'Appointment', 'Transaction', 'Commission',
+    'Lease', 'PaymentRecord', 'MarketingCampaign', 'ClientLead', 'Document', 'RentSchedule',
+    'LeadFeature', 'Location', 'ZipNeighborhood', 'PropertyHistory', 'MediaBlob'
+]
+
+TABLE_REFERENCE = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?', re.IGNORECASE)
+
+
+def query_tables(sql):
+    """Returns the schema tables a query reads from (CTE names are ignored)."""
+    canonical = {name.lower(): name for name in KNOWN_TABLES}
+    found = {canonical.get(name.lower()) for name in TABLE_REFERENCE.findall(sql)}
+    found.discard(None)
+    return sorted(found)
+
+
+def bump_data_epochs(cursor, tables):
+    """Advances the data epoch of every given table in one statement."""
+    tables = sorted(set(tables))
+    if not tables:
+        return
+    cursor.execute("""
+        INSERT INTO DataEpoch (table_name, epoch)
+        SELECT unnest(%s::varchar[]), 1
+        ON CONFLICT (table_name) DO UPDATE SET
+            epoch = DataEpoch.epoch + 1,
+            updated_at = CURRENT_TIMESTAMP
+    """, (tables,))
+
+
+class MemoryResultStore:
+    """In-process LRU store bounded by total payload bytes."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            payload = self.entries.get(key)
+            if payload is not None:
+                self.entries.move_to_end(key)
+            return payload
+
+    def put(self, key, payload):
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= len(self.entries.pop(key))
+            self.entries[key] = payload
+            self.total_bytes += len(payload)
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+
+class SQLiteResultStore:
+    """On-disk LRU store in a single SQLite file, bounded by total payload bytes."""
+
+    def __init__(self, path='query_cache.sqlite3', max_bytes=512 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entry (
+                cache_key TEXT PRIMARY KEY,
+                size_bytes INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                payload BLOB NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache_entry (last_access)")
+
+    def get(self, key):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT payload FROM cache_entry WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.db.execute(
+                "UPDATE cache_entry SET last_access = ? WHERE cache_key = ?", (time.time(), key)
+            )
+            return row[0]
+
+    def put(self, key, payload):
+        with self.lock:
+            self.db.execute("""
+                INSERT OR REPLACE INTO cache_entry (cache_key, size_bytes, last_access, payload)
+                VALUES (?, ?, ?, ?)
+            """, (key, len(payload), time.time(), sqlite3.Binary(payload)))
+
+            # Evict least recently used entries beyond the byte budget in one statement
+            cursor = self.db.execute("""
+                DELETE FROM cache_entry WHERE cache_key IN (
+                    SELECT cache_key FROM (
+                        SELECT cache_key,
+                               SUM(size_bytes) OVER (ORDER BY last_access DESC) AS running_bytes
+                        FROM cache_entry
+                    ) WHERE running_bytes > ?
+                )
+            """, (self.max_bytes,))
+            self.evictions += max(cursor.rowcount, 0)
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM cache_entry")
+            self.db.execute("VACUUM")
+
+
+class ResultCache:
+    """Caches query results under query + parameters + data epochs of the tables read."""
+
+    def __init__(self, store, epoch_loader, epoch_ttl=5.0):
+        self.store = store
+        self.epoch_loader = epoch_loader
+        self.epoch_ttl = epoch_ttl
+        self.epochs = {}
+        self.epochs_loaded_at = 0.0
+        self.metrics = {
+            'hits': 0,
+            'misses': 0,
+            'hit_seconds': 0.0,
+            'miss_seconds': 0.0,
+        }
+
+    def current_epochs(self):
+        """Returns table epochs, re-read from the database at most every epoch_ttl seconds."""
+        if time.monotonic() - self.epochs_loaded_at > self.epoch_ttl:
+            self.epochs = self.epoch_loader()
+            self.epochs_loaded_at = time.monotonic()
+        return self.epochs
+
+    def make_key(self, query_id, sql, params):
+        """Builds the cache key for a query, its SQL text and the epochs of the tables it depends on."""
+        epochs = self.current_epochs()
+        dependencies = {table: epochs.get(table, 0) for table in query_tables(sql)}
+        # A named query whose SQL changed must not be served from a persistent store
+        sql_hash = hashlib.sha256(sql.encode('utf-8')).hexdigest()
+        raw = json.dumps([query_id, sql_hash, params or {}, dependencies], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get_or_compute(self, query_id, sql, params, compute):
+        """Returns a cached result or computes, stores and returns it."""
+        started = time.perf_counter()
+        key = self.make_key(query_id, sql, params)
+
+        payload = self.store.get(key)
+        if payload is not None:
+            result = pickle.loads(payload)
+            self.metrics['hits'] += 1
+            self.metrics['hit_seconds'] += time.perf_counter() - started
+            return result
+
+        result = compute()
+        self.store.put(key, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        self.metrics['misses'] += 1
+        self.metrics['miss_seconds'] += time.perf_counter() - started
+        return result
+
+    def stats(self):
+        """Returns hit/miss counts, hit rate, average latencies and evictions."""
+        hits, misses = self.metrics['hits'], self.metrics['misses']
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+            'avg_hit_ms': round(self.metrics['hit_seconds'] * 1000 / hits, 3) if hits else None,
+            'avg_miss_ms': round(self.metrics['miss_seconds'] * 1000 / misses, 3) if misses else None,
+            'evictions': self.store.evictions,
+        }
+
+
+class CachedQueryAPI:
+    """Runs named analyst queries through StreamingQueryAPI with an epoch-keyed result cache."""
+
+    def __init__(self, db_config, cache_path='query_cache.sqlite3', max_bytes=512 * 1024 * 1024,
+                 epoch_ttl=5.0):
+        from query_api import StreamingQueryAPI
+
+        self.api = StreamingQueryAPI(db_config)
+        store = SQLiteResultStore(cache_path, max_bytes) if cache_path else MemoryResultStore(max_bytes)
+        self.cache = ResultCache(store, self.load_epochs, epoch_ttl)
+
+    def load_epochs(self):
+        """Reads the current data epoch of every table."""
+        if not self.api.conn:
+            self.api.connect_db()
+        with self.api.conn.cursor() as cursor:
+            cursor.execute("SELECT table_name, epoch FROM DataEpoch")
+            epochs = dict(cursor.fetchall())
+        self.api.conn.rollback()
+        return epochs
+
+    def run(self, query, params=None):
+        """Returns a query result as a DataFrame, served from the cache when still current."""
+        sql = self.api.resolve_sql(query)
+        return self.cache.get_or_compute(query, sql, params, lambda: self.api.run(query, params))
+
+    def close(self):
+        self.api.close_db()
+
+
+def main():
+    """Main function"""
+    from config import DATABASE_CONFIG
+
+    parser = argparse.ArgumentParser(description="Run analyst queries through the result cache.")
+    parser.add_argument('queries', nargs='*', help="Query names, e.g. final_q_7 complex_3")
+    parser.add_argument('--cache-path', default=os.path.join(os.getcwd(), 'query_cache.sqlite3'))
+    parser.add_argument('--max-mb', type=int, default=512)
+    args = parser.parse_args()
+
+    cached = CachedQueryAPI(DATABASE_CONFIG, args.cache_path, args.max_mb * 1024 * 1024)
+    try:
+        for name in args.queries or cached.api.library.names():
+            df = cached.run(name)
+            logger.info(f"{name}: {len(df)} rows")
+        logger.info(f"Cache stats: {cached.cache.stats()}")
+    finally:
+        cached.close()
+
+
+if __name__ == "__main__":
+    main()
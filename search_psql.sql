@@ -0,0 +1,128 @@
+-- Full-text search over agent, transaction, appointment, client and lead notes.
+-- Run after ans_psql.sql. Each searchable table gets a generated tsvector column and a GIN
+-- index; search_notes() ranks hits across all of them and links each back to its property
+-- and transaction.
+
+-- Free-text columns of the source feed, previously dropped by the ETL
+ALTER TABLE "Transaction" ADD COLUMN IF NOT EXISTS agent_notes TEXT;
+ALTER TABLE "Transaction" ADD COLUMN IF NOT EXISTS transaction_notes TEXT;
+ALTER TABLE "Transaction" ADD COLUMN IF NOT EXISTS special_conditions TEXT;
+
+-- Weight A: the most specific text of the row; weight B: supporting notes
+ALTER TABLE "Transaction" ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', COALESCE(special_conditions, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(transaction_notes, '')), 'B') ||
+        setweight(to_tsvector('english', COALESCE(agent_notes, '')), 'B')
+    ) STORED;
+
+ALTER TABLE Appointment ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', COALESCE(feedback, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(notes, '')), 'B')
+    ) STORED;
+
+ALTER TABLE Client ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', COALESCE(full_name, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(notes, '')), 'B')
+    ) STORED;
+
+ALTER TABLE ClientLead ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', COALESCE(notes, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(first_name, '') || ' ' || COALESCE(last_name, '')), 'B') ||
+        setweight(to_tsvector('english', COALESCE(preferred_location, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_transaction_search ON "Transaction" USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_appointment_search ON Appointment USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_client_search ON Client USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_lead_search ON ClientLead USING GIN (search_vector);
+
+-- Linking a client hit to its latest transaction probes the party columns
+CREATE INDEX IF NOT EXISTS idx_transaction_buyer ON "Transaction" (buyer_id) WHERE buyer_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_transaction_seller ON "Transaction" (seller_id) WHERE seller_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_transaction_renter ON "Transaction" (renter_id) WHERE renter_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_transaction_landlord ON "Transaction" (landlord_id) WHERE landlord_id IS NOT NULL;
+
+-- Ranked hits across all searchable entities, with web-search syntax ("flexible closing", -rental, or).
+-- Each entity contributes at most p_limit candidates from its GIN index; headlines and links are
+-- only computed for the final p_limit rows.
+CREATE OR REPLACE FUNCTION search_notes(p_query TEXT, p_limit INTEGER DEFAULT 20)
+RETURNS TABLE (
+    entity TEXT,
+    entity_id INTEGER,
+    property_id INTEGER,
+    transaction_id INTEGER,
+    rank REAL,
+    headline TEXT
+) AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('english', p_query) AS query
+    ),
+    hits AS (
+        (SELECT 'transaction' AS entity, t.transaction_id AS entity_id, t.property_id,
+                t.transaction_id, ts_rank_cd(t.search_vector, q.query, 32) AS rank,
+                CONCAT_WS(' | ', t.special_conditions, t.transaction_notes, t.agent_notes) AS body
+         FROM "Transaction" t, q
+         WHERE t.search_vector @@ q.query
+         ORDER BY rank DESC
+         LIMIT p_limit)
+        UNION ALL
+        (SELECT 'appointment', a.appointment_id, a.property_id, NULL::INTEGER,
+                ts_rank_cd(a.search_vector, q.query, 32) AS rank,
+                CONCAT_WS(' | ', a.feedback, a.notes)
+         FROM Appointment a, q
+         WHERE a.search_vector @@ q.query
+         ORDER BY rank DESC
+         LIMIT p_limit)
+        UNION ALL
+        (SELECT 'client', c.client_id, NULL::INTEGER, NULL::INTEGER,
+                ts_rank_cd(c.search_vector, q.query, 32) AS rank,
+                CONCAT_WS(' | ', c.full_name, c.notes)
+         FROM Client c, q
+         WHERE c.search_vector @@ q.query
+         ORDER BY rank DESC
+         LIMIT p_limit)
+        UNION ALL
+        (SELECT 'lead', l.lead_id, l.property_id, NULL::INTEGER,
+                ts_rank_cd(l.search_vector, q.query, 32) AS rank,
+                CONCAT_WS(' | ', l.first_name || ' ' || l.last_name, l.notes)
+         FROM ClientLead l, q
+         WHERE l.search_vector @@ q.query
+         ORDER BY rank DESC
+         LIMIT p_limit)
+    ),
+    top AS (
+        SELECT * FROM hits ORDER BY rank DESC LIMIT p_limit
+    )
+    SELECT top.entity,
+           top.entity_id,
+           COALESCE(top.property_id, by_client.property_id),
+           COALESCE(top.transaction_id, by_property.transaction_id, by_client.transaction_id),
+           top.rank,
+           ts_headline('english', top.body, q.query, 'MaxFragments=2, MaxWords=20, MinWords=5')
+    FROM top
+    CROSS JOIN q
+    -- Appointments and leads link to the latest transaction of their property
+    LEFT JOIN LATERAL (
+        SELECT t.transaction_id
+        FROM "Transaction" t
+        WHERE top.entity IN ('appointment', 'lead')
+          AND t.property_id = top.property_id
+        ORDER BY t.offer_date DESC NULLS LAST, t.transaction_id DESC
+        LIMIT 1
+    ) by_property ON TRUE
+    -- Clients link to the latest transaction they are a party to
+    LEFT JOIN LATERAL (
+        SELECT t.property_id, t.transaction_id
+        FROM "Transaction" t
+        WHERE top.entity = 'client'
+          AND (t.buyer_id = top.entity_id OR t.seller_id = top.entity_id
+               OR t.renter_id = top.entity_id OR t.landlord_id = top.entity_id)
+        ORDER BY t.offer_date DESC NULLS LAST, t.transaction_id DESC
+        LIMIT 1
+    ) by_client ON TRUE
+    ORDER BY top.rank DESC;
+$$ LANGUAGE sql STABLE;
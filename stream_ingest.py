@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import csv
+import json
+import logging
+import os
+import shutil
+import time
+from collections import defaultdict
+
+import pandas as pd
+import psycopg2
+from psycopg2.extras import execute_values
+
+from etl_loader import load_etl_class
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Columns of dream_homes_nyc_dataset_v8.csv, which the ETL expects on every record
+SOURCE_COLUMNS = [
+    'transaction_id', 'mls_listing_number', 'property_address_full', 'listing_office_name',
+    'listing_office_address', 'listing_office_phone', 'property_type', 'status_current',
+    'transaction_type', 'list_price', 'bed_bath_info', 'square_feet', 'property_features_list',
+    'listing_date', 'days_on_market', 'listing_agent_name', 'listing_agent_email',
+    'listing_agent_phone', 'listing_agent_commission_rate', 'selling_agent_name',
+    'selling_agent_email', 'selling_agent_phone', 'offer_date', 'offer_amount', 'final_price',
+    'accepted_date', 'closing_date', 'commission_total', 'commission_split_info', 'payout_status',
+    'lease_terms', 'monthly_rent', 'security_deposit', 'lease_start_end', 'marketing_spend',
+    'lead_source', 'campaign_type', 'documents_required', 'inspection_date', 'appraisal_amount',
+    'client_buyer_info', 'client_seller_info', 'client_contact_details', 'appointment_history',
+    'showing_dates', 'appointment_outcomes', 'notes_agent', 'notes_transaction',
+    'special_conditions'
+]
+
+# Listing-level columns: merged across all records of the same mls_listing_number
+PROPERTY_COLUMNS = [
+    'property_address_full', 'listing_office_name', 'listing_office_address',
+    'listing_office_phone', 'property_type', 'status_current', 'list_price', 'bed_bath_info',
+    'square_feet', 'property_features_list', 'listing_date', 'days_on_market'
+]
+
+# Optional record fields carrying the time the source changed the record
+EVENT_TIME_FIELDS = ('event_time', 'updated_at')
+
+
+class TailSource:
+    """Follows an append-only JSONL or CSV (one record per line) feed from the last committed byte offset."""
+
+    def __init__(self, name, path, fmt='jsonl', precedence=0, offset=0):
+        self.name = name
+        self.path = path
+        self.fmt = fmt
+        self.precedence = precedence
+        self.offset = offset
+        self.read_offset = offset
+        self.header = None
+
+    def poll(self, max_records=10000):
+        """Returns new complete records appended since the last poll as (record, ack token) pairs."""
+        if not os.path.exists(self.path):
+            return []
+
+        size = os.path.getsize(self.path)
+        if size < self.read_offset:
+            logger.warning(f"[{self.name}] {self.path} was truncated or rotated; reading from the start.")
+            self.offset = self.read_offset = 0
+            self.header = None
+
+        if self.fmt == 'csv' and self.header is None:
+            with open(self.path, 'rb') as f:
+                header_line = f.readline()
+            if not header_line.endswith(b'\n'):
+                return []
+            self.header = next(csv.reader([header_line.decode('utf-8-sig')]))
+            self.read_offset = max(self.read_offset, len(header_line))
+
+        records = []
+        with open(self.path, 'rb') as f:
+            f.seek(self.read_offset)
+            while len(records) < max_records:
+                line = f.readline()
+                # A line without its newline is still being written; pick it up next poll
+                if not line or not line.endswith(b'\n'):
+                    break
+                self.read_offset += len(line)
+                text = line.decode('utf-8').strip()
+                if not text:
+                    continue
+                try:
+                    if self.fmt == 'csv':
+                        record = dict(zip(self.header, next(csv.reader([text]))))
+                    else:
+                        record = json.loads(text)
+                except Exception as e:
+                    logger.warning(f"[{self.name}] Skipping malformed record at byte {self.read_offset}: {e}")
+                    continue
+                records.append((record, self.read_offset))
+        return records
+
+    def commit(self, tokens):
+        """Advances the committed offset once records up to it are loaded."""
+        self.offset = max([self.offset] + list(tokens))
+
+    def checkpoint(self):
+        return {'offset': self.offset}
+
+
+class DropDirSource:
+    """Picks up whole JSONL or CSV files dropped into a directory and archives them once loaded."""
+
+    def __init__(self, name, directory, fmt='csv', precedence=0):
+        self.name = name
+        self.directory = directory
+        self.fmt = fmt
+        self.precedence = precedence
+        self.archive_dir = os.path.join(directory, 'processed')
+        self.seen = set()
+
+    def poll(self, max_records=10000):
+        """Reads newly dropped files; the last record of each file carries the file path as ack token."""
+        if not os.path.isdir(self.directory):
+            return []
+
+        # Writers should drop files with a temporary name and rename them when complete
+        candidates = [
+            entry for entry in os.scandir(self.directory)
+            if entry.is_file() and not entry.name.startswith('.')
+            and entry.name.endswith(f".{self.fmt}") and entry.path not in self.seen
+        ]
+        candidates.sort(key=lambda entry: entry.stat().st_mtime)
+
+        records = []
+        for entry in candidates:
+            if records and len(records) >= max_records:
+                break
+            try:
+                with open(entry.path, encoding='utf-8-sig') as f:
+                    if self.fmt == 'csv':
+                        rows = list(csv.DictReader(f))
+                    else:
+                        rows = [json.loads(line) for line in f if line.strip()]
+            except Exception as e:
+                logger.warning(f"[{self.name}] Could not read {entry.name}: {e}")
+                continue
+
+            self.seen.add(entry.path)
+            for i, row in enumerate(rows):
+                records.append((row, entry.path if i == len(rows) - 1 else None))
+            if not rows:
+                self.commit([entry.path])
+        return records
+
+    def commit(self, tokens):
+        """Moves fully loaded files to the processed/ archive."""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        for path in tokens:
+            if path and os.path.exists(path):
+                shutil.move(path, os.path.join(self.archive_dir, os.path.basename(path)))
+
+    def checkpoint(self):
+        return {}
+
+
+class SourceMetrics:
+    """Throughput and lag counters for one source."""
+
+    def __init__(self):
+        self.received = 0
+        self.loaded = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.window_started = time.time()
+        self.window_loaded = 0
+
+    def snapshot(self):
+        elapsed = max(time.time() - self.window_started, 1e-9)
+        snapshot = {
+            'received': self.received,
+            'loaded': self.loaded,
+            'records_per_sec': round(self.window_loaded / elapsed, 2),
+            'avg_lag_sec': round(self.lag_total / self.loaded, 3) if self.loaded else None,
+            'max_lag_sec': round(self.lag_max, 3),
+        }
+        self.window_started = time.time()
+        self.window_loaded = 0
+        return snapshot
+
+
+def record_keys(df):
+    """Key of each record: its transaction_id, or MLS:<listing> for records without one."""
+    return df['transaction_id'].where(df['transaction_id'].notna(), 'MLS:' + df['mls_listing_number'].astype(str))
+
+
+def merge_records(df):
+    """
+    Collapses records that describe the same transaction or listing.
+    For every column the value comes from the highest-precedence source that has one;
+    among equal precedence the most recent event wins (last write wins).
+    """
+    df = df.sort_values(['_precedence', '_event_time', '_sequence'], ascending=False)
+
+    # Records without a transaction_id are keyed on their listing
+    merged = df.groupby(record_keys(df), sort=False).first()
+
+    # Listing attributes must agree across all transactions of the same property
+    listing = df[df['mls_listing_number'].notna()].groupby('mls_listing_number', sort=False)[PROPERTY_COLUMNS].first()
+    has_listing = merged['mls_listing_number'].isin(listing.index)
+    merged.loc[has_listing, PROPERTY_COLUMNS] = listing.loc[
+        merged.loc[has_listing, 'mls_listing_number'], PROPERTY_COLUMNS
+    ].values
+
+    return merged.reset_index(drop=True)
+
+
+class MicroBatchIngestor:
+    """Long-running ingestion: polls several sources, merges records and loads them in micro-batches."""
+
+    def __init__(self, db_config, sources, batch_size=500, max_wait_seconds=2.0,
+                 poll_interval=0.2, state_path='.ingest_state.json', metrics_interval=30.0):
+        self.etl = load_etl_class()(db_config)
+        self.sources = sources
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.poll_interval = poll_interval
+        self.state_path = state_path
+        self.metrics_interval = metrics_interval
+        self.metrics = defaultdict(SourceMetrics)
+        self.buffer = []
+        self.sequence = 0
+        self.batches_loaded = 0
+
+    def save_state(self):
+        """Persists committed source offsets so a restart resumes where loading stopped."""
+        state = {source.name: source.checkpoint() for source in self.sources}
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def event_time(self, record, arrived_at):
+        """Returns the record's own change time as epoch seconds, else its arrival time."""
+        for field in EVENT_TIME_FIELDS:
+            value = record.get(field)
+            if value:
+                try:
+                    return pd.Timestamp(value).timestamp()
+                except Exception:
+                    pass
+        return arrived_at
+
+    def poll_sources(self):
+        """Reads all sources into the buffer; returns the number of new records."""
+        received = 0
+        for source in self.sources:
+            arrived_at = time.time()
+            for record, token in source.poll(self.batch_size):
+                self.sequence += 1
+                self.buffer.append({
+                    'record': record,
+                    'source': source,
+                    'token': token,
+                    'precedence': source.precedence,
+                    'event_time': self.event_time(record, arrived_at),
+                    'arrived_at': arrived_at,
+                    'sequence': self.sequence,
+                })
+                self.metrics[source.name].received += 1
+                received += 1
+        return received
+
+    def should_flush(self):
+        if not self.buffer:
+            return False
+        if len(self.buffer) >= self.batch_size:
+            return True
+        return time.time() - self.buffer[0]['arrived_at'] >= self.max_wait_seconds
+
+    def build_frame(self, entries):
+        """Turns buffered records into one DataFrame shaped like the source CSV."""
+        df = pd.DataFrame([entry['record'] for entry in entries])
+        df = df.reindex(columns=SOURCE_COLUMNS)
+        df = df.replace({'': None})
+        df['_precedence'] = [entry['precedence'] for entry in entries]
+        df['_event_time'] = [entry['event_time'] for entry in entries]
+        df['_sequence'] = [entry['sequence'] for entry in entries]
+        df['_source'] = [entry['source'].name for entry in entries]
+        return df
+
+    def load_versions(self, keys):
+        """Loaded versions by key: (precedence, event time, listing values) from IngestRecordVersion."""
+        with self.etl.conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT record_key, precedence, EXTRACT(EPOCH FROM event_time), listing_values
+                FROM IngestRecordVersion
+                WHERE record_key = ANY(%s)
+            """, (sorted(keys),))
+            rows = cursor.fetchall()
+        self.etl.conn.rollback()
+        return {key: (precedence, float(event_time), values) for key, precedence, event_time, values in rows}
+
+    def apply_versions(self, df):
+        """
+        Enforces precedence and last-write-wins across micro-batches. Records that lose to a version
+        already loaded for their key are dropped; listing columns that lose to the loaded listing
+        are replaced by the loaded values. Returns (records, loaded listing values by listing).
+        """
+        keys = record_keys(df)
+        listings = 'MLS:' + df['mls_listing_number'].astype(str)
+        stored = self.load_versions(set(keys) | set(listings[df['mls_listing_number'].notna()]))
+
+        def loses(key, precedence, event_time):
+            version = stored.get(key)
+            return version is not None and (precedence, event_time) < version[:2]
+
+        keep = [not loses(key, p, t) for key, p, t in zip(keys, df['_precedence'], df['_event_time'])]
+        dropped = len(keep) - sum(keep)
+        if dropped:
+            logger.info(f"Dropped {dropped} records superseded by versions loaded earlier.")
+        df = df[keep]
+
+        restored = {}
+        for listing, group in df[df['mls_listing_number'].notna()].groupby('mls_listing_number', sort=False):
+            version = stored.get(f"MLS:{listing}")
+            best = max(zip(group['_precedence'], group['_event_time']))
+            if version is not None and best < version[:2] and version[2]:
+                restored[listing] = version[2]
+        return df, restored
+
+    def save_versions(self, df, merged):
+        """Records the winning version of every key and listing loaded by this batch."""
+        rows = {}
+        for key, p, t, source in zip(record_keys(df), df['_precedence'], df['_event_time'], df['_source']):
+            rows[key] = max(rows.get(key, (p, t, source, None)), (p, t, source, None), key=lambda v: v[:2])
+
+        listing_values = merged[merged['mls_listing_number'].notna()].drop_duplicates('mls_listing_number')
+        listed = df[df['mls_listing_number'].notna()]
+        for listing, p, t, source in zip(listed['mls_listing_number'], listed['_precedence'],
+                                         listed['_event_time'], listed['_source']):
+            key = f"MLS:{listing}"
+            current = rows.get(key)
+            if current is None or (p, t) > current[:2]:
+                rows[key] = (p, t, source, None)
+        for _, row in listing_values.iterrows():
+            key = f"MLS:{row['mls_listing_number']}"
+            values = {column: None if pd.isna(row[column]) else row[column] for column in PROPERTY_COLUMNS}
+            rows[key] = rows[key][:3] + (json.dumps(values, default=str),)
+
+        with self.etl.conn.cursor() as cursor:
+            # A version only replaces one that it beats, so a late flush cannot roll a key back
+            execute_values(cursor, """
+                INSERT INTO IngestRecordVersion (record_key, precedence, event_time, source_name, listing_values)
+                VALUES %s
+                ON CONFLICT (record_key) DO UPDATE SET
+                    precedence = EXCLUDED.precedence,
+                    event_time = EXCLUDED.event_time,
+                    source_name = EXCLUDED.source_name,
+                    listing_values = COALESCE(EXCLUDED.listing_values, IngestRecordVersion.listing_values),
+                    loaded_at = CURRENT_TIMESTAMP
+                WHERE (EXCLUDED.precedence, EXCLUDED.event_time)
+                      >= (IngestRecordVersion.precedence, IngestRecordVersion.event_time)
+            """, [(key, int(p), float(t), source, values) for key, (p, t, source, values) in rows.items()],
+                template="(%s, %s, to_timestamp(%s), %s, %s::JSONB)")
+        self.etl.conn.commit()
+
+    def flush(self):
+        """Merges and loads the buffered micro-batch, then commits source offsets."""
+        entries, self.buffer = self.buffer, []
+        df = self.build_frame(entries)
+        df = df[df['transaction_id'].notna() | df['mls_listing_number'].notna()]
+        df, restored = self.apply_versions(df)
+
+        started = time.time()
+        merged = None
+        if not df.empty:
+            merged = merge_records(df)
+            for listing, values in restored.items():
+                rows = merged['mls_listing_number'] == listing
+                for column in PROPERTY_COLUMNS:
+                    merged.loc[rows, column] = values.get(column)
+            self.etl.load_dataframe(merged[SOURCE_COLUMNS])
+            self.etl.bump_data_epochs()
+            self.save_versions(df, merged)
+        loaded_at = time.time()
+
+        tokens = defaultdict(list)
+        for entry in entries:
+            metrics = self.metrics[entry['source'].name]
+            metrics.loaded += 1
+            metrics.window_loaded += 1
+            lag = loaded_at - entry['event_time']
+            metrics.lag_total += lag
+            metrics.lag_max = max(metrics.lag_max, lag)
+            if entry['token'] is not None:
+                tokens[entry['source']].append(entry['token'])
+        for source, source_tokens in tokens.items():
+            source.commit(source_tokens)
+        self.save_state()
+
+        self.batches_loaded += 1
+        logger.info(
+            f"Micro-batch {self.batches_loaded}: {len(entries)} records merged into "
+            f"{0 if merged is None else len(merged)} "
+            f"in {loaded_at - started:.2f}s"
+        )
+
+    def log_metrics(self):
+        for source in self.sources:
+            logger.info(f"[{source.name}] {json.dumps(self.metrics[source.name].snapshot())}")
+
+    def run(self, max_batches=None):
+        """Polls, merges and loads until interrupted (or max_batches micro-batches are loaded)."""
+        self.etl.connect_db()
+        last_metrics = time.time()
+
+        try:
+            while max_batches is None or self.batches_loaded < max_batches:
+                received = self.poll_sources()
+
+                if self.should_flush():
+                    try:
+                        self.flush()
+                    except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                        # Connection lost: records stay unacknowledged and are re-read after reconnecting
+                        logger.error(f"Database connection lost, reconnecting: {e}")
+                        self.etl.close_db()
+                        self.etl.connect_db()
+                        self.reset_sources()
+                elif not received:
+                    time.sleep(self.poll_interval)
+
+                if time.time() - last_metrics >= self.metrics_interval:
+                    self.log_metrics()
+                    last_metrics = time.time()
+        except KeyboardInterrupt:
+            logger.info("Stopping ingestion.")
+            if self.buffer:
+                self.flush()
+        finally:
+            self.log_metrics()
+            self.etl.close_db()
+
+    def reset_sources(self):
+        """Rewinds sources to their committed positions after a failed load."""
+        self.buffer = []
+        for source in self.sources:
+            if isinstance(source, TailSource):
+                source.read_offset = source.offset
+            else:
+                source.seen.clear()
+
+
+def build_sources(config, state):
+    """Creates sources from the JSON config list, restoring committed offsets."""
+    sources = []
+    for item in config:
+        if 'drop_dir' in item:
+            sources.append(DropDirSource(
+                item['name'], item['drop_dir'], item.get('format', 'csv'), item.get('precedence', 0)
+            ))
+        else:
+            sources.append(TailSource(
+                item['name'], item['path'], item.get('format', 'jsonl'), item.get('precedence', 0),
+                state.get(item['name'], {}).get('offset', 0)
+            ))
+    return sources
+
+
+def main():
+    """Main function"""
+    from config import DATABASE_CONFIG
+
+    parser = argparse.ArgumentParser(description="Micro-batch ingestion from multiple Dream Homes NYC feeds.")
+    parser.add_argument('--sources', default='ingest_sources.json',
+                        help="JSON list of {name, path | drop_dir, format, precedence}")
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--max-wait', type=float, default=2.0, help="Seconds before a partial batch is flushed")
+    parser.add_argument('--state', default='.ingest_state.json')
+    args = parser.parse_args()
+
+    with open(args.sources) as f:
+        config = json.load(f)
+    state = {}
+    if os.path.exists(args.state):
+        with open(args.state) as f:
+            state = json.load(f)
+
+    ingestor = MicroBatchIngestor(
+        DATABASE_CONFIG, build_sources(config, state), args.batch_size, args.max_wait,
+        state_path=args.state
+    )
+    ingestor.run()
+
+
+if __name__ == "__main__":
+    main()
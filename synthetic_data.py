@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SOURCE_CSV = 'dream_homes_nyc_dataset_v8.csv'
+
+AMOUNT_COLUMNS = [
+    'list_price', 'offer_amount', 'final_price', 'commission_total', 'appraisal_amount',
+    'monthly_rent', 'security_deposit', 'marketing_spend'
+]
+DATE_COLUMNS = ['listing_date', 'offer_date', 'accepted_date', 'closing_date', 'inspection_date']
+DATE_TEXT_COLUMNS = ['lease_start_end', 'showing_dates', 'appointment_history']
+
+# The date spellings that occur in the source feed: 2024/12/1, 12/1/2024, 1/18/25, Nov 14 2024
+DATE_TOKEN = re.compile(
+    r'\b(?:\d{4}/\d{1,2}/\d{1,2}|\d{1,2}/\d{1,2}/\d{2,4}'
+    r'|(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.? \d{1,2},? \d{4})\b'
+)
+NUMBER = re.compile(r'\d+')
+
+
+def shift_date(value, days):
+    """Shifts one date value by whole days; unparseable values are returned unchanged."""
+    parsed = pd.to_datetime(value, errors='coerce')
+    if pd.isna(parsed):
+        return value
+    return (parsed + pd.Timedelta(days=int(days))).strftime('%Y-%m-%d')
+
+
+def shift_dates_in_text(text, days):
+    """Shifts every date embedded in a free-text field such as appointment_history."""
+    if pd.isna(text):
+        return text
+    return DATE_TOKEN.sub(lambda m: shift_date(m.group(0), days), str(text))
+
+
+def rename_client(info, contact, suffix):
+    """Gives a resampled client a distinct name and e-mail so they become a separate Client."""
+    if pd.isna(info):
+        return info, contact
+    name = str(info).split(' | ')[0].strip()
+    new_name = f"{name} {suffix}"
+    info = str(info).replace(name, new_name, 1)
+    if pd.notna(contact) and str(contact).startswith(name + ': '):
+        contact = str(contact).replace(name + ': ', new_name + ': ', 1).replace('@', f".{suffix}@", 1)
+    return info, contact
+
+
+def synthesize_records(source, rows, seed=0):
+    """
+    Resamples source records into a larger feed in the source format.
+    Keys, client identities, amounts and dates vary per record, so loading it through the ETL
+    produces realistic table sizes and value distributions for benchmarks and index tests.
+    """
+    rng = np.random.default_rng(seed)
+    df = source.iloc[rng.integers(0, len(source), rows)].reset_index(drop=True).copy()
+    factors = rng.uniform(0.75, 1.3, rows)
+    shifts = rng.integers(-720, 1, rows)
+    serials = [f"S{seed:02d}-{n:07d}" for n in range(1, rows + 1)]
+
+    df['transaction_id'] = [f"TXN-{serial}" for serial in serials]
+    df['mls_listing_number'] = [f"MLS-{serial}" for serial in serials]
+
+    for column in AMOUNT_COLUMNS:
+        df[column] = (pd.to_numeric(df[column], errors='coerce') * factors).round(0)
+    df['commission_split_info'] = [
+        NUMBER.sub(lambda m, f=factor: str(round(int(m.group(0)) * f)), split) if pd.notna(split) else split
+        for split, factor in zip(df['commission_split_info'], factors)
+    ]
+
+    for column in DATE_COLUMNS:
+        df[column] = [shift_date(value, days) if pd.notna(value) else value
+                      for value, days in zip(df[column], shifts)]
+    for column in DATE_TEXT_COLUMNS:
+        df[column] = [shift_dates_in_text(value, days) for value, days in zip(df[column], shifts)]
+
+    buyers = [rename_client(info, contact, n) for n, (info, contact)
+              in enumerate(zip(df['client_buyer_info'], df['client_contact_details']), start=1)]
+    df['client_buyer_info'] = [info for info, _ in buyers]
+    df['client_contact_details'] = [contact for _, contact in buyers]
+    df['client_seller_info'] = [rename_client(info, None, n)[0]
+                                for n, info in enumerate(df['client_seller_info'], start=1)]
+    return df
+
+
+def load_synthetic(db_config, rows, seed=0, source_csv=SOURCE_CSV):
+    """Loads a synthetic feed through the ETL into the given (scratch) database and analyzes it."""
+    from etl_loader import load_etl_class
+
+    df = synthesize_records(pd.read_csv(source_csv), rows, seed)
+    etl = load_etl_class()(db_config)
+    etl.connect_db()
+    try:
+        loaded = etl.load_dataframe(df)
+        etl.conn.autocommit = True
+        etl.cursor.execute("ANALYZE")
+    finally:
+        etl.bump_data_epochs()
+        etl.close_db()
+    logger.info(f"Loaded {loaded} synthetic records.")
+    return loaded
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic feed in the source CSV format.")
+    parser.add_argument('rows', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--source', default=SOURCE_CSV)
+    parser.add_argument('--output', default='synthetic_records.csv')
+    args = parser.parse_args()
+
+    df = synthesize_records(pd.read_csv(args.source), args.rows, args.seed)
+    df.to_csv(args.output, index=False)
+    logger.info(f"Wrote {len(df)} synthetic records to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
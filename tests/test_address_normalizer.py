@@ -0,0 +1,44 @@
+from address_normalizer import NormalizedAddress, normalize_address, split_city, split_unit
+
+
+def test_full_address():
+    address = normalize_address('162 E 86th Street Unit 7b New York NY 10032')
+    assert address == NormalizedAddress('162 East 86th St', 'Unit', '7B', 'New York', 'NY', '10032')
+    assert address.line == '162 East 86th St Unit 7B'
+
+
+def test_street_only_has_no_state_or_city():
+    for raw in ['5 Main St', '12 Elm Dr', '345 Court Ct', '9 Oak Ln', '1 Astor Pl', '40 Mill Rd']:
+        address = normalize_address(raw)
+        assert address.city is None and address.state is None and address.zip_code is None, raw
+        assert address.street == raw.rsplit(' ', 1)[0] + ' ' + raw.rsplit(' ', 1)[1].capitalize()
+
+
+def test_only_real_state_codes():
+    assert normalize_address('5 Main St Springfield ZZ').state is None
+    assert normalize_address('5 Main St Springfield ZZ').city is None
+    assert normalize_address('500 Main St Stamford CT').state == 'CT'
+    assert normalize_address('500 Main St Stamford CT').city == 'Stamford'
+    assert normalize_address('500 Oak Ct 06901').state is None
+
+
+def test_zip_without_state():
+    address = normalize_address('5 Main St 10001')
+    assert (address.street, address.city, address.state, address.zip_code) == ('5 Main St', None, None, '10001')
+
+
+def test_multi_word_and_unknown_cities():
+    assert normalize_address('30 Hudson St Jersey City NJ 07302').city == 'Jersey City'
+    assert normalize_address('1 Court Sq LIC NY 11101').city == 'Long Island City'
+    assert normalize_address('77 Pine Ave Apt 2 Mount Vernon NY').city == 'Mount Vernon'
+
+
+def test_split_city_and_unit():
+    assert split_city(['5', 'Main', 'St', 'West', 'New', 'York']) == (['5', 'Main', 'St'], 'West New York')
+    assert split_city(['5', 'Main', 'St']) == (['5', 'Main', 'St'], None)
+    assert split_unit(['5', 'Main', 'St', '#4f']) == (['5', 'Main', 'St'], 'Unit', '4F')
+    assert split_unit(['5', 'Main', 'St', 'Suite', '2701']) == (['5', 'Main', 'St'], 'Suite', '2701')
+
+
+def test_empty():
+    assert normalize_address('') == NormalizedAddress(None, None, None, None, None, None)
@@ -0,0 +1,83 @@
+"""Reloading a transaction must not duplicate its child rows. Needs a scratch PostgreSQL database."""
+
+import os
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+psycopg2 = pytest.importorskip('psycopg2')
+
+from etl_loader import load_etl_class
+from media_store import BlobStore
+from migrate import ROOT_DIR, Migrator
+
+# libpq connection string of an empty scratch database; the test drops and rebuilds its public schema
+TEST_DSN = os.environ.get('DREAMHOMES_TEST_DSN')
+CSV_PATH = os.path.join(ROOT_DIR, 'dream_homes_nyc_dataset_v8.csv')
+TEMPLATES = ['property/main.jpg', 'property/floorplan.pdf', 'documents/appraisal.pdf'] + [
+    f"documents/{name}.pdf"
+    for name in ['survey', 'title_report', 'appraisal', 'disclosure', 'contract', 'inspection', 'insurance']
+]
+
+pytestmark = pytest.mark.skipif(not TEST_DSN, reason="DREAMHOMES_TEST_DSN is not set")
+
+
+@pytest.fixture
+def db_config():
+    config = {'dsn': TEST_DSN}
+    conn = psycopg2.connect(**config)
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public")
+    conn.close()
+
+    migrator = Migrator(config, throttle=0)
+    migrator.connect_db()
+    try:
+        migrator.migrate()
+    finally:
+        migrator.close_db()
+    return config
+
+
+@pytest.fixture
+def etl(db_config, tmp_path, monkeypatch):
+    # The ETL registers media templates from ./media_templates
+    monkeypatch.chdir(tmp_path)
+    for template in TEMPLATES:
+        path = tmp_path / 'media_templates' / template
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(template.encode('utf-8'))
+
+    etl = load_etl_class()(db_config, media_store=BlobStore(str(tmp_path / 'store')))
+    etl.connect_db()
+    yield etl
+    etl.close_db()
+
+
+def child_counts(etl):
+    etl.cursor.execute("""
+        SELECT (SELECT COUNT(*) FROM Appointment) AS appointments,
+               (SELECT COUNT(*) FROM Document) AS documents,
+               (SELECT COUNT(*) FROM ClientLead) AS leads,
+               (SELECT COUNT(*) FROM PropertyMedia) AS media,
+               (SELECT COALESCE(SUM(ref_count), 0) FROM MediaBlob) AS blob_refs
+    """)
+    counts = dict(etl.cursor.fetchone())
+    etl.conn.rollback()
+    return counts
+
+
+def test_reloading_a_transaction_keeps_child_rows(etl):
+    df = pd.read_csv(CSV_PATH)
+    rows = df[df['appointment_history'].notna() & df['documents_required'].notna()
+              & df['client_buyer_info'].notna() & df['lead_source'].notna() & df['final_price'].notna()]
+    record = rows.head(1)
+
+    assert etl.load_dataframe(record) == 1
+    first = child_counts(etl)
+    assert all(first.values()), first
+
+    # A newer record winning, or a replay after a crash, loads the same transaction again
+    assert etl.load_dataframe(record) == 1
+    assert child_counts(etl) == first
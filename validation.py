@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+
+import pandas as pd
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Values accepted by transaction_type_enum (the ETL passes transaction_type through unmapped)
+TRANSACTION_TYPES = {'sale', 'rental'}
+
+
+class ValidationResult:
+    """Outcome of validating one batch: rows to load, rejected rows with reasons, and warnings."""
+
+    def __init__(self, valid, rejected, warnings):
+        self.valid = valid
+        self.rejected = rejected
+        self.warnings = warnings
+
+    def summary(self):
+        """Returns counts of rejected rows and cleared fields per rule."""
+        counts = {}
+        if len(self.rejected):
+            for reasons in self.rejected['rejection_reasons']:
+                for reason in reasons.split('; '):
+                    counts[reason] = counts.get(reason, 0) + 1
+        for rule, count in self.warnings.items():
+            counts[rule] = counts.get(rule, 0) + count
+        return counts
+
+
+class PreloadValidator:
+    """
+    Checks a batch against the schema constraints in ans_psql.sql before any database I/O.
+    Rows that would fail in the core Property/Transaction transaction are rejected.
+    For optional sub-records (lease, commission) the offending source field is cleared,
+    so the ETL skips that insert instead of failing and rolling it back.
+    """
+
+    def __init__(self, parser):
+        # The ETL instance; its parse_* helpers define how source fields become column values
+        self.parser = parser
+
+    def derive(self, df):
+        """Computes the values the ETL would write, column-wise, for the fields that carry constraints."""
+        derived = pd.DataFrame(index=df.index)
+
+        addresses = df['property_address_full'].map(self.parser.parse_address)
+        derived[['address', 'city', 'state', 'zip_code']] = pd.DataFrame(
+            addresses.tolist(), index=df.index, columns=['address', 'city', 'state', 'zip_code']
+        )
+
+        derived['list_price'] = pd.to_numeric(df['list_price'], errors='coerce')
+        # The ETL treats zero amounts as missing (`or` fallbacks), so mirror that here
+        final_price = pd.to_numeric(df['final_price'], errors='coerce').replace(0, float('nan'))
+        offer_amount = pd.to_numeric(df['offer_amount'], errors='coerce').replace(0, float('nan'))
+        derived['transaction_amount'] = final_price.fillna(offer_amount)
+        derived['offer_amount'] = offer_amount.fillna(derived['transaction_amount']).fillna(derived['list_price'])
+
+        derived['buyer_name'] = df['client_buyer_info'].map(lambda v: self.parser.parse_client_info(v)[0])
+        derived['seller_name'] = df['client_seller_info'].map(lambda v: self.parser.parse_client_info(v)[0])
+
+        derived['monthly_rent'] = pd.to_numeric(df['monthly_rent'], errors='coerce')
+        derived['security_deposit'] = pd.to_numeric(df['security_deposit'], errors='coerce')
+        lease_parts = df['lease_start_end'].astype('string').str.split(' - ', n=1, expand=True)
+        if lease_parts.shape[1] == 2:
+            derived['lease_start'] = pd.to_datetime(lease_parts[0], errors='coerce')
+            derived['lease_end'] = pd.to_datetime(lease_parts[1], errors='coerce')
+        else:
+            derived['lease_start'] = pd.NaT
+            derived['lease_end'] = pd.NaT
+
+        derived['commission_total'] = pd.to_numeric(df['commission_total'], errors='coerce')
+        return derived
+
+    def reject_rules(self, df, d):
+        """Rules whose violation fails the core row: (constraint name, violation mask)."""
+        has_transaction = d['transaction_amount'].notna()
+        is_sale_or_rental = df['transaction_type'].isin(TRANSACTION_TYPES)
+
+        return [
+            ('mls_number required for upsert', df['mls_listing_number'].isna()),
+            ('Property.address NOT NULL', d['address'].isna()),
+            ('Property.city NOT NULL', d['city'].isna()),
+            ('Property.state CHAR(2) NOT NULL', d['state'].isna() | (d['state'].str.len() != 2)),
+            ('Property.zip_code NOT NULL', d['zip_code'].isna()),
+            ('chk_list_price', d['list_price'].isna() | (d['list_price'] <= 0)),
+            ('Property.listing_office_id NOT NULL', df['listing_office_name'].isna()),
+            ('Property.listing_agent_id NOT NULL', df['listing_agent_name'].isna()),
+            ('PropertyType.type_name NOT NULL', df['property_type'].isna()),
+            ('transaction_type_enum', has_transaction & ~is_sale_or_rental),
+            ('chk_amounts', has_transaction & ((d['transaction_amount'] <= 0) | (d['offer_amount'] <= 0))),
+            ('chk_transaction_parties', has_transaction & (d['buyer_name'].isna() | d['seller_name'].isna())),
+        ]
+
+    def clear_rules(self, df, d):
+        """Rules for optional sub-records: (constraint name, violation mask, source column to clear)."""
+        is_lease = (df['transaction_type'] == 'rental') & df['monthly_rent'].notna()
+        has_dates = d['lease_start'].notna() & d['lease_end'].notna()
+
+        return [
+            ('chk_lease_amounts', is_lease & (
+                (d['monthly_rent'] <= 0) | d['monthly_rent'].isna()
+                | d['security_deposit'].isna() | (d['security_deposit'] < 0)
+            ), 'monthly_rent'),
+            ('chk_lease_dates', is_lease & has_dates & (d['lease_end'] <= d['lease_start']), 'monthly_rent'),
+            ('chk_commission_amounts', df['commission_total'].notna()
+             & ~(d['commission_total'] > 0), 'commission_total'),
+        ]
+
+    def validate(self, df):
+        """Splits a batch into valid and rejected frames; rejected rows carry their reasons."""
+        d = self.derive(df)
+
+        reasons = pd.Series('', index=df.index)
+        for name, violated in self.reject_rules(df, d):
+            violated = violated.fillna(False).astype(bool)
+            reasons[violated] = reasons[violated] + name + '; '
+
+        rejected_mask = reasons != ''
+        valid = df[~rejected_mask].copy()
+        rejected = df[rejected_mask].copy()
+        rejected['rejection_reasons'] = reasons[rejected_mask].str.rstrip('; ')
+
+        warnings = {}
+        for name, violated, column in self.clear_rules(valid, d.loc[valid.index]):
+            violated = violated.fillna(False).astype(bool)
+            if violated.any():
+                valid.loc[violated, column] = None
+                warnings[name] = int(violated.sum())
+
+        return ValidationResult(valid, rejected, warnings)